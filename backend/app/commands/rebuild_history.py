@@ -0,0 +1,41 @@
+"""
+Rebuilds the daily NAV table (equity curve) from the `transactions` table in one forward pass.
+
+Usage: python -m app.commands.rebuild_history [--from YYYY-MM-DD] [--portfolio ID]
+"""
+import argparse
+from datetime import datetime, timezone
+
+from app import models # Register models
+from app.repositories.history_repository import HistoryRepository
+from app.repositories.portfolio_repository import PortfolioRepository
+from app.repositories.projection_repository import ProjectionRepository, DAILY_NAV
+from app.repositories.transaction_repository import list_portfolio_ids
+from database.connection import DatabaseManager, scope_session
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--from", dest="start", default=None, help="Only recompute from this UTC date onward")
+    parser.add_argument("--portfolio", type=int, default=None, help="Only this portfolio (default: all)")
+    args = parser.parse_args()
+
+    start = datetime.fromisoformat(args.start).replace(tzinfo=timezone.utc) if args.start else None
+
+    session = DatabaseManager().session_factory()
+    try:
+        portfolio_ids = [args.portfolio] if args.portfolio else list_portfolio_ids(session)
+        for portfolio_id in portfolio_ids:
+            days = HistoryRepository(scope_session(session, portfolio_id)).rebuild_from(start)
+            ProjectionRepository(session).advance([DAILY_NAV], PortfolioRepository(session).get_ledger_version()[0])
+            print(f"Portfolio {portfolio_id}: rebuilt {days} days of history")
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Recomputes the materialized `positions` and `lots` tables from the `transactions` table.
+
+Usage: python -m app.commands.rebuild_positions [--full] [--portfolio ID]
+"""
+import argparse
+
+from app import models # Register models
+from app.core.money import MONEY_SCALE
+from app.repositories.lot_repository import LotRepository
+from app.repositories.portfolio_repository import PortfolioRepository
+from app.repositories.position_repository import PositionRepository
+from app.repositories.projection_repository import ProjectionRepository, INLINE_PROJECTIONS
+from app.repositories.transaction_repository import list_portfolio_ids
+from database.connection import DatabaseManager, scope_session
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--full", action="store_true", help="Replay from the first transaction, ignoring checkpoints")
+    parser.add_argument("--portfolio", type=int, default=None, help="Only this portfolio (default: all)")
+    args = parser.parse_args()
+
+    session = DatabaseManager().session_factory()
+    try:
+        portfolio_ids = [args.portfolio] if args.portfolio else list_portfolio_ids(session)
+        for portfolio_id in portfolio_ids:
+            scope_session(session, portfolio_id)
+            state = PositionRepository(session).rebuild(use_checkpoints=not args.full)
+            LotRepository(session).rebuild()
+            ProjectionRepository(session).advance(INLINE_PROJECTIONS, PortfolioRepository(session).get_ledger_version()[0])
+            cash = ", ".join(f"{units / MONEY_SCALE:,.0f} {currency}" for currency, units in state.cash.items())
+            print(f"Portfolio {portfolio_id}: rebuilt {len(state.positions)} positions, cash: {cash or 0}")
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Catches the read models (projections) derived from the `transactions` ledger up with it,
+or replays them from the first transaction after their logic changed.
+
+Usage: python -m app.commands.rebuild_projections [--replay] [--projection NAME ...] [--portfolio ID]
+"""
+import argparse
+
+from app import models # Register models
+from app.repositories.projection_repository import ProjectionRepository, PROJECTIONS
+from app.repositories.transaction_repository import list_portfolio_ids
+from database.connection import DatabaseManager, scope_session
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--replay", action="store_true", help="Replay from zero instead of applying only new transactions")
+    parser.add_argument("--projection", nargs="+", choices=PROJECTIONS, default=list(PROJECTIONS))
+    parser.add_argument("--portfolio", type=int, default=None, help="Only this portfolio (default: all)")
+    args = parser.parse_args()
+
+    session = DatabaseManager().session_factory()
+    try:
+        portfolio_ids = [args.portfolio] if args.portfolio else list_portfolio_ids(session)
+        session.rollback() # Each portfolio takes its write lock on a fresh transaction
+        for portfolio_id in portfolio_ids:
+            projections = ProjectionRepository(scope_session(session, portfolio_id))
+            if args.replay:
+                head = projections.rebuild(args.projection)
+                print(f"Portfolio {portfolio_id}: replayed {', '.join(args.projection)} up to transaction {head}")
+            else:
+                applied = projections.catch_up(args.projection)
+                summary = ", ".join(f"{name} +{count}" for name, count in applied.items()) or "up to date"
+                print(f"Portfolio {portfolio_id}: {summary}")
+            session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Writes a ledger checkpoint of the current positions, for scheduled (cron) use.
+
+Usage: python -m app.commands.write_checkpoint [--portfolio ID]
+"""
+import argparse
+
+from app import models # Register models
+from app.models.transaction import Transaction
+from app.repositories.checkpoint_repository import CheckpointRepository
+from app.repositories.position_repository import PositionRepository
+from app.repositories.transaction_repository import list_portfolio_ids
+from database.connection import DatabaseManager, scope_session
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--portfolio", type=int, default=None, help="Only this portfolio (default: all)")
+    args = parser.parse_args()
+
+    session = DatabaseManager().session_factory()
+    try:
+        portfolio_ids = [args.portfolio] if args.portfolio else list_portfolio_ids(session)
+        if not portfolio_ids:
+            print("No transactions, nothing to checkpoint")
+            return
+
+        session.rollback() # Start each portfolio's lock on a fresh transaction
+        for portfolio_id in portfolio_ids:
+            scope_session(session, portfolio_id)
+            positions = PositionRepository(session)
+            positions.lock() # Orders in flight must not land before the checkpoint
+            last_tx = (
+                session.query(Transaction)
+                .filter(Transaction.portfolio_id == portfolio_id)
+                .order_by(Transaction.date.desc(), Transaction.id.desc())
+                .first()
+            )
+            if last_tx is None:
+                print(f"Portfolio {portfolio_id}: no transactions, nothing to checkpoint")
+                session.rollback()
+                continue
+
+            CheckpointRepository(session).save(positions.load_state(), last_tx)
+            session.commit()
+            print(f"Portfolio {portfolio_id}: checkpoint written at transaction {last_tx.id}")
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
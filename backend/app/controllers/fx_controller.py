@@ -0,0 +1,29 @@
+from datetime import date
+from typing import Annotated, Dict, List, Optional
+from fastapi import APIRouter, Depends, Query
+
+from app.core.awaitable import AwaitableService, awaitable_service
+from app.schemas.fx import FxRate, FxRateIn
+from app.services.fx_service import FxService
+
+router = APIRouter()
+
+FxServiceDep = Annotated[AwaitableService[FxService], Depends(awaitable_service(FxService.from_session))]
+
+
+@router.get("/rates", response_model=List[FxRate])
+async def get_rates(
+    currency: Optional[str] = None,
+    start: Annotated[Optional[date], Query(alias="from")] = None,
+    end: Annotated[Optional[date], Query(alias="to")] = None,
+    service: FxServiceDep = None
+):
+    return await service.get_rates(currency, start, end)
+
+
+@router.put("/rates", response_model=Dict[str, int])
+async def put_rates(rates: List[FxRateIn], service: FxServiceDep = None):
+    """
+    Stores daily rates (base currency per unit), replacing existing ones for the same currency and day.
+    """
+    return {"stored": await service.put_rates(rates)}
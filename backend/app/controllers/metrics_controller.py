@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import metrics
+
+router = APIRouter()
+
+
+@router.get("", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Per-route request metrics in the Prometheus text exposition format.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,45 +1,89 @@
-from typing import Annotated, List, Dict, Any
-from fastapi import APIRouter, Depends
+from datetime import date, datetime
+from typing import Annotated, List, Dict, Any, Literal, Optional
+from fastapi import APIRouter, Depends, Header, Query, Response
 
+from app.core.awaitable import AwaitableService, awaitable_service
+from app.core.cache import snapshot_cache
+from app.core.http_cache import Validator
+from app.core.lots import CostBasisMethod, LotMethod
 from app.services.portfolio_service import PortfolioService
-from app.schemas.portfolio import PortfolioSummary, Holding
+from app.schemas.portfolio import PortfolioSummary, Holding, HistoryPoint, OpenLot
 
 router = APIRouter()
 
+PortfolioServiceDep = Annotated[
+    AwaitableService[PortfolioService], Depends(awaitable_service(PortfolioService.from_session))
+]
+
+
+IfNoneMatch = Annotated[Optional[str], Header()]
+IfModifiedSince = Annotated[Optional[str], Header()]
+
+
+def cached_response(validator: Validator, body: Optional[bytes]) -> Response:
+    if body is None:
+        return Response(status_code=304, headers=validator.headers())
+    return Response(body, media_type="application/json", headers=validator.headers())
+
 
 @router.get("/summary", response_model=PortfolioSummary)
-def get_portfolio_summary(service: Annotated[PortfolioService, Depends()] = None):
-    return service.get_portfolio_summary()
+async def get_portfolio_summary(
+    as_of: Optional[datetime] = None,
+    method: Optional[CostBasisMethod] = None,
+    if_none_match: IfNoneMatch = None,
+    if_modified_since: IfModifiedSince = None,
+    service: PortfolioServiceDep = None
+):
+    return cached_response(*await service.get_cached("summary", as_of, method, if_none_match, if_modified_since))
 
 
 @router.get("/holdings", response_model=List[Holding])
-def get_holdings(service: Annotated[PortfolioService, Depends()] = None):
-    return service.get_current_holdings()
+async def get_holdings(
+    as_of: Optional[datetime] = None,
+    method: Optional[CostBasisMethod] = None,
+    if_none_match: IfNoneMatch = None,
+    if_modified_since: IfModifiedSince = None,
+    service: PortfolioServiceDep = None
+):
+    return cached_response(*await service.get_cached("holdings", as_of, method, if_none_match, if_modified_since))
 
 
 @router.get("/allocation", response_model=List[Dict[str, Any]])
-def get_allocation(service: Annotated[PortfolioService, Depends()] = None):
-    holdings = service.get_current_holdings()
-    summary = service.get_portfolio_summary()
-    total_value = summary.totalValue
-    cash = summary.cash
-    
-    allocation = []
-    
-    if cash > 0:
-        allocation.append({
-            "name": "현금",
-            "value": (cash / total_value * 100) if total_value > 0 else 0,
-            "color": "#94a3b8"
-        })
-        
-    colors = ["#0ea5e9", "#22c55e", "#eab308", "#f97316", "#ef4444", "#a855f7"]
-    for i, h in enumerate(holdings):
-        percent = (h.value / total_value * 100) if total_value > 0 else 0
-        allocation.append({
-            "name": h.name,
-            "value": percent,
-            "color": colors[i % len(colors)]
-        })
-        
-    return allocation
+async def get_allocation(
+    as_of: Optional[datetime] = None,
+    method: Optional[CostBasisMethod] = None,
+    if_none_match: IfNoneMatch = None,
+    if_modified_since: IfModifiedSince = None,
+    service: PortfolioServiceDep = None
+):
+    return cached_response(*await service.get_cached("allocation", as_of, method, if_none_match, if_modified_since))
+
+
+@router.get("/lots", response_model=List[OpenLot])
+async def get_lots(
+    asset: Optional[str] = None,
+    method: LotMethod = "specific",
+    service: PortfolioServiceDep = None
+):
+    """
+    Open lots per asset; under "specific", the lots a SELL can name in `lot_id`.
+    """
+    return await service.get_lots(method, asset)
+
+
+@router.get("/history", response_model=List[HistoryPoint])
+async def get_history(
+    start: Annotated[Optional[date], Query(alias="from")] = None,
+    end: Annotated[Optional[date], Query(alias="to")] = None,
+    interval: Literal["auto", "day", "week", "month"] = "auto",
+    service: PortfolioServiceDep = None
+):
+    """
+    Daily equity curve, downsampled to weekly or monthly points for long ranges.
+    """
+    return await service.get_history(start, end, interval)
+
+
+@router.get("/cache", response_model=Dict[str, int])
+def get_cache_stats():
+    return snapshot_cache.stats()
@@ -1,18 +1,44 @@
 from typing import Annotated, List
 from fastapi import APIRouter, Depends
 
+from app.core.awaitable import AwaitableService, awaitable_service
 from app.services.rebalancing_service import RebalancingService
-from app.schemas.rebalancing import TargetAllocationItem, RebalancingSuggestion
+from app.schemas.rebalancing import (
+    TargetAllocationItem, RebalancingSuggestion, BatchRebalancingRequest, BatchRebalancingResult,
+    RebalancingSolveRequest, RebalancingSolution
+)
 
 router = APIRouter()
 
+RebalancingServiceDep = Annotated[
+    AwaitableService[RebalancingService], Depends(awaitable_service(RebalancingService.from_session))
+]
+
 
 @router.post("/suggestions", response_model=List[RebalancingSuggestion])
-def get_rebalancing_suggestions(
+async def get_rebalancing_suggestions(
     target_allocations: List[TargetAllocationItem],
-    service: Annotated[RebalancingService, Depends()] = None
+    service: RebalancingServiceDep = None
 ):
     """
     Analyze portfolio and return rebalancing suggestions based on target allocations.
     """
-    return service.generate_suggestions([t.model_dump() for t in target_allocations])
+    return await service.generate_suggestions([t.model_dump() for t in target_allocations])
+
+
+@router.post("/solve", response_model=RebalancingSolution)
+async def solve_rebalancing(request: RebalancingSolveRequest, service: RebalancingServiceDep = None):
+    """
+    Solve for whole-lot trades closest to the target weights with the fewest trades,
+    accounting for fees, minimum trade size and a cash buffer; sells fund buys.
+    """
+    return await service.solve(request)
+
+
+@router.post("/batch", response_model=BatchRebalancingResult)
+def rebalance_batch(request: BatchRebalancingRequest):
+    """
+    Rebalance many portfolios (rows of `values`) against many target scenarios (rows of `targets`).
+    CPU-bound, so it runs on the threadpool in both database modes.
+    """
+    return RebalancingService.rebalance_batch(request)
@@ -1,24 +1,86 @@
-from typing import Annotated, List
-from fastapi import APIRouter, Depends
+from typing import Annotated, List, Literal, Optional
+from fastapi import APIRouter, Depends, Response, UploadFile
+from fastapi.responses import StreamingResponse
 
-from app.schemas.transaction import Transaction, TransactionCreate
+from app.core.awaitable import AwaitableService, awaitable_service
+from app.schemas.transaction import Transaction, TransactionCreate, TransactionImport, ImportResult
 from app.services.transaction_service import TransactionService
 
 router = APIRouter()
 
+TransactionServiceDep = Annotated[
+    AwaitableService[TransactionService], Depends(awaitable_service(TransactionService.from_session))
+]
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
 
 @router.get("/", response_model=List[Transaction])
-def read_transactions(
+async def read_transactions(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
+    service: TransactionServiceDep = None
+):
+    """
+    Lists transactions in (date, id) order. Pass the `X-Next-Cursor` response header
+    back as `cursor` to fetch the next page; `skip` is kept for older clients.
+    """
+    if cursor is None and skip > 0:
+        return await service.get_transactions(skip=skip, limit=limit)
+
+    items, next_cursor = await service.get_transactions_page(cursor=cursor, limit=limit)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+
+@router.get("/export")
+def export_transactions(
+    format: Literal["ndjson", "csv"] = "ndjson",
     service: Annotated[TransactionService, Depends()] = None
 ):
-    return service.get_transactions(skip=skip, limit=limit)
+    # Stays sync in both modes: the generator keeps reading from the session while streaming
+    return StreamingResponse(
+        service.export_transactions(format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=transactions.{format}"}
+    )
 
 
 @router.post("/", response_model=Transaction)
-def create_transaction(
+async def create_transaction(
     transaction: TransactionCreate, 
-    service: Annotated[TransactionService, Depends()] = None
+    service: TransactionServiceDep = None
+):
+    return await service.create_transaction(transaction)
+
+
+@router.post("/import", response_model=ImportResult)
+async def import_transactions(
+    transactions: List[TransactionImport],
+    atomic: bool = False,
+    service: TransactionServiceDep = None
+):
+    """
+    Bulk import. Rows are validated in date order; invalid rows are reported in `errors`
+    and skipped, or reject the whole batch with 400 when `atomic` is true.
+    """
+    return await service.import_transactions(transactions, atomic=atomic)
+
+
+@router.post("/import/csv", response_model=ImportResult)
+async def import_transactions_csv(
+    file: UploadFile,
+    atomic: bool = False,
+    service: TransactionServiceDep = None
 ):
-    return service.create_transaction(transaction)
+    """
+    Bulk import from a CSV file in the `/export?format=csv` layout.
+    """
+    content = (await file.read()).decode("utf-8-sig")
+    return await service.import_csv(content, atomic=atomic)
@@ -0,0 +1,65 @@
+from typing import Annotated, Any, Awaitable, Callable, Generic, Optional, TypeVar
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+from starlette.concurrency import run_in_threadpool
+
+from app.core.metrics import profiled
+from database.connection import get_db_session, get_async_db_session
+from database.settings import DB_SETTINGS
+
+S = TypeVar("S")
+T = TypeVar("T")
+
+Runner = Callable[[Callable[[Session], T]], Awaitable[T]]
+
+
+def offload(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Runs CPU-bound `fn(*args, **kwargs)`, which must not touch the session, off the event loop.
+    Services on the async engine (DB_ASYNC_MODE) run in a greenlet on the loop, where
+    replays and conversions would stall every other request: there the greenlet awaits
+    `fn` on Starlette's threadpool instead. Anywhere else (threadpool, jobs, commands)
+    `fn` is simply called.
+    """
+    if in_greenlet():
+        return await_only(run_in_threadpool(fn, *args, **kwargs))
+    return fn(*args, **kwargs)
+
+
+class AwaitableService(Generic[S]):
+    """
+    Makes every method of a sync service awaitable. The service and its repositories
+    run unchanged on the request's session: in a greenlet on the async engine
+    (DB_ASYNC_MODE) or on Starlette's threadpool otherwise. On the async engine, the
+    CPU-bound steps between queries go through `offload`, so the loop keeps serving.
+    """
+
+    def __init__(self, factory: Callable[[Session], S], run: Runner) -> None:
+        self._factory = factory
+        self._run = run
+        self._service: Optional[S] = None
+
+    def _bind(self, session: Session) -> S:
+        if self._service is None:
+            self._service = self._factory(session)
+        return self._service
+
+    def __getattr__(self, name: str) -> Callable[..., Awaitable[Any]]:
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await self._run(lambda session: profiled(getattr(self._bind(session), name), *args, **kwargs))
+        return call
+
+
+def awaitable_service(factory: Callable[[Session], S]) -> Callable[..., AwaitableService[S]]:
+    """
+    Builds the FastAPI dependency for `factory`, wired to the engine DB_SETTINGS selects.
+    """
+    if DB_SETTINGS.async_mode:
+        def dependency(session: Annotated[AsyncSession, Depends(get_async_db_session)]) -> AwaitableService[S]:
+            return AwaitableService(factory, session.run_sync)
+    else:
+        def dependency(session: Annotated[Session, Depends(get_db_session)]) -> AwaitableService[S]:
+            return AwaitableService(factory, lambda fn: run_in_threadpool(fn, session))
+    return dependency
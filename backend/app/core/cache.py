@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from app.core.settings import PORTFOLIO_SETTINGS
+
+
+class SnapshotCache:
+    """
+    Thread-safe LRU cache with a TTL, keyed by ledger version.
+    Shared by FastAPI's threadpool workers within one process.
+    Tuple keys whose first element is a scope (e.g. a portfolio id) can be
+    invalidated per scope.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._scope_generations: Dict[Hashable, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def scope_generation(self, scope: Hashable) -> int:
+        with self._lock:
+            return self._scope_generations.get(scope, 0)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, scope: Optional[Hashable] = None) -> None:
+        """
+        Drops every entry (or only those of `scope`) and bumps the generation so
+        in-flight computations started before a write cannot be stored under a current key.
+        """
+        with self._lock:
+            if scope is None:
+                self.evictions += len(self._entries)
+                self._entries.clear()
+                self._generation += 1
+                return
+
+            stale = [k for k in self._entries if isinstance(k, tuple) and k and k[0] == scope]
+            for key in stale:
+                del self._entries[key]
+            self.evictions += len(stale)
+            self._scope_generations[scope] = self._scope_generations.get(scope, 0) + 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "generation": self._generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+snapshot_cache = SnapshotCache(
+    maxsize=PORTFOLIO_SETTINGS.snapshot_cache_size,
+    ttl=PORTFOLIO_SETTINGS.snapshot_cache_ttl
+)
+
+# Serialized read responses keyed by ETag, so clients polling the same state get the same bytes
+response_cache = SnapshotCache(
+    maxsize=PORTFOLIO_SETTINGS.response_cache_size,
+    ttl=PORTFOLIO_SETTINGS.response_cache_ttl
+)
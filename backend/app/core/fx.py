@@ -0,0 +1,109 @@
+import hashlib
+import threading
+import time
+from bisect import bisect_right
+from datetime import date
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.money import PRICE_SCALE, div_round, to_units
+from app.core.settings import PORTFOLIO_SETTINGS
+
+# FX rates are stored like prices: base currency per unit of the currency, in price units
+RATE_SCALE = PRICE_SCALE
+
+
+class MissingRateError(ValueError):
+    def __init__(self, currency: str) -> None:
+        super().__init__(f"환율 정보가 없습니다: {currency}")
+        self.currency = currency
+
+
+class FxRates:
+    """
+    Immutable in-memory FX table: per currency, rate dates (as ordinals) and rates in
+    ascending date order, so the rate in effect on a day is one bisect away.
+    The base currency always converts at 1.
+    """
+
+    def __init__(self, base: str, rows: Iterable[Tuple[str, date, Decimal]]) -> None:
+        self.base = base
+        self._days: Dict[str, List[int]] = {}
+        self._rates: Dict[str, List[int]] = {}
+        # Rows must come sorted by (currency, date)
+        for currency, day, rate in rows:
+            self._days.setdefault(currency, []).append(day.toordinal())
+            self._rates.setdefault(currency, []).append(to_units(rate, RATE_SCALE))
+        # Same table, same fingerprint, in every process; part of the portfolio read ETags
+        self.fingerprint = hashlib.blake2b(
+            repr((base, sorted(self._days.items()), sorted(self._rates.items()))).encode(), digest_size=8
+        ).hexdigest()
+
+    def has(self, currency: str) -> bool:
+        return currency == self.base or currency in self._days
+
+    def rate_units(self, currency: str, day: date) -> int:
+        """
+        Latest rate on or before `day`, in rate units. Days before the first known rate use that first rate.
+        """
+        if currency == self.base:
+            return RATE_SCALE
+        days = self._days.get(currency)
+        if days is None:
+            raise MissingRateError(currency)
+        i = bisect_right(days, day.toordinal())
+        return self._rates[currency][max(i - 1, 0)]
+
+    def convert_units(self, units: int, currency: str, day: date) -> int:
+        """
+        Money units of `currency` converted to money units of the base currency, rounded half away from zero.
+        """
+        if currency == self.base:
+            return units
+        return div_round(units * self.rate_units(currency, day), RATE_SCALE)
+
+    def vector(self, currencies: Sequence[str], day: date) -> np.ndarray:
+        """
+        Rates for a column of currency codes: one lookup per distinct currency,
+        then a single gather, so callers convert whole columns at once.
+        """
+        codes, index = np.unique(np.asarray(currencies, dtype=object), return_inverse=True)
+        rates = np.array([self.rate_units(c, day) / RATE_SCALE for c in codes], dtype=float)
+        return rates[index]
+
+
+class FxRateCache:
+    """
+    Process-wide FX table, loaded whole and reused for `ttl` seconds or until invalidated.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._rates: Optional[FxRates] = None
+        self._loaded_at = 0.0
+        self._generation = 0
+
+    def get(self, load: Callable[[], FxRates]) -> FxRates:
+        with self._lock:
+            rates, generation = self._rates, self._generation
+            if rates is not None and time.monotonic() - self._loaded_at <= self.ttl:
+                return rates
+
+        rates = load()
+        with self._lock:
+            # A write since the load started makes it stale; hand it out but do not keep it
+            if generation == self._generation:
+                self._rates = rates
+                self._loaded_at = time.monotonic()
+        return rates
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._rates = None
+            self._generation += 1
+
+
+fx_rate_cache = FxRateCache(ttl=PORTFOLIO_SETTINGS.fx_cache_ttl)
@@ -0,0 +1,69 @@
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+
+@dataclass(frozen=True)
+class Validator:
+    """
+    What a cached read response is a function of, reduced to an HTTP validator pair.
+    Two requests with the same ETag are answered with the same bytes.
+    """
+    etag: str
+    last_modified: Optional[datetime] = None
+
+    def headers(self) -> dict:
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"} # Revalidate on every poll
+        if self.last_modified is not None:
+            headers["Last-Modified"] = http_date(self.last_modified)
+        return headers
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Strong ETag over the reprs of `parts`. A stable digest rather than hash(), so every
+    process derives the same tag from the same state.
+    """
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def http_date(value: datetime) -> str:
+    # Naive datetimes come back from the DB already in UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def not_modified(validator: Validator, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+    """
+    Whether a GET with these conditional headers can be answered 304 (RFC 9110 13.2.2):
+    If-None-Match, compared weakly, takes precedence; If-Modified-Since is only looked
+    at without it.
+    """
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        tag = validator.etag.removeprefix("W/")
+        return any(candidate.strip().removeprefix("W/") == tag for candidate in if_none_match.split(","))
+
+    if if_modified_since is None or validator.last_modified is None:
+        return False
+    since = _parse_http_date(if_modified_since)
+    if since is None:
+        return False
+    modified = validator.last_modified
+    if modified.tzinfo is None:
+        modified = modified.replace(tzinfo=timezone.utc)
+    # HTTP dates have whole seconds
+    return modified.replace(microsecond=0) <= since
@@ -0,0 +1,238 @@
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Iterable, List, Any, Optional, Tuple
+
+from app.core.metrics import record_replayed
+from app.core.money import (
+    Number, QUANTITY_SCALE, PRICE_SCALE, MONEY_SCALE, to_units, trade_value
+)
+
+BUY_TYPES = ("BUY", "매수")
+SELL_TYPES = ("SELL", "매도")
+DEPOSIT_TYPES = ("DEPOSIT", "입금")
+WITHDRAWAL_TYPES = ("WITHDRAWAL", "출금")
+
+CASH_ASSET = "현금"
+CASH_TYPES = DEPOSIT_TYPES + WITHDRAWAL_TYPES
+
+DEFAULT_CURRENCY = "KRW"
+
+
+@dataclass(slots=True)
+class PositionState:
+    """
+    Open position in fixed-point minor units (see app.core.money).
+    """
+    asset: str
+    ticker: Optional[str] = None
+    currency: str = DEFAULT_CURRENCY # Trading currency of every amount below
+    amount: int = 0 # Quantity units
+    total_cost: int = 0 # Money units
+    realized_pnl: int = 0 # Money units
+    last_price: Optional[int] = None # Price units of the latest trade, used to mark the position
+
+
+@dataclass(slots=True)
+class CurrencyTotals:
+    """
+    Ledger totals in one currency, in money units.
+    """
+    cash: int = 0
+    holdings_cost: int = 0
+    marked_value: int = 0 # Cash plus open positions at their last traded price
+    realized_pnl: int = 0
+
+
+@dataclass(frozen=True)
+class PortfolioSnapshot:
+    """
+    Read-only result of one pass over the ledger, shared by every consumer in a request.
+    Holdings are in their trading currency, and `cash`, `realized_pnl` and `summary` add
+    currencies as they are; FxService.convert restates everything in the base currency.
+    """
+    cash: float
+    realized_pnl: float
+    holdings: List[Dict[str, Any]]
+    summary: Dict[str, Any]
+    balances: Dict[str, float] = field(default_factory=dict) # Cash per currency
+    realized: Dict[str, float] = field(default_factory=dict) # Realized PnL per currency
+
+    def find_holding(self, asset: str) -> Optional[Dict[str, Any]]:
+        for h in self.holdings:
+            if h["asset"] == asset or h["name"] == asset:
+                return h
+        return None
+
+
+@dataclass
+class LedgerState:
+    """
+    Running portfolio state built by replaying transactions in (date, id) order.
+    All amounts are integer minor units, so long replays accumulate no rounding error;
+    values are converted to floats only when rendered for the API.
+    """
+    cash: Dict[str, int] = field(default_factory=dict) # Money units per currency
+    positions: Dict[str, PositionState] = field(default_factory=dict)
+
+    def balance(self, currency: str = DEFAULT_CURRENCY) -> int:
+        return self.cash.get(currency, 0)
+
+    def apply(
+        self, type_: str, asset: str, ticker: Optional[str], currency: Optional[str],
+        amount: Number, price: Number, fee: Optional[Number]
+    ) -> None:
+        """
+        Applies a transaction given in decimal values (API input or ORM rows).
+        """
+        amount_units = to_units(amount, QUANTITY_SCALE)
+        price_units = to_units(price, PRICE_SCALE)
+        if type_ in CASH_TYPES:
+            value = to_units(amount, MONEY_SCALE)
+        else:
+            value = trade_value(amount_units, price_units)
+        self.replay_units(((
+            type_, asset, ticker, currency or DEFAULT_CURRENCY,
+            amount_units, price_units, value, to_units(fee, MONEY_SCALE)
+        ),))
+
+    def replay_units(self, rows: Iterable[Tuple[str, str, Optional[str], str, int, int, int, int]]) -> None:
+        """
+        Applies transactions given in minor units as (type, asset, ticker, currency, amount, price, value, fee),
+        where `value` is the cash moved before fees: the deposited or withdrawn amount, or
+        price * amount rounded to the money scale. Replays read it precomputed from SQL
+        (`money.scaled` columns), so this hot loop only adds integers.
+        """
+        cash = self.cash
+        positions = self.positions
+        count = 0
+        for count, (type_, asset, ticker, currency, amount, price, value, fee) in enumerate(rows, 1):
+            if type_ in BUY_TYPES:
+                # Cost Basis = (Price * Amount) + Fee
+                cost = value + fee
+                cash[currency] = cash.get(currency, 0) - cost
+                if asset == CASH_ASSET:
+                    continue
+
+                position = positions.get(asset)
+                if position is None:
+                    position = positions[asset] = PositionState(asset=asset, ticker=ticker, currency=currency)
+                position.amount += amount
+                position.total_cost += cost
+                position.last_price = price
+
+            elif type_ in SELL_TYPES:
+                proceeds = value - fee
+                cash[currency] = cash.get(currency, 0) + proceeds
+                if asset == CASH_ASSET:
+                    continue
+
+                position = positions.get(asset)
+                if position is None:
+                    position = positions[asset] = PositionState(asset=asset, ticker=ticker, currency=currency)
+                position.last_price = price
+                held = position.amount
+                if held > 0:
+                    # Realized PnL = Proceeds - Cost Basis of sold amount (at average cost, rounded half up)
+                    cost_basis_sold = (2 * position.total_cost * amount + held) // (2 * held)
+                    position.realized_pnl += proceeds - cost_basis_sold
+                    position.amount = held - amount
+                    position.total_cost -= cost_basis_sold
+
+            elif type_ in DEPOSIT_TYPES:
+                cash[currency] = cash.get(currency, 0) + value
+            elif type_ in WITHDRAWAL_TYPES:
+                cash[currency] = cash.get(currency, 0) - value
+        record_replayed(count)
+
+    def totals(self) -> Dict[str, CurrencyTotals]:
+        """
+        Cash, open cost basis, marked value and realized PnL per currency. Marked value
+        values open positions at their last traded price, the ledger's own market estimate.
+        """
+        totals = {currency: CurrencyTotals(cash=units, marked_value=units) for currency, units in self.cash.items()}
+        for p in self.positions.values():
+            t = totals.get(p.currency)
+            if t is None:
+                t = totals[p.currency] = CurrencyTotals()
+            t.realized_pnl += p.realized_pnl
+            if p.amount > 0:
+                t.holdings_cost += p.total_cost
+                t.marked_value += trade_value(p.amount, p.last_price) if p.last_price is not None else p.total_cost
+        return totals
+
+    def holdings(self) -> List[Dict[str, Any]]:
+        result = []
+        for asset, position in self.positions.items():
+            if position.amount > 0:
+                amount = position.amount / QUANTITY_SCALE
+                value = position.total_cost / MONEY_SCALE
+                result.append({
+                    "name": asset,
+                    "asset": asset,
+                    "symbol": position.ticker,
+                    "currency": position.currency,
+                    "amount": amount,
+                    "avgPrice": value / amount,
+                    "value": value
+                })
+        return result
+
+    def summary(self, totals: Optional[Dict[str, CurrencyTotals]] = None) -> Dict[str, Any]:
+        # Note: To get true Market Value, we need current prices.
+        # Here we use the remaining Cost Basis as the holdings value.
+        totals = (totals if totals is not None else self.totals()).values()
+        cash = sum(t.cash for t in totals) / MONEY_SCALE
+        holdings_value = sum(t.holdings_cost for t in totals) / MONEY_SCALE
+
+        return {
+            "totalValue": cash + holdings_value,
+            "cash": cash,
+            "cashByCurrency": {currency: units / MONEY_SCALE for currency, units in self.cash.items()},
+            "holdingsValue": holdings_value,
+            "realizedPnL": sum(t.realized_pnl for t in totals) / MONEY_SCALE,
+            "unrealizedPnL": 0.0, # Requires current market price
+            "todaysChange": 0.0,
+            "todaysChangePercent": 0.0
+        }
+
+    def snapshot(self) -> PortfolioSnapshot:
+        totals = self.totals()
+        summary = self.summary(totals)
+        return PortfolioSnapshot(
+            cash=summary["cash"],
+            realized_pnl=summary["realizedPnL"],
+            holdings=self.holdings(),
+            summary=summary,
+            balances=dict(summary["cashByCurrency"]),
+            realized={currency: t.realized_pnl / MONEY_SCALE for currency, t in totals.items()}
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "units": True,
+            "cash": self.cash,
+            "positions": [asdict(p) for p in self.positions.values()]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LedgerState":
+        cash = data["cash"]
+        if data.get("units"):
+            # Checkpoints written before per-currency cash hold one balance
+            state = cls(cash=cash if isinstance(cash, dict) else {DEFAULT_CURRENCY: cash})
+            for p in data["positions"]:
+                state.positions[p["asset"]] = PositionState(**p)
+            return state
+
+        # Checkpoints written before the fixed-point ledger hold floats
+        state = cls(cash={DEFAULT_CURRENCY: to_units(cash, MONEY_SCALE)})
+        for p in data["positions"]:
+            last_price = p.get("last_price")
+            state.positions[p["asset"]] = PositionState(
+                asset=p["asset"],
+                ticker=p.get("ticker"),
+                amount=to_units(p["amount"], QUANTITY_SCALE),
+                total_cost=to_units(p["total_cost"], MONEY_SCALE),
+                realized_pnl=to_units(p["realized_pnl"], MONEY_SCALE),
+                last_price=to_units(last_price, PRICE_SCALE) if last_price is not None else None
+            )
+        return state
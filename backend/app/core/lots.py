@@ -0,0 +1,116 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Literal, Optional, Tuple
+
+from app.core.ledger import LedgerState, PositionState, BUY_TYPES, SELL_TYPES, CASH_ASSET
+from app.core.metrics import record_replayed
+
+AVERAGE = "average"
+FIFO = "fifo"
+LIFO = "lifo"
+SPECIFIC = "specific"
+
+# Methods tracked lot by lot in the `lots` table; average cost comes from `positions`
+LOT_METHODS = (FIFO, LIFO, SPECIFIC)
+
+CostBasisMethod = Literal["average", "fifo", "lifo", "specific"]
+LotMethod = Literal["fifo", "lifo", "specific"]
+
+
+@dataclass(slots=True)
+class LotState:
+    """
+    Open remainder of one buy, identified by the buy's transaction id, in fixed-point minor units.
+    """
+    transaction_id: int
+    date: datetime
+    amount: int # Quantity units
+    cost: int # Money units, fee included
+
+
+class LotBook:
+    """
+    Open lots per asset under one cost-basis method. Each asset's lots live in a dict keyed
+    by transaction id in acquisition order, which serves as both a deque (oldest and newest
+    lot at either end) and an index (a specific lot by id), all in O(1).
+    """
+
+    def __init__(self, method: str) -> None:
+        self.method = method
+        self.lots: Dict[str, Dict[int, LotState]] = defaultdict(dict)
+
+    def add(self, asset: str, lot: LotState) -> None:
+        self.lots[asset][lot.transaction_id] = lot
+
+    def sell(self, asset: str, amount: int, lot_id: Optional[int] = None) -> int:
+        """
+        Takes `amount` out of the asset's open lots and returns the cost basis removed.
+        FIFO takes the oldest lots first and LIFO the newest. The specific method starts
+        with lot `lot_id` and takes anything beyond it (or all of it, for an unknown lot) first-in first-out.
+        """
+        lots = self.lots[asset]
+        removed = 0
+        if self.method == SPECIFIC and lot_id in lots:
+            taken, cost = self._take(lots, lot_id, amount)
+            amount -= taken
+            removed += cost
+
+        while amount > 0 and lots:
+            lot_id = next(reversed(lots)) if self.method == LIFO else next(iter(lots))
+            taken, cost = self._take(lots, lot_id, amount)
+            amount -= taken
+            removed += cost
+        return removed
+
+    @staticmethod
+    def _take(lots: Dict[int, LotState], lot_id: int, amount: int) -> Tuple[int, int]:
+        lot = lots[lot_id]
+        if amount >= lot.amount:
+            del lots[lot_id]
+            return lot.amount, lot.cost
+
+        # Partial lot: cost in proportion to the amount, rounded half up
+        cost = (2 * lot.cost * amount + lot.amount) // (2 * lot.amount)
+        lot.amount -= amount
+        lot.cost -= cost
+        return amount, cost
+
+    def replay(self, rows: Iterable[Tuple[int, datetime, str, str, int, int, int, Optional[int]]]) -> None:
+        """
+        Applies transactions given as (id, date, type, asset, amount, value, fee, lot_id) in minor units,
+        with `value` as in LedgerState.replay_units.
+        """
+        count = 0
+        for count, (transaction_id, date, type_, asset, amount, value, fee, lot_id) in enumerate(rows, 1):
+            if asset == CASH_ASSET:
+                continue
+            if type_ in BUY_TYPES:
+                self.lots[asset][transaction_id] = LotState(transaction_id, date, amount, value + fee)
+            elif type_ in SELL_TYPES:
+                self.sell(asset, amount, lot_id)
+        record_replayed(count)
+
+    def open_costs(self) -> Dict[str, int]:
+        return {asset: sum(lot.cost for lot in lots.values()) for asset, lots in self.lots.items() if lots}
+
+
+def restate(state: LedgerState, open_costs: Dict[str, int]) -> LedgerState:
+    """
+    Re-expresses an average-cost state under a lot method, given each asset's open lot cost.
+    Purchase costs and sale proceeds do not depend on the method, so realized PnL moves by
+    exactly the difference in remaining cost basis; no history has to be replayed.
+    """
+    restated = LedgerState(cash=dict(state.cash))
+    for asset, p in state.positions.items():
+        cost = open_costs.get(asset, 0)
+        restated.positions[asset] = PositionState(
+            asset=asset,
+            ticker=p.ticker,
+            currency=p.currency,
+            amount=p.amount,
+            total_cost=cost,
+            realized_pnl=p.realized_pnl - p.total_cost + cost,
+            last_price=p.last_price
+        )
+    return restated
@@ -0,0 +1,301 @@
+import cProfile
+import io
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type, TypeVar, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+T = TypeVar("T")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_LIMIT = 30 # Functions listed in a profile report
+QUERY_START_KEY = "metrics_query_start"
+
+
+@dataclass(slots=True)
+class RequestStats:
+    """
+    Work done on behalf of one request. Set in a context variable by MetricsMiddleware,
+    which Starlette's threadpool and SQLAlchemy's async greenlets both inherit, so the
+    engine events and replay loops can add to it from wherever the request runs.
+    """
+    statements: int = 0
+    db_seconds: float = 0.0
+    replayed_rows: int = 0
+    profiler: Optional[cProfile.Profile] = None
+    # statement -> [count, seconds], only collected while profiling
+    queries: Optional[Dict[str, List[float]]] = None
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+# cProfile cannot run two profilers at once on every Python version, so profiled calls take turns
+_profile_lock = threading.Lock()
+
+
+def record_replayed(rows: int) -> None:
+    """
+    Counts ledger rows a replay loop materialized. Called once per loop, not per row.
+    """
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.replayed_rows += rows
+
+
+def profiled(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Runs `fn` under the request's profiler when one was asked for. The profiler is
+    enabled on the thread that does the work (the threadpool worker or the greenlet),
+    not on the event loop that only awaits it.
+    """
+    stats = _request_stats.get()
+    if stats is None or stats.profiler is None:
+        return fn(*args, **kwargs)
+    with _profile_lock:
+        return stats.profiler.runcall(fn, *args, **kwargs)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault(QUERY_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info[QUERY_START_KEY].pop()
+    stats = _request_stats.get()
+    if stats is None:
+        return
+    stats.statements += 1
+    stats.db_seconds += elapsed
+    if stats.queries is not None:
+        query = stats.queries.setdefault(statement, [0, 0.0])
+        query[0] += 1
+        query[1] += elapsed
+
+
+def instrument_engine(engine: Union[Engine, Type[Engine]]) -> None:
+    """
+    Times every statement `engine` executes (pass `AsyncEngine.sync_engine` for the async
+    one, or the Engine class for every engine).
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+
+
+def _histogram_lines(name: str, labels: str, h: Histogram) -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip([*h.buckets, "+Inf"], h.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f"{name}_sum{{{labels}}} {h.sum}")
+    lines.append(f"{name}_count{{{labels}}} {h.count}")
+    return lines
+
+
+class MetricsRegistry:
+    """
+    Per-route request and background job metrics, rendered in the Prometheus text exposition format.
+    Routes are labelled by their endpoint's name rather than the request path, so
+    cardinality stays bounded.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, str, int], int] = {}
+        self._latency: Dict[Tuple[str, str], Histogram] = {}
+        self._db_seconds: Dict[Tuple[str, str], Histogram] = {}
+        self._statements: Dict[Tuple[str, str], Histogram] = {}
+        self._replayed_rows: Dict[Tuple[str, str], int] = {}
+        self._job_seconds: Dict[str, Histogram] = {}
+        self._job_failures: Dict[str, int] = {}
+        self._job_gauges: Dict[str, Tuple[int, int]] = {} # job -> (queued, running)
+
+    def observe(self, method: str, handler: str, status: int, seconds: float, stats: RequestStats) -> None:
+        key = (method, handler)
+        with self._lock:
+            self._requests[(method, handler, status)] = self._requests.get((method, handler, status), 0) + 1
+            if key not in self._latency:
+                self._latency[key] = Histogram(LATENCY_BUCKETS)
+                self._db_seconds[key] = Histogram(LATENCY_BUCKETS)
+                self._statements[key] = Histogram(STATEMENT_BUCKETS)
+                self._replayed_rows[key] = 0
+            self._latency[key].observe(seconds)
+            self._db_seconds[key].observe(stats.db_seconds)
+            self._statements[key].observe(stats.statements)
+            self._replayed_rows[key] += stats.replayed_rows
+
+    def observe_job(self, job: str, seconds: float, failed: bool) -> None:
+        with self._lock:
+            if job not in self._job_seconds:
+                self._job_seconds[job] = Histogram(LATENCY_BUCKETS)
+                self._job_failures[job] = 0
+            self._job_seconds[job].observe(seconds)
+            self._job_failures[job] += failed
+
+    def set_job_gauges(self, job: str, queued: int, running: int) -> None:
+        with self._lock:
+            self._job_gauges[job] = (queued, running)
+
+    def reset(self) -> None:
+        with self._lock:
+            for metric in (
+                self._requests, self._latency, self._db_seconds, self._statements, self._replayed_rows,
+                self._job_seconds, self._job_failures
+            ):
+                metric.clear()
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            lines += [
+                "# HELP portfolio_http_requests_total Requests handled, by endpoint and status.",
+                "# TYPE portfolio_http_requests_total counter",
+            ]
+            for (method, handler, status), count in sorted(self._requests.items()):
+                lines.append(f"portfolio_http_requests_total{{{_labels(method=method, handler=handler, status=str(status))}}} {count}")
+
+            for name, help_, histograms in (
+                ("portfolio_http_request_duration_seconds", "Request latency.", self._latency),
+                ("portfolio_db_seconds_per_request", "Time spent executing SQL per request.", self._db_seconds),
+                ("portfolio_db_statements_per_request", "SQL statements executed per request.", self._statements),
+            ):
+                lines += [f"# HELP {name} {help_}", f"# TYPE {name} histogram"]
+                for (method, handler), h in sorted(histograms.items()):
+                    lines += _histogram_lines(name, _labels(method=method, handler=handler), h)
+
+            lines += [
+                "# HELP portfolio_replay_rows_total Ledger rows materialized by replay loops.",
+                "# TYPE portfolio_replay_rows_total counter",
+            ]
+            for (method, handler), rows in sorted(self._replayed_rows.items()):
+                lines.append(f"portfolio_replay_rows_total{{{_labels(method=method, handler=handler)}}} {rows}")
+
+            lines += [
+                "# HELP portfolio_job_duration_seconds Background job run time.",
+                "# TYPE portfolio_job_duration_seconds histogram",
+            ]
+            for job, h in sorted(self._job_seconds.items()):
+                lines += _histogram_lines("portfolio_job_duration_seconds", _labels(job=job), h)
+            lines += [
+                "# HELP portfolio_job_failures_total Background job runs that raised.",
+                "# TYPE portfolio_job_failures_total counter",
+            ]
+            for job, failures in sorted(self._job_failures.items()):
+                lines.append(f"portfolio_job_failures_total{{{_labels(job=job)}}} {failures}")
+            for name, help_, index in (
+                ("portfolio_jobs_queued", "Background job runs waiting (debounced or for a free slot).", 0),
+                ("portfolio_jobs_running", "Background job runs in progress.", 1),
+            ):
+                lines += [f"# HELP {name} {help_}", f"# TYPE {name} gauge"]
+                for job, gauges in sorted(self._job_gauges.items()):
+                    lines.append(f"{name}{{{_labels(job=job)}}} {gauges[index]}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+def profile_report(method: str, path: str, status: int, seconds: float, stats: RequestStats) -> str:
+    """
+    Plain-text breakdown of one request: totals, SQL grouped by statement (repeated
+    statements point at N+1 queries) and the slowest functions by cumulative time.
+    """
+    out = io.StringIO()
+    out.write(f"{method} {path} -> {status}\n")
+    out.write(
+        f"wall {seconds * 1000:.1f} ms, db {stats.db_seconds * 1000:.1f} ms in {stats.statements} statements, "
+        f"{stats.replayed_rows} rows replayed\n\n"
+    )
+    out.write(f"{'count':>7}{'total ms':>11}  statement\n")
+    queries = sorted((stats.queries or {}).items(), key=lambda q: q[1][1], reverse=True)
+    for statement, (count, total) in queries:
+        out.write(f"{count:>7}{total * 1000:>11.2f}  {' '.join(statement.split())[:200]}\n")
+    out.write("\n")
+    if stats.profiler is not None and stats.profiler.getstats():
+        pstats.Stats(stats.profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_LIMIT)
+    return out.getvalue()
+
+
+class MetricsMiddleware:
+    """
+    Records latency, SQL statements, DB time and replayed rows per route, and adds a
+    Server-Timing header. With `profiling` on, a request sent with `X-Profile: 1` is
+    answered with its profile report (same status code) instead of its body.
+    """
+
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry = metrics, profiling: bool = False) -> None:
+        self.app = app
+        self.registry = registry
+        self.profiling = profiling
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = self.profiling and dict(scope["headers"]).get(PROFILE_HEADER, b"").lower() in (b"1", b"true")
+        stats = RequestStats(profiler=cProfile.Profile() if profile else None, queries={} if profile else None)
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if profile:
+                    return
+                elapsed = (time.perf_counter() - start) * 1000
+                MutableHeaders(scope=message).append(
+                    "Server-Timing",
+                    f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.statements} statements", app;dur={elapsed:.2f}'
+                )
+            elif profile:
+                return # The body is replaced by the report below
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            seconds = time.perf_counter() - start
+            handler = getattr(scope.get("route"), "name", None) or "unmatched"
+            self.registry.observe(scope["method"], handler, status, seconds, stats)
+
+        if profile:
+            report = profile_report(scope["method"], scope["path"], status, seconds, stats)
+            await PlainTextResponse(report, status_code=status)(scope, receive, send)
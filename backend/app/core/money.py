@@ -0,0 +1,83 @@
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional, Union
+
+from sqlalchemy import BigInteger, Numeric, cast, func
+
+Number = Union[int, float, Decimal]
+
+# Fixed-point scales: the ledger keeps every quantity, price and money value as an
+# integer count of these minor units, so replay is exact and uses plain int arithmetic
+QUANTITY_SCALE = 10 ** 8
+PRICE_SCALE = 10 ** 8
+MONEY_DIGITS = 4
+MONEY_SCALE = 10 ** MONEY_DIGITS
+
+# Column types matching the scales above
+Quantity = Numeric(28, 8)
+Price = Numeric(28, 8)
+Money = Numeric(28, MONEY_DIGITS)
+
+# amount units * price units -> money units
+_VALUE_DIVISOR = QUANTITY_SCALE * PRICE_SCALE // MONEY_SCALE
+
+
+def to_decimal(value: Optional[Number]) -> Decimal:
+    """
+    Exact decimal for an API or DB value. Floats go through their shortest repr,
+    so 0.1 parsed from JSON becomes Decimal('0.1'), not its binary expansion.
+    """
+    if value is None:
+        return Decimal(0)
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    return Decimal(value)
+
+
+def to_units(value: Optional[Number], scale: int) -> int:
+    """
+    Converts a value to integer minor units, rounding half away from zero.
+    """
+    if isinstance(value, int):
+        return value * scale
+    return int((to_decimal(value) * scale).to_integral_value(ROUND_HALF_UP))
+
+
+def from_units(units: int, scale: int) -> Decimal:
+    return Decimal(units) / scale
+
+
+def div_round(numerator: int, denominator: int) -> int:
+    """
+    Integer division rounded half away from zero (like SQL ROUND), for a positive denominator.
+    """
+    quotient, remainder = divmod(abs(numerator), denominator)
+    if remainder * 2 >= denominator:
+        quotient += 1
+    return quotient if numerator >= 0 else -quotient
+
+
+def trade_value(amount: int, price: int) -> int:
+    """
+    Money units of `amount` quantity units at `price` price units, rounded to the money scale.
+    """
+    return div_round(amount * price, _VALUE_DIVISOR)
+
+
+def trade_total(amount: Number, price: Number) -> Decimal:
+    """
+    `amount * price` rounded to the money scale like the ledger, for the cached `total` column.
+    """
+    return from_units(trade_value(to_units(amount, QUANTITY_SCALE), to_units(price, PRICE_SCALE)), MONEY_SCALE)
+
+
+def format_amount(units: int, scale: int) -> str:
+    # Drops trailing zeros without switching to exponent notation
+    return f"{from_units(units, scale).normalize():f}"
+
+
+def scaled(column, scale: int):
+    """
+    SQL expression for a decimal column as integer minor units, so replay loops
+    read plain ints instead of converting a Decimal per cell.
+    """
+    return cast(func.round(func.coalesce(column, 0) * scale), BigInteger)
@@ -0,0 +1,170 @@
+import json
+import sqlite3
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+import httpx
+
+from app.core.cache import SnapshotCache
+from app.core.settings import PORTFOLIO_SETTINGS
+
+
+@dataclass(frozen=True)
+class Quote:
+    ticker: str
+    price: float
+    previous_close: Optional[float] = None
+    currency: Optional[str] = None
+
+
+class PriceProvider(ABC):
+    """
+    Source of market quotes. Implementations fetch many tickers per call;
+    tickers they cannot price are left out of the result.
+    """
+
+    @abstractmethod
+    def get_quotes(self, tickers: Iterable[str]) -> Dict[str, Quote]:
+        ...
+
+
+class NullPriceProvider(PriceProvider):
+    """
+    No market data: holdings stay valued at cost basis.
+    """
+
+    def get_quotes(self, tickers: Iterable[str]) -> Dict[str, Quote]:
+        return {}
+
+
+class JsonFilePriceProvider(PriceProvider):
+    """
+    Offline quotes from a JSON file: {"AAPL": {"price": 190.1, "previous_close": 188.0}, ...}.
+    The file is re-read on every call, so it can be edited while the server runs.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def get_quotes(self, tickers: Iterable[str]) -> Dict[str, Quote]:
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        return {
+            t: Quote(
+                ticker=t,
+                price=data[t]["price"],
+                previous_close=data[t].get("previous_close"),
+                currency=data[t].get("currency")
+            )
+            for t in tickers if t in data
+        }
+
+
+class SqlitePriceProvider(PriceProvider):
+    """
+    Offline quotes from a SQLite file with a table
+    quotes(ticker TEXT PRIMARY KEY, price REAL, previous_close REAL, currency TEXT).
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def get_quotes(self, tickers: Iterable[str]) -> Dict[str, Quote]:
+        tickers = list(tickers)
+        if not tickers:
+            return {}
+        placeholders = ", ".join("?" * len(tickers))
+        with sqlite3.connect(self.path) as conn:
+            rows = conn.execute(
+                f"SELECT ticker, price, previous_close, currency FROM quotes WHERE ticker IN ({placeholders})",
+                tickers
+            ).fetchall()
+        return {row[0]: Quote(*row) for row in rows}
+
+
+class YahooPriceProvider(PriceProvider):
+    """
+    Yahoo Finance chart API, the same source the frontend uses. It has no
+    multi-symbol endpoint, so one batch reuses a single keep-alive connection.
+    """
+
+    BASE_URL = "https://query1.finance.yahoo.com/v8/finance/chart"
+
+    def __init__(self, timeout: float = 5.0) -> None:
+        self.timeout = timeout
+
+    def get_quotes(self, tickers: Iterable[str]) -> Dict[str, Quote]:
+        quotes = {}
+        headers = {"User-Agent": "Mozilla/5.0"}
+        with httpx.Client(timeout=self.timeout, headers=headers) as client:
+            for ticker in tickers:
+                try:
+                    response = client.get(f"{self.BASE_URL}/{ticker}")
+                    response.raise_for_status()
+                    meta = response.json()["chart"]["result"][0]["meta"]
+                except (httpx.HTTPError, KeyError, IndexError, TypeError, ValueError):
+                    continue
+                quotes[ticker] = Quote(
+                    ticker=ticker,
+                    price=meta["regularMarketPrice"],
+                    previous_close=meta.get("previousClose") or meta.get("chartPreviousClose"),
+                    currency=meta.get("currency")
+                )
+        return quotes
+
+
+# Cached marker for tickers the provider could not price, so they are not re-fetched until the TTL expires
+_UNPRICED = object()
+
+
+class QuoteCache:
+    """
+    Per-ticker TTL cache in front of a PriceProvider. Misses are fetched
+    together in one provider call.
+    """
+
+    def __init__(self, provider: PriceProvider, maxsize: int, ttl: float) -> None:
+        self.provider = provider
+        self._entries = SnapshotCache(maxsize=maxsize, ttl=ttl)
+
+    def get_quotes(self, tickers: Iterable[str]) -> Dict[str, Quote]:
+        quotes = {}
+        missing = []
+        for ticker in dict.fromkeys(tickers):
+            entry = self._entries.get(ticker)
+            if entry is None:
+                missing.append(ticker)
+            elif entry is not _UNPRICED:
+                quotes[ticker] = entry
+
+        if missing:
+            fetched = self.provider.get_quotes(missing)
+            for ticker in missing:
+                self._entries.put(ticker, fetched.get(ticker, _UNPRICED))
+            quotes.update(fetched)
+        return quotes
+
+    def invalidate(self) -> None:
+        self._entries.invalidate()
+
+    def stats(self) -> Dict[str, int]:
+        return self._entries.stats()
+
+
+def build_price_provider() -> PriceProvider:
+    source = PORTFOLIO_SETTINGS.price_source
+    if PORTFOLIO_SETTINGS.price_provider == "file":
+        if source.endswith((".db", ".sqlite", ".sqlite3")):
+            return SqlitePriceProvider(source)
+        return JsonFilePriceProvider(source)
+    if PORTFOLIO_SETTINGS.price_provider == "yahoo":
+        return YahooPriceProvider()
+    return NullPriceProvider()
+
+
+quote_cache = QuoteCache(
+    build_price_provider(),
+    maxsize=PORTFOLIO_SETTINGS.quote_cache_size,
+    ttl=PORTFOLIO_SETTINGS.quote_cache_ttl
+)
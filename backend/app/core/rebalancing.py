@@ -0,0 +1,348 @@
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+# Drift (in percentage points) below which no trade is suggested
+DRIFT_THRESHOLD = 1.0
+# Drift above which a trade is marked urgent
+URGENT_DRIFT = 5.0
+
+# Urgency codes in RebalancePlan.urgency
+URGENCY_NONE = 0
+URGENCY_NORMAL = 1
+URGENCY_HIGH = 2
+
+
+@dataclass(frozen=True)
+class RebalancePlan:
+    """
+    Rebalancing of P portfolios against S target scenarios over A assets.
+    Per-scenario arrays have shape (P, S, A); percentages are 0-100.
+    """
+    totals: np.ndarray # (P,) portfolio value
+    weights: np.ndarray # (P, A) current weight
+    drift: np.ndarray # (P, S, A) target weight - current weight
+    notional: np.ndarray # (P, S, A) signed trade value, > 0 buy, < 0 sell, 0 within threshold
+    urgency: np.ndarray # (P, S, A) URGENCY_* codes
+
+
+def rebalance(
+    values: np.ndarray,
+    targets: np.ndarray,
+    pairwise: bool = False,
+    threshold: float = DRIFT_THRESHOLD,
+    urgent: float = URGENT_DRIFT
+) -> RebalancePlan:
+    """
+    Computes weights, drift, trade notionals and urgency for every portfolio in one shot.
+
+    `values` is (P, A) market value per asset. `targets` is (S, A) target percentages;
+    every portfolio is checked against every scenario, or with `pairwise` row i of
+    `targets` applies to portfolio i only (S == P, result has S = 1).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    targets = np.asarray(targets, dtype=np.float64)
+    if values.ndim != 2 or targets.ndim != 2 or values.shape[1] != targets.shape[1]:
+        raise ValueError(f"values {values.shape} and targets {targets.shape} must be 2-D over the same assets")
+    if pairwise and targets.shape[0] != values.shape[0]:
+        raise ValueError(f"pairwise needs one target row per portfolio, got {targets.shape[0]} for {values.shape[0]}")
+
+    totals = values.sum(axis=1)
+    safe_totals = np.where(totals > 0, totals, 1.0)[:, None]
+    weights = np.where(totals[:, None] > 0, values / safe_totals * 100, 0.0)
+
+    # (P, S, A): broadcast portfolios against scenarios
+    target_weights = targets[:, None, :] if pairwise else targets[None, :, :]
+    drift = target_weights - weights[:, None, :]
+    magnitude = np.abs(drift)
+
+    actionable = magnitude >= threshold
+    notional = np.where(actionable, drift / 100 * totals[:, None, None], 0.0)
+    urgency = np.where(
+        actionable,
+        np.where(magnitude > urgent, URGENCY_HIGH, URGENCY_NORMAL),
+        URGENCY_NONE
+    ).astype(np.int8)
+
+    return RebalancePlan(
+        totals=totals,
+        weights=weights,
+        drift=drift,
+        notional=notional,
+        urgency=urgency
+    )
+
+
+# Trade solvers of solve_trades
+GREEDY = "greedy"
+EXACT = "exact"
+# Largest problem `auto` hands to the exact search; beyond it the greedy solver is used
+EXACT_MAX_ASSETS = 10
+# Whole lots tried on either side of each asset's ideal trade
+LOT_RADIUS = 1
+
+
+@dataclass(frozen=True)
+class TradeConstraints:
+    """
+    Execution constraints of a rebalance. Amounts are in the portfolio's currency,
+    percentages are 0-100.
+    """
+    fee: float = 0.0 # Flat fee per trade
+    fee_rate: float = 0.0 # Fee as a fraction of the traded value
+    min_trade: float = 0.0 # Smallest trade value worth placing
+    cash_buffer: float = 0.0 # Cash to keep after the trades, % of the portfolio
+    trade_penalty: float = 0.1 # Weight error (%p) a trade must remove to be placed
+
+
+@dataclass(frozen=True)
+class TradeSolution:
+    """
+    Whole-lot trades over A assets and the portfolio they leave behind.
+    Weights are % of the value after fees; errors are Σ|weight - target| over assets and cash, in %p.
+    """
+    quantities: np.ndarray # (A,) signed units, > 0 buy, < 0 sell
+    values: np.ndarray # (A,) signed trade value
+    fees: float
+    cash: float # Cash after trades and fees
+    weights: np.ndarray # (A,)
+    cash_weight: float
+    error: float
+    initial_error: float
+    trades: int
+    solver: str
+
+
+class _Problem:
+    """
+    Trade search space shared by both solvers. The objective is measured on the pre-trade
+    total, so each asset's error depends on its own trade only and the coupling between
+    assets is the cash they all draw on (sells fund buys, fees drain it).
+    """
+
+    def __init__(self, units, prices, lot_sizes, cash, targets, cash_target, other_value, constraints):
+        self.units = np.asarray(units, dtype=np.float64)
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.lot_sizes = np.asarray(lot_sizes, dtype=np.float64)
+        self.targets = np.asarray(targets, dtype=np.float64)
+        shapes = {self.units.shape, self.prices.shape, self.lot_sizes.shape, self.targets.shape}
+        if len(shapes) != 1 or self.units.ndim != 1:
+            raise ValueError("units, prices, lot sizes and targets must be 1-D over the same assets")
+        if np.any(self.prices <= 0) or np.any(self.lot_sizes <= 0) or np.any(self.units < 0):
+            raise ValueError("prices and lot sizes must be positive and holdings non-negative")
+
+        self.cash = float(cash)
+        self.constraints = constraints
+        targeted = self.targets.sum() + (cash_target or 0.0)
+        if targeted > 100 + 1e-9 or np.any(self.targets < 0):
+            raise ValueError(f"target weights must be non-negative and add up to at most 100%, got {targeted:.2f}%")
+        self.values = self.units * self.prices
+        self.total = self.cash + self.values.sum() + other_value
+        if self.total <= 0:
+            raise ValueError("portfolio has no value to rebalance")
+        if cash_target is None:
+            # Holdings left out of the rebalance keep their weight; cash takes the rest
+            cash_target = max(100.0 - self.targets.sum() - other_value / self.total * 100, 0.0)
+        self.cash_target = float(cash_target)
+        self.min_cash = constraints.cash_buffer / 100 * self.total
+
+    def fee(self, value: float) -> float:
+        return self.constraints.fee + self.constraints.fee_rate * abs(value) if value else 0.0
+
+    def asset_error(self, i: int, quantity: float) -> float:
+        return abs((self.values[i] + quantity * self.prices[i]) / self.total * 100 - self.targets[i])
+
+    def cash_error(self, cash: float) -> float:
+        return abs(cash / self.total * 100 - self.cash_target)
+
+    def candidates(self, i: int, cash_cap: Optional[float] = None) -> List[float]:
+        """
+        Signed unit quantities worth considering for asset i: no trade, whole lots within
+        LOT_RADIUS of the ideal trade, selling out, and (for buys) the most `cash_cap` affords.
+        """
+        lot, price, held = self.lot_sizes[i], self.prices[i], self.units[i]
+        ideal = (self.targets[i] / 100 * self.total - self.values[i]) / price / lot
+        lots = set(range(int(np.floor(ideal)) - LOT_RADIUS, int(np.ceil(ideal)) + LOT_RADIUS + 1))
+        if cash_cap is not None and ideal > 0:
+            unit_cost = lot * price * (1 + self.constraints.fee_rate)
+            lots.add(int(np.floor(max(cash_cap - self.constraints.fee, 0) / unit_cost)))
+
+        quantities = {0.0}
+        for k in lots:
+            quantity = k * lot
+            if quantity < -held:
+                quantity = -held # Sell out, even when the holding is not a whole number of lots
+            if quantity and abs(quantity * price) >= self.constraints.min_trade:
+                quantities.add(float(quantity))
+        if self.targets[i] == 0 and held > 0 and held * price >= self.constraints.min_trade:
+            quantities.add(float(-held))
+        return sorted(quantities)
+
+    def solution(self, quantities: np.ndarray, solver: str) -> TradeSolution:
+        trade_values = quantities * self.prices
+        fees = sum(self.fee(v) for v in trade_values)
+        cash = self.cash - trade_values.sum() - fees
+        total = self.total - fees
+        weights = (self.values + trade_values) / total * 100
+        cash_weight = cash / total * 100
+        return TradeSolution(
+            quantities=quantities,
+            values=trade_values,
+            fees=fees,
+            cash=cash,
+            weights=weights,
+            cash_weight=cash_weight,
+            error=float(np.abs(weights - self.targets).sum() + abs(cash_weight - self.cash_target)),
+            initial_error=float(
+                np.abs(self.values / self.total * 100 - self.targets).sum() + self.cash_error(self.cash)
+            ),
+            trades=int(np.count_nonzero(quantities)),
+            solver=solver
+        )
+
+
+def _solve_greedy(problem: _Problem) -> np.ndarray:
+    """
+    Sells first, most overweight first, each taken when it cuts the asset's own error by
+    more than the trade penalty (its proceeds are meant to fund the buys); then buys, most
+    underweight first, each taking the lot count nearest its gap that lowers the objective
+    most given the cash left. A last pass undoes sells whose proceeds went unused. O(A log A).
+    """
+    gaps = problem.targets / 100 * problem.total - problem.values
+    order = sorted(range(len(gaps)), key=lambda i: (gaps[i] > 0, -abs(gaps[i])))
+    quantities = np.zeros(len(gaps))
+    cash = problem.cash
+    penalty = problem.constraints.trade_penalty
+
+    for i in order:
+        buying = gaps[i] > 0
+        base = problem.asset_error(i, 0.0) + (problem.cash_error(cash) if buying else 0.0)
+        best, best_gain = 0.0, 0.0
+        for quantity in problem.candidates(i, cash_cap=cash - problem.min_cash):
+            if (quantity > 0) != buying or not quantity:
+                continue
+            value = quantity * problem.prices[i]
+            if buying and value > gaps[i] + problem.lot_sizes[i] * problem.prices[i] / 2:
+                continue # Overshooting only parks cash another buy could use
+            after = cash - value - problem.fee(value)
+            if buying and after < problem.min_cash:
+                continue
+            gain = base - problem.asset_error(i, quantity) - (problem.cash_error(after) if buying else 0.0) - penalty
+            if gain > best_gain:
+                best, best_gain = quantity, gain
+        if best:
+            quantities[i] = best
+            value = best * problem.prices[i]
+            cash -= value + problem.fee(value)
+
+    # Sells whose proceeds were not needed only move the error into cash
+    for i in order:
+        if quantities[i] >= 0:
+            continue
+        value = quantities[i] * problem.prices[i]
+        undone = cash + value + problem.fee(value)
+        if undone < problem.min_cash:
+            continue
+        keep = problem.asset_error(i, quantities[i]) + penalty + problem.cash_error(cash)
+        if problem.asset_error(i, 0.0) + problem.cash_error(undone) <= keep:
+            quantities[i] = 0.0
+            cash = undone
+    return quantities
+
+
+def _solve_exact(problem: _Problem, incumbent: np.ndarray) -> np.ndarray:
+    """
+    Depth-first branch and bound over every combination of the assets' candidate trades,
+    starting from the greedy result. Optimal over that candidate set; exponential in the
+    number of assets, so meant for small portfolios.
+    """
+    n = len(problem.targets)
+    penalty = problem.constraints.trade_penalty
+    max_cash = problem.cash + sum(
+        max(-q * problem.prices[i] - problem.fee(q * problem.prices[i]), 0.0)
+        for i in range(n) for q in problem.candidates(i) if q < 0
+    )
+
+    # Biggest gaps first so early choices dominate the bound
+    gaps = np.abs(problem.targets / 100 * problem.total - problem.values)
+    order = sorted(range(n), key=lambda i: -gaps[i])
+    options = []
+    for i in order:
+        choices = []
+        for q in problem.candidates(i, cash_cap=max_cash - problem.min_cash):
+            value = q * problem.prices[i]
+            choices.append((problem.asset_error(i, q) + (penalty if q else 0.0), q, value + problem.fee(value)))
+        choices.sort()
+        options.append(choices)
+
+    # bound[k]: least objective the assets from position k on can add; inflow[k]: most cash their sells can raise
+    bound = [0.0] * (n + 1)
+    inflow = [0.0] * (n + 1)
+    for k in range(n - 1, -1, -1):
+        bound[k] = bound[k + 1] + options[k][0][0]
+        inflow[k] = inflow[k + 1] + max(max(-cost for _, _, cost in options[k]), 0.0)
+
+    def objective(quantities: np.ndarray) -> float:
+        cash = problem.cash - sum(q * problem.prices[i] + problem.fee(q * problem.prices[i]) for i, q in enumerate(quantities))
+        if cash < problem.min_cash - 1e-9:
+            return float("inf")
+        return sum(
+            problem.asset_error(i, q) + (penalty if q else 0.0) for i, q in enumerate(quantities)
+        ) + problem.cash_error(cash)
+
+    best = {"value": objective(incumbent), "quantities": incumbent.copy()}
+    chosen = [0.0] * n
+
+    def search(k: int, cash: float, partial: float) -> None:
+        if partial + bound[k] >= best["value"] - 1e-12 or cash + inflow[k] < problem.min_cash - 1e-9:
+            return
+        if k == n:
+            if cash >= problem.min_cash - 1e-9:
+                value = partial + problem.cash_error(cash)
+                if value < best["value"] - 1e-12:
+                    quantities = np.zeros(n)
+                    for position, i in enumerate(order):
+                        quantities[i] = chosen[position]
+                    best["value"], best["quantities"] = value, quantities
+            return
+        for error, quantity, cost in options[k]:
+            chosen[k] = quantity
+            search(k + 1, cash - cost, partial + error)
+        chosen[k] = 0.0
+
+    search(0, problem.cash, 0.0)
+    return best["quantities"]
+
+
+def solve_trades(
+    units: Sequence[float],
+    prices: Sequence[float],
+    lot_sizes: Sequence[float],
+    cash: float,
+    targets: Sequence[float],
+    cash_target: Optional[float] = None,
+    other_value: float = 0.0,
+    constraints: TradeConstraints = TradeConstraints(),
+    solver: str = "auto"
+) -> TradeSolution:
+    """
+    Finds whole-lot trades that bring the portfolio closest to `targets` (% per asset)
+    with the fewest trades, net of fees and keeping the cash buffer. `other_value` is held
+    outside the rebalanced assets and keeps its weight; the cash target, unless given, is
+    what the asset targets and those holdings leave.
+
+    `solver` is GREEDY, EXACT, or "auto" (exact up to EXACT_MAX_ASSETS assets).
+    """
+    problem = _Problem(units, prices, lot_sizes, cash, targets, cash_target, other_value, constraints)
+    if solver == "auto":
+        solver = EXACT if len(problem.targets) <= EXACT_MAX_ASSETS else GREEDY
+    if solver not in (GREEDY, EXACT):
+        raise ValueError(f"unknown solver {solver!r}")
+    if solver == EXACT and len(problem.targets) > EXACT_MAX_ASSETS:
+        raise ValueError(f"exact solver takes at most {EXACT_MAX_ASSETS} assets, got {len(problem.targets)}")
+
+    quantities = _solve_greedy(problem)
+    if solver == EXACT:
+        quantities = _solve_exact(problem, quantities)
+    return problem.solution(quantities, solver)
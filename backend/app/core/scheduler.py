@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.metrics import MetricsRegistry, metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Scheduler:
+    """
+    Background jobs run off the request path, started and stopped by the app's lifespan.
+    Job functions are sync and run on Starlette's threadpool, at most `concurrency` at a
+    time; the rest wait in the queue.
+
+    - Periodic jobs run every `interval` seconds.
+    - Triggered jobs run once per key (e.g. a portfolio id) after a burst of triggers:
+      `debounce` seconds after the last one, but no later than `max_delay` after the first.
+    - `submit` queues a one-off run, e.g. warm-ups at startup.
+
+    Queue depth, running jobs, durations and failures are reported per job to `registry`.
+    """
+
+    def __init__(
+        self, concurrency: int, debounce: float, max_delay: float, registry: MetricsRegistry = metrics
+    ) -> None:
+        self.concurrency = concurrency
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.registry = registry
+        self._periodic: Dict[str, Tuple[float, Callable[[], Any]]] = {}
+        self._triggered: Dict[str, Callable[[Hashable], Any]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks: set = set()
+        # (job, key) -> (first trigger, timer) of debounced runs not started yet
+        self._pending: Dict[Tuple[str, Hashable], Tuple[float, asyncio.TimerHandle]] = {}
+        self._queued: Dict[str, int] = {}
+        self._running: Dict[str, int] = {}
+
+    def every(self, name: str, interval: float, fn: Callable[[], Any]) -> None:
+        """
+        Runs `fn` every `interval` seconds, the first time one interval after start.
+        """
+        self._periodic[name] = (interval, fn)
+
+    def on_trigger(self, name: str, fn: Callable[[Hashable], Any]) -> None:
+        """
+        Registers `fn(key)` as the debounced job `name`; see trigger.
+        """
+        self._triggered[name] = fn
+
+    @property
+    def started(self) -> bool:
+        return self._loop is not None
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        for name, (interval, fn) in self._periodic.items():
+            self._spawn(self._every(name, interval, fn))
+
+    async def stop(self) -> None:
+        if self._loop is None:
+            return
+        for _, timer in self._pending.values():
+            timer.cancel()
+        self._pending.clear()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop = self._slots = None
+
+    def submit(self, name: str, fn: Callable[..., Any], *args: Any) -> None:
+        """
+        Queues one run of `fn(*args)`; safe to call from any thread.
+        """
+        self._call_soon(lambda: self._spawn(self._run(name, fn, *args)))
+
+    def trigger(self, name: str, key: Hashable) -> None:
+        """
+        Asks for a run of the job `name` for `key`, folding the triggers of a burst into
+        one run; safe to call from any thread.
+        """
+        self._call_soon(lambda: self._debounce(name, key))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Per job: runs waiting (debounced or for a free slot) and running.
+        """
+        pending: Dict[str, int] = {}
+        for name, _ in self._pending:
+            pending[name] = pending.get(name, 0) + 1
+        names = sorted({*self._periodic, *self._triggered, *self._queued, *self._running})
+        return {
+            name: {
+                "queued": pending.get(name, 0) + self._queued.get(name, 0),
+                "running": self._running.get(name, 0)
+            }
+            for name in names
+        }
+
+    def _call_soon(self, callback: Callable[[], Any]) -> None:
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(callback)
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _debounce(self, name: str, key: Hashable) -> None:
+        now = self._loop.time()
+        first, timer = self._pending.get((name, key), (now, None))
+        if timer is not None:
+            timer.cancel()
+        at = min(now + self.debounce, first + self.max_delay)
+        self._pending[(name, key)] = (first, self._loop.call_at(at, self._fire, name, key))
+        self._report(name)
+
+    def _fire(self, name: str, key: Hashable) -> None:
+        self._pending.pop((name, key), None)
+        self._spawn(self._run(name, self._triggered[name], key))
+
+    async def _every(self, name: str, interval: float, fn: Callable[[], Any]) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self._run(name, fn)
+
+    async def _run(self, name: str, fn: Callable[..., Any], *args: Any) -> None:
+        self._queued[name] = self._queued.get(name, 0) + 1
+        self._report(name)
+        started = False
+        try:
+            async with self._slots:
+                started = True
+                self._queued[name] -= 1
+                self._running[name] = self._running.get(name, 0) + 1
+                self._report(name)
+                start = time.perf_counter()
+                failed = False
+                try:
+                    await run_in_threadpool(fn, *args)
+                except Exception:
+                    failed = True
+                    logger.exception("Background job %s %s failed; it runs again when next due", name, args)
+                finally:
+                    self._running[name] -= 1
+                    self.registry.observe_job(name, time.perf_counter() - start, failed)
+        finally:
+            if not started: # Cancelled while waiting for a slot
+                self._queued[name] -= 1
+            self._report(name)
+
+    def _report(self, name: str) -> None:
+        stats = self.stats().get(name, {"queued": 0, "running": 0})
+        self.registry.set_job_gauges(name, stats["queued"], stats["running"])
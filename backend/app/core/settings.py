@@ -0,0 +1,38 @@
+from typing import Literal
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+class PortfolioSettings(BaseSettings):
+    snapshot_cache_size: int = 32
+    snapshot_cache_ttl: float = 30.0
+    response_cache_size: int = 256 # Serialized summary/holdings/allocation bodies, keyed by ETag
+    response_cache_ttl: float = 300.0
+    checkpoint_interval: int = 1000 # Write a ledger checkpoint every N transactions (0 disables)
+    import_chunk_size: int = 1000 # Rows per executemany batch in bulk imports
+    aggregation_mode: Literal["positions", "sql"] = "positions" # Read balances from the positions table or aggregate transactions in SQL
+    price_provider: Literal["none", "file", "yahoo"] = "none" # Market data source; "none" values holdings at cost
+    price_source: str = "quotes.json" # JSON or SQLite (.db/.sqlite) file for the "file" provider
+    quote_cache_size: int = 1024
+    quote_cache_ttl: float = 60.0
+    base_currency: str = "KRW" # Currency summaries are reported in; FX rates are quoted in it
+    fx_cache_ttl: float = 300.0 # Seconds the in-memory FX rate table is reused before reloading
+    cost_basis_method: Literal["average", "fifo", "lifo", "specific"] = "average" # Default method for holdings and summary
+    scheduler_enabled: bool = True # Background jobs: startup warm-up, refresh after writes, periodic passes
+    scheduler_concurrency: int = 2 # Background jobs run at once; the rest queue
+    scheduler_roll_forward: bool = True # Catch daily NAV up with new transactions in background jobs
+    scheduler_roll_forward_interval: float = 5.0 # Seconds between roll-forward passes over every lagging portfolio
+    refresh_debounce: float = 0.5 # Seconds without writes before a portfolio's NAV and snapshot are refreshed
+    refresh_max_delay: float = 5.0 # ...but no later than this after the first write of a burst
+    warm_up_on_startup: bool = True # Refresh the most recently written portfolios, up to snapshot_cache_size, at startup
+    compaction_interval: float = 3600.0 # Seconds between checkpoint passes (0 disables)
+    metrics_enabled: bool = True # Per-route latency/SQL metrics on /metrics
+    profiling_enabled: bool = False # Answer requests sent with `X-Profile: 1` with a profile report (debug only)
+
+    model_config = SettingsConfigDict(
+        case_sensitive=False,
+        env_prefix="PORTFOLIO_",
+        env_file=".env",
+        extra='ignore'
+    )
+
+
+PORTFOLIO_SETTINGS = PortfolioSettings()
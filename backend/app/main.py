@@ -1,14 +1,30 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.engine import Engine
 
-from app.controllers import rebalancing_controller, transaction_controller, portfolio_controller
-from database.connection import engine, Base
-from app.models import transaction # Register models
+from app.controllers import rebalancing_controller, transaction_controller, portfolio_controller, fx_controller, metrics_controller
+from app.core.metrics import MetricsMiddleware, instrument_engine
+from app.core.settings import PORTFOLIO_SETTINGS
+from app import models # Register models
+from app.services.background_jobs import scheduler, warm_up, WARM_UP
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Schema is managed by Alembic (`alembic upgrade head`), not created at import; engines
+# are created on first use, so importing the app does not connect
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Jobs run in the background: startup does not wait for the warm-up
+    if PORTFOLIO_SETTINGS.scheduler_enabled:
+        scheduler.start()
+        if PORTFOLIO_SETTINGS.warm_up_on_startup:
+            scheduler.submit(WARM_UP, warm_up)
+    yield
+    await scheduler.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,4 +36,11 @@ app.add_middleware(
 
 app.include_router(rebalancing_controller.router, prefix="/api/v1/rebalancing", tags=["rebalancing"])
 app.include_router(transaction_controller.router, prefix="/api/v1/transactions", tags=["transactions"])
-app.include_router(portfolio_controller.router, prefix="/api/v1/portfolio", tags=["portfolio"])
\ No newline at end of file
+app.include_router(portfolio_controller.router, prefix="/api/v1/portfolio", tags=["portfolio"])
+app.include_router(fx_controller.router, prefix="/api/v1/fx", tags=["fx"])
+
+if PORTFOLIO_SETTINGS.metrics_enabled:
+    instrument_engine(Engine) # Every engine, sync or the async one's sync_engine, once created
+    # Added last so it wraps every other middleware and sees the full request
+    app.add_middleware(MetricsMiddleware, profiling=PORTFOLIO_SETTINGS.profiling_enabled)
+    app.include_router(metrics_controller.router, prefix="/metrics", include_in_schema=False)
@@ -0,0 +1,2 @@
+# Importing the package registers every table on Base.metadata (create_all, Alembic, relationships)
+from app.models import checkpoint, daily_nav, fx_rate, lot, position, projection_offset, transaction
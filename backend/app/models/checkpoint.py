@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, DateTime, Text, Index
+from sqlalchemy.sql import func
+from database.connection import Base, DEFAULT_PORTFOLIO_ID
+
+class LedgerCheckpoint(Base):
+    """
+    Serialized LedgerState as of a transaction, so replays can start here instead of from zero.
+    """
+    __tablename__ = "ledger_checkpoints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    portfolio_id = Column(Integer, nullable=False, default=DEFAULT_PORTFOLIO_ID, server_default=str(DEFAULT_PORTFOLIO_ID))
+    transaction_id = Column(Integer, nullable=False) # Last transaction included
+    transaction_date = Column(DateTime(timezone=True), nullable=False)
+    state = Column(Text, nullable=False) # JSON of LedgerState.to_dict()
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_ledger_checkpoints_portfolio_date", "portfolio_id", "transaction_date"),
+    )
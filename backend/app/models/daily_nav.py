@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, Date, UniqueConstraint
+from app.core.money import Money
+from database.connection import Base, DEFAULT_PORTFOLIO_ID
+
+class DailyNav(Base):
+    """
+    End-of-day portfolio state (UTC days), one row per portfolio and day with transactions.
+    Days without activity carry the previous row forward. Amounts are in the base currency,
+    converted at each day's FX rates.
+    """
+    __tablename__ = "daily_nav"
+
+    id = Column(Integer, primary_key=True, index=True)
+    portfolio_id = Column(Integer, nullable=False, default=DEFAULT_PORTFOLIO_ID)
+    date = Column(Date, nullable=False)
+    cash = Column(Money, nullable=False)
+    holdings_cost = Column(Money, nullable=False) # Remaining cost basis of open positions
+    market_value = Column(Money, nullable=False) # Cash + positions at their last traded price
+    realized_pnl = Column(Money, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("portfolio_id", "date", name="uq_daily_nav_portfolio_date"),
+    )
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, Date, UniqueConstraint
+from app.core.money import Price
+from database.connection import Base
+
+class FxRate(Base):
+    """
+    Daily FX rate: the price of one unit of `currency` in the base currency (PORTFOLIO_BASE_CURRENCY).
+    Shared by every portfolio.
+    """
+    __tablename__ = "fx_rates"
+
+    id = Column(Integer, primary_key=True, index=True)
+    currency = Column(String(3), nullable=False)
+    date = Column(Date, nullable=False)
+    rate = Column(Price, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("currency", "date", name="uq_fx_rates_currency_date"),
+    )
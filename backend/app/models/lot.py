@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from app.core.money import Quantity, Money
+from database.connection import Base, DEFAULT_PORTFOLIO_ID
+
+class Lot(Base):
+    """
+    Open remainder of one buy under a lot-based cost-basis method (fifo, lifo, specific),
+    kept in sync with `transactions` on every insert. Fully sold lots are deleted.
+    """
+    __tablename__ = "lots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    portfolio_id = Column(Integer, nullable=False, default=DEFAULT_PORTFOLIO_ID)
+    method = Column(String(8), nullable=False)
+    asset = Column(String(100), nullable=False)
+    transaction_id = Column(Integer, nullable=False) # The buy that opened the lot
+    date = Column(DateTime(timezone=True), nullable=False)
+    amount = Column(Quantity, nullable=False) # Units still open
+    cost = Column(Money, nullable=False) # Remaining cost basis, fee included
+
+    __table_args__ = (
+        # One method's lots of an asset in acquisition order
+        Index("ix_lots_portfolio_method_asset_date", "portfolio_id", "method", "asset", "date", "transaction_id"),
+    )
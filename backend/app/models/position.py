@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, UniqueConstraint
+from app.core.ledger import DEFAULT_CURRENCY
+from app.core.money import Quantity, Price, Money
+from database.connection import Base, DEFAULT_PORTFOLIO_ID
+
+class Position(Base):
+    """
+    Materialized per-portfolio, per-asset position, kept in sync with `transactions` on every insert.
+    Rows for asset '현금' hold the cash balance of their currency in `amount`.
+    """
+    __tablename__ = "positions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    portfolio_id = Column(Integer, nullable=False, default=DEFAULT_PORTFOLIO_ID)
+    asset = Column(String(100), nullable=False)
+    ticker = Column(String(20), nullable=True)
+    currency = Column(String(3), nullable=False, default=DEFAULT_CURRENCY, server_default=DEFAULT_CURRENCY)
+    amount = Column(Quantity, nullable=False, default=0)
+    total_cost = Column(Money, nullable=False, default=0) # Remaining cost basis
+    realized_pnl = Column(Money, nullable=False, default=0)
+    last_price = Column(Price, nullable=True) # Price of the latest trade
+
+    __table_args__ = (
+        UniqueConstraint("portfolio_id", "asset", "currency", name="uq_positions_portfolio_asset_currency"),
+    )
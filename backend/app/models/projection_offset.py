@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from database.connection import Base, DEFAULT_PORTFOLIO_ID
+
+class ProjectionOffset(Base):
+    """
+    How far a read model (projection) of one portfolio has consumed the ledger. Transaction
+    ids are the ledger's sequence numbers: everything up to `event_id` has been applied.
+    """
+    __tablename__ = "projection_offsets"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(32), nullable=False)
+    portfolio_id = Column(Integer, nullable=False, default=DEFAULT_PORTFOLIO_ID)
+    event_id = Column(Integer, nullable=False, default=0) # Last transaction id applied
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("name", "portfolio_id", name="uq_projection_offsets_name_portfolio"),
+    )
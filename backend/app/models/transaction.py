@@ -1,17 +1,30 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index
 from sqlalchemy.sql import func
-from database.connection import Base
+from app.core.money import Quantity, Price, Money
+from database.connection import Base, DEFAULT_PORTFOLIO_ID
 
 class Transaction(Base):
     __tablename__ = "transactions"
 
     id = Column(Integer, primary_key=True, index=True)
+    portfolio_id = Column(Integer, nullable=False, default=DEFAULT_PORTFOLIO_ID, server_default=str(DEFAULT_PORTFOLIO_ID))
     date = Column(DateTime(timezone=True), server_default=func.now())
     type = Column(String(10), nullable=False) # BUY, SELL
     asset = Column(String(100), nullable=False) # e.g., 'Apple'
     ticker = Column(String(20), nullable=True) # e.g., 'AAPL'
-    amount = Column(Float, nullable=False)
-    price = Column(Float, nullable=False)
+    amount = Column(Quantity, nullable=False) # Units, or money for deposits/withdrawals
+    price = Column(Price, nullable=False)
     currency = Column(String(3), default="KRW")
-    fee = Column(Float, default=0.0)
-    total = Column(Float, nullable=False) # Cached total (amount * price)
+    fee = Column(Money, default=0)
+    total = Column(Money, nullable=False) # Cached total (amount * price)
+    lot_id = Column(Integer, nullable=True) # SELL: buy transaction whose lot is sold first (specific identification)
+
+    # Every query is scoped to one portfolio, so portfolio_id leads each index
+    __table_args__ = (
+        # Replay / keyset pagination order
+        Index("ix_transactions_portfolio_date_id", "portfolio_id", "date", "id"),
+        # Per-asset lookups (sell validation, lot history)
+        Index("ix_transactions_portfolio_asset_date", "portfolio_id", "asset", "date"),
+        # Cash flows by type (deposit/withdrawal sums)
+        Index("ix_transactions_portfolio_type_date", "portfolio_id", "type", "date"),
+    )
@@ -0,0 +1,101 @@
+import json
+from datetime import datetime
+from typing import Annotated, Optional
+from fastapi import Depends
+from sqlalchemy.orm import Session
+from sqlalchemy import delete, func, select, tuple_
+
+from app.core.awaitable import offload
+from app.core.ledger import LedgerState
+from app.core.money import QUANTITY_SCALE, PRICE_SCALE, MONEY_SCALE, scaled
+from app.models.checkpoint import LedgerCheckpoint
+from app.models.transaction import Transaction
+from app.repositories.ledger_repository import LedgerRepository, TRADE_VALUE, CURRENCY
+from database.connection import get_db_session, session_portfolio_id
+
+# Row layout of LedgerState.replay_units, scaled to integer minor units in SQL
+REPLAY_COLUMNS = (
+    Transaction.type,
+    Transaction.asset,
+    Transaction.ticker,
+    CURRENCY,
+    scaled(Transaction.amount, QUANTITY_SCALE),
+    scaled(Transaction.price, PRICE_SCALE),
+    scaled(TRADE_VALUE, MONEY_SCALE),
+    scaled(Transaction.fee, MONEY_SCALE),
+)
+
+
+class CheckpointRepository:
+    def __init__(self, session: Annotated[Session, Depends(get_db_session)]) -> None:
+        self.session = session
+        self.portfolio_id = session_portfolio_id(session)
+
+    def latest(self, as_of: Optional[datetime] = None) -> Optional[LedgerCheckpoint]:
+        """
+        Returns the newest checkpoint, or the newest one at or before `as_of`.
+        """
+        query = self.session.query(LedgerCheckpoint).filter(LedgerCheckpoint.portfolio_id == self.portfolio_id)
+        if as_of is not None:
+            query = query.filter(LedgerCheckpoint.transaction_date <= as_of)
+        return query.order_by(
+            LedgerCheckpoint.transaction_date.desc(),
+            LedgerCheckpoint.transaction_id.desc()
+        ).first()
+
+    def pending_count(self) -> int:
+        """
+        Transactions after the newest checkpoint, i.e. the rows a restore of the head replays.
+        """
+        checkpoint = self.latest()
+        stmt = select(func.count(Transaction.id)).where(Transaction.portfolio_id == self.portfolio_id)
+        if checkpoint is not None:
+            stmt = stmt.where(
+                tuple_(Transaction.date, Transaction.id)
+                > tuple_(checkpoint.transaction_date, checkpoint.transaction_id)
+            )
+        return self.session.execute(stmt).scalar()
+
+    def save(self, state: LedgerState, tx: Transaction) -> LedgerCheckpoint:
+        checkpoint = LedgerCheckpoint(
+            portfolio_id=self.portfolio_id,
+            transaction_id=tx.id,
+            transaction_date=tx.date,
+            state=json.dumps(state.to_dict())
+        )
+        self.session.add(checkpoint)
+        self.session.flush()
+        return checkpoint
+
+    def discard_after(self, date: datetime) -> None:
+        """
+        Drops checkpoints invalidated by a transaction back-dated to `date`.
+        """
+        self.session.execute(
+            delete(LedgerCheckpoint).where(
+                LedgerCheckpoint.portfolio_id == self.portfolio_id,
+                LedgerCheckpoint.transaction_date >= date
+            )
+        )
+
+    def restore(self, as_of: Optional[datetime] = None, use_checkpoints: bool = True) -> LedgerState:
+        """
+        Loads the nearest checkpoint (at or before `as_of`) and replays only the
+        transactions after it, read into a ColumnarLedger.
+        """
+        checkpoint = self.latest(as_of) if use_checkpoints else None
+
+        criteria = []
+        if checkpoint is None:
+            state = LedgerState()
+        else:
+            state = LedgerState.from_dict(json.loads(checkpoint.state))
+            criteria.append(
+                tuple_(Transaction.date, Transaction.id)
+                > tuple_(checkpoint.transaction_date, checkpoint.transaction_id)
+            )
+        if as_of is not None:
+            criteria.append(Transaction.date <= as_of)
+
+        offload(LedgerRepository(self.session).load(*criteria, dated=False).replay, state)
+        return state
@@ -0,0 +1,80 @@
+from datetime import date
+from typing import Annotated, List, Optional
+from fastapi import Depends
+from sqlalchemy.orm import Session
+from sqlalchemy import event, select, tuple_
+
+from app.core.fx import FxRates, fx_rate_cache
+from app.core.money import to_decimal
+from app.core.settings import PORTFOLIO_SETTINGS
+from app.models.fx_rate import FxRate
+from app.schemas.fx import FxRateIn
+from database.connection import get_db_session
+
+# Session flag set by rate writes; the shared FX table is dropped again once they commit
+INVALIDATE_KEY = "fx_rates_written"
+
+
+class FxRepository:
+    def __init__(self, session: Annotated[Session, Depends(get_db_session)]) -> None:
+        self.session = session
+
+    def rates(self) -> FxRates:
+        """
+        The whole FX table as sorted in-memory arrays, shared across requests (see FxRateCache).
+        """
+        return fx_rate_cache.get(self.load)
+
+    def load(self) -> FxRates:
+        rows = self.session.execute(
+            select(FxRate.currency, FxRate.date, FxRate.rate).order_by(FxRate.currency, FxRate.date)
+        )
+        return FxRates(PORTFOLIO_SETTINGS.base_currency, rows)
+
+    def get_range(self, currency: Optional[str] = None, start: Optional[date] = None, end: Optional[date] = None) -> List[FxRate]:
+        query = self.session.query(FxRate)
+        if currency is not None:
+            query = query.filter(FxRate.currency == currency)
+        if start is not None:
+            query = query.filter(FxRate.date >= start)
+        if end is not None:
+            query = query.filter(FxRate.date <= end)
+        return query.order_by(FxRate.currency, FxRate.date).all()
+
+    def upsert(self, rates: List[FxRateIn]) -> int:
+        """
+        Inserts rates, replacing any already stored for the same currency and day.
+        """
+        latest = {(r.currency, r.date): r.rate for r in rates}
+        if not latest:
+            return 0
+
+        existing = {
+            (row.currency, row.date): row
+            for row in self.session.query(FxRate).filter(tuple_(FxRate.currency, FxRate.date).in_(list(latest)))
+        }
+        for (currency, day), rate in latest.items():
+            row = existing.get((currency, day))
+            if row is None:
+                self.session.add(FxRate(currency=currency, date=day, rate=to_decimal(rate)))
+            else:
+                row.rate = to_decimal(rate)
+        self.session.flush()
+        # Drop the table now and again after commit: a load racing the commit can still
+        # read the old committed rows, and must not be kept
+        fx_rate_cache.invalidate()
+        self.session.info[INVALIDATE_KEY] = True
+        return len(latest)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    # Savepoints commit too; only the outermost commit makes the rates visible
+    if not session.in_nested_transaction() and session.info.pop(INVALIDATE_KEY, False):
+        fx_rate_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    if not session.in_nested_transaction():
+        session.info.pop(INVALIDATE_KEY, None)
@@ -0,0 +1,92 @@
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Annotated, Any, Dict, List, Optional
+from fastapi import Depends
+from sqlalchemy.orm import Session
+from sqlalchemy import insert, delete
+
+from app.core.columnar import ColumnarLedger
+from app.core.ledger import LedgerState
+from app.core.money import MONEY_SCALE, from_units
+from app.models.daily_nav import DailyNav
+from app.models.transaction import Transaction
+from app.repositories.checkpoint_repository import CheckpointRepository
+from app.repositories.fx_repository import FxRepository
+from app.repositories.ledger_repository import LedgerRepository
+from database.connection import get_db_session, session_portfolio_id
+
+
+def utc_day(value: datetime) -> date:
+    # Naive datetimes come back from the DB already in UTC
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+class HistoryRepository:
+    def __init__(self, session: Annotated[Session, Depends(get_db_session)]) -> None:
+        self.session = session
+        self.portfolio_id = session_portfolio_id(session)
+        self.fx = FxRepository(session)
+
+    def get_range(self, start: Optional[date], end: date) -> List[DailyNav]:
+        """
+        Rows between `start` and `end` inclusive, preceded by the last row before `start`
+        so the first days of the range can be carried forward.
+        """
+        query = self._query().filter(DailyNav.date <= end)
+        if start is None:
+            return query.order_by(DailyNav.date).all()
+
+        previous = (
+            self._query()
+            .filter(DailyNav.date < start)
+            .order_by(DailyNav.date.desc())
+            .first()
+        )
+        rows = query.filter(DailyNav.date >= start).order_by(DailyNav.date).all()
+        return ([previous] if previous is not None else []) + rows
+
+    def rebuild_from(self, start: Optional[datetime] = None, ledger: Optional[ColumnarLedger] = None) -> int:
+        """
+        Recomputes the rows from the day of `start` onward (everything when None) in one
+        forward pass, starting from the newest checkpoint before that day. When rebuilding
+        everything, a `ledger` already holding the full history is replayed instead of reading it again.
+        """
+        criteria = []
+        if start is None:
+            state = LedgerState()
+            self.session.execute(delete(DailyNav).where(DailyNav.portfolio_id == self.portfolio_id))
+        else:
+            day = utc_day(start)
+            day_start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+            state = CheckpointRepository(self.session).restore(as_of=day_start - timedelta(microseconds=1))
+            self.session.execute(
+                delete(DailyNav).where(DailyNav.portfolio_id == self.portfolio_id, DailyNav.date >= day)
+            )
+            criteria.append(Transaction.date >= day_start)
+
+        if ledger is None or start is not None:
+            ledger = LedgerRepository(self.session).load(*criteria)
+        rows = []
+        for day in ledger.replay_days(state):
+            rows.append({"portfolio_id": self.portfolio_id, "date": day, **self._values(state, day)})
+
+        if rows:
+            self.session.execute(insert(DailyNav), rows)
+        return len(rows)
+
+    def _query(self):
+        return self.session.query(DailyNav).filter(DailyNav.portfolio_id == self.portfolio_id)
+
+    def _values(self, state: LedgerState, day: date) -> Dict[str, Any]:
+        """
+        End-of-day totals in the base currency, each currency converted at the rate in effect on `day`.
+        """
+        rates = self.fx.rates()
+        values = dict.fromkeys(("cash", "holdings_cost", "market_value", "realized_pnl"), 0)
+        for currency, t in state.totals().items():
+            values["cash"] += rates.convert_units(t.cash, currency, day)
+            values["holdings_cost"] += rates.convert_units(t.holdings_cost, currency, day)
+            values["market_value"] += rates.convert_units(t.marked_value, currency, day)
+            values["realized_pnl"] += rates.convert_units(t.realized_pnl, currency, day)
+        return {key: from_units(units, MONEY_SCALE) for key, units in values.items()}
@@ -0,0 +1,64 @@
+from typing import Annotated
+from fastapi import Depends
+from sqlalchemy.orm import Session
+from sqlalchemy import case, func, null, select
+
+from app.core.columnar import ColumnarLedger, NO_LOT
+from app.core.ledger import CASH_TYPES, DEFAULT_CURRENCY
+from app.core.money import Money, QUANTITY_SCALE, PRICE_SCALE, MONEY_DIGITS, MONEY_SCALE, scaled
+from app.models.transaction import Transaction
+from database.connection import get_db_session, session_portfolio_id
+
+# Cash moved by each row before fees, rounded to the money scale exactly as LedgerState.apply does
+TRADE_VALUE = func.round(
+    case(
+        (Transaction.type.in_(CASH_TYPES), Transaction.amount),
+        else_=Transaction.price * Transaction.amount
+    ),
+    MONEY_DIGITS,
+    type_=Money
+)
+
+# Rows entered without a currency are in the ledger's default one
+CURRENCY = func.coalesce(Transaction.currency, DEFAULT_CURRENCY)
+
+# Row layout of ColumnarLedger.extend, scaled to integer minor units in SQL
+LEDGER_COLUMNS = (
+    Transaction.id,
+    Transaction.date,
+    Transaction.type,
+    Transaction.asset,
+    Transaction.ticker,
+    CURRENCY,
+    scaled(Transaction.amount, QUANTITY_SCALE),
+    scaled(Transaction.price, PRICE_SCALE),
+    scaled(TRADE_VALUE, MONEY_SCALE),
+    scaled(Transaction.fee, MONEY_SCALE),
+    func.coalesce(Transaction.lot_id, NO_LOT),
+)
+
+
+class LedgerRepository:
+    def __init__(self, session: Annotated[Session, Depends(get_db_session)]) -> None:
+        self.session = session
+        self.portfolio_id = session_portfolio_id(session)
+
+    def load(self, *criteria, dated: bool = True, batch_size: int = 10_000) -> ColumnarLedger:
+        """
+        Reads this portfolio's transactions matching `criteria` into a ColumnarLedger, in
+        (date, id) order. Rows stream through a server-side cursor in batches, so no more
+        than `batch_size` of them are held as Python objects at once. Pass `dated=False`
+        when only positions are replayed; the ids, dates and lot ids are then not read.
+        """
+        columns = LEDGER_COLUMNS if dated else (null(), null(), *LEDGER_COLUMNS[2:-1], null())
+        stmt = (
+            select(*columns)
+            .where(Transaction.portfolio_id == self.portfolio_id, *criteria)
+            .order_by(Transaction.date, Transaction.id)
+            .execution_options(yield_per=batch_size)
+        )
+        ledger = ColumnarLedger(dated=dated)
+        # Plain Core rows: the columns are not entities, so the ORM result layer has nothing to add
+        for batch in self.session.connection().execute(stmt).partitions():
+            ledger.extend(batch)
+        return ledger
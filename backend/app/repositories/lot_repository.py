@@ -0,0 +1,182 @@
+from datetime import datetime
+from typing import Annotated, Dict, Iterable, List, Optional
+from fastapi import Depends
+from sqlalchemy.orm import Session
+from sqlalchemy import delete, func, insert, select
+
+from app.core.columnar import ColumnarLedger
+from app.core.ledger import BUY_TYPES, SELL_TYPES, CASH_ASSET
+from app.core.lots import LotBook, LotState, LOT_METHODS
+from app.core.money import (
+    QUANTITY_SCALE, PRICE_SCALE, MONEY_SCALE, to_units, from_units, trade_value, scaled
+)
+from app.models.lot import Lot
+from app.models.transaction import Transaction
+from app.repositories.ledger_repository import LedgerRepository
+from database.connection import get_db_session, session_portfolio_id
+
+# Rows whose replay changes the lots
+LOT_FILTER = (
+    Transaction.type.in_(BUY_TYPES + SELL_TYPES),
+    Transaction.asset != CASH_ASSET,
+)
+
+
+class LotRepository:
+    def __init__(self, session: Annotated[Session, Depends(get_db_session)]) -> None:
+        self.session = session
+        self.portfolio_id = session_portfolio_id(session)
+
+    def get_lots(self, method: str, asset: Optional[str] = None) -> List[Lot]:
+        """
+        Open lots under `method`, per asset in acquisition order.
+        """
+        query = self._query().filter(Lot.method == method)
+        if asset is not None:
+            query = query.filter(Lot.asset == asset)
+        return query.order_by(Lot.asset, Lot.date, Lot.transaction_id).all()
+
+    def get_lot(self, method: str, asset: str, transaction_id: int) -> Optional[Lot]:
+        return self._query().filter(
+            Lot.method == method, Lot.asset == asset, Lot.transaction_id == transaction_id
+        ).one_or_none()
+
+    def open_costs(self, method: str) -> Dict[str, int]:
+        """
+        Remaining cost basis per asset under `method`, in money units, as one GROUP BY over the open lots.
+        """
+        rows = self.session.execute(
+            select(Lot.asset, func.sum(scaled(Lot.cost, MONEY_SCALE)))
+            .where(Lot.portfolio_id == self.portfolio_id, Lot.method == method)
+            .group_by(Lot.asset)
+        )
+        return {asset: int(cost or 0) for asset, cost in rows}
+
+    def load(self, methods: Iterable[str] = LOT_METHODS, asset: Optional[str] = None) -> Dict[str, LotBook]:
+        """
+        Loads the open lots into one LotBook per method.
+        """
+        books = {method: LotBook(method) for method in methods}
+        query = self._query().filter(Lot.method.in_(list(books)))
+        if asset is not None:
+            query = query.filter(Lot.asset == asset)
+        for row in query.order_by(Lot.date, Lot.transaction_id):
+            books[row.method].add(row.asset, self._to_state(row))
+        return books
+
+    def apply(self, tx: Transaction) -> None:
+        """
+        Applies a single new transaction to the lots of its asset under every method:
+        a buy opens one lot per method, a sell shrinks or closes the lots it draws from.
+        Must run in the same session (DB transaction) as the insert.
+        """
+        if tx.asset == CASH_ASSET:
+            return
+
+        amount = to_units(tx.amount, QUANTITY_SCALE)
+        if tx.type in BUY_TYPES:
+            cost = trade_value(amount, to_units(tx.price, PRICE_SCALE)) + to_units(tx.fee, MONEY_SCALE)
+            for method in LOT_METHODS:
+                self.session.add(Lot(
+                    portfolio_id=self.portfolio_id,
+                    method=method,
+                    asset=tx.asset,
+                    transaction_id=tx.id,
+                    date=tx.date,
+                    amount=from_units(amount, QUANTITY_SCALE),
+                    cost=from_units(cost, MONEY_SCALE)
+                ))
+        elif tx.type in SELL_TYPES:
+            rows = (
+                self._query()
+                .filter(Lot.asset == tx.asset)
+                .order_by(Lot.date, Lot.transaction_id)
+                .all()
+            )
+            books = {method: LotBook(method) for method in LOT_METHODS}
+            for row in rows:
+                books[row.method].add(row.asset, self._to_state(row))
+            for book in books.values():
+                book.sell(tx.asset, amount, tx.lot_id)
+
+            # Only the lots the sell drew from change
+            for row in rows:
+                lot = books[row.method].lots[row.asset].get(row.transaction_id)
+                if lot is None:
+                    self.session.delete(row)
+                elif to_units(row.amount, QUANTITY_SCALE) != lot.amount:
+                    row.amount = from_units(lot.amount, QUANTITY_SCALE)
+                    row.cost = from_units(lot.cost, MONEY_SCALE)
+        self.session.flush()
+
+    def replay(
+        self, as_of: Optional[datetime] = None, methods: Iterable[str] = LOT_METHODS,
+        ledger: Optional[ColumnarLedger] = None
+    ) -> Dict[str, LotBook]:
+        """
+        Rebuilds the lot books from the `transactions` history, up to `as_of` when given,
+        or from a `ledger` that was already read (only its buys and sells are replayed).
+        """
+        if ledger is None:
+            criteria = [*LOT_FILTER]
+            if as_of is not None:
+                criteria.append(Transaction.date <= as_of)
+            ledger = LedgerRepository(self.session).load(*criteria)
+
+        # Every method replays the same columns; the rows are read once
+        books = {method: LotBook(method) for method in methods}
+        for book in books.values():
+            ledger.replay_lots(book)
+        return books
+
+    def rebuild(self, ledger: Optional[ColumnarLedger] = None) -> Dict[str, LotBook]:
+        """
+        Recomputes the lots table from the `transactions` history (or a `ledger` holding all of it).
+        """
+        books = self.replay(ledger=ledger)
+        self._write(books)
+        return books
+
+    def append_since(self, after_id: int) -> Dict[str, LotBook]:
+        """
+        Applies transactions appended after transaction `after_id` (none of them back-dated)
+        on top of the stored lots, then rewrites the portfolio's open lots. Cost is
+        O(open lots + new transactions) rather than a replay of the full history.
+        """
+        books = self.load()
+        ledger = LedgerRepository(self.session).load(*LOT_FILTER, Transaction.id > after_id)
+        for book in books.values():
+            ledger.replay_lots(book)
+        self._write(books)
+        return books
+
+    def _write(self, books: Dict[str, LotBook]) -> None:
+        self.session.execute(delete(Lot).where(Lot.portfolio_id == self.portfolio_id))
+        rows = [
+            {
+                "portfolio_id": self.portfolio_id,
+                "method": method,
+                "asset": asset,
+                "transaction_id": lot.transaction_id,
+                "date": lot.date,
+                "amount": from_units(lot.amount, QUANTITY_SCALE),
+                "cost": from_units(lot.cost, MONEY_SCALE)
+            }
+            for method, book in books.items()
+            for asset, lots in book.lots.items()
+            for lot in lots.values()
+        ]
+        if rows:
+            self.session.execute(insert(Lot), rows)
+
+    def _query(self):
+        return self.session.query(Lot).filter(Lot.portfolio_id == self.portfolio_id)
+
+    @staticmethod
+    def _to_state(row: Lot) -> LotState:
+        return LotState(
+            transaction_id=row.transaction_id,
+            date=row.date,
+            amount=to_units(row.amount, QUANTITY_SCALE),
+            cost=to_units(row.cost, MONEY_SCALE)
+        )
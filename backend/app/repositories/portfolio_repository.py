@@ -1,124 +1,230 @@
-from typing import Annotated, List, Dict, Any
+from datetime import datetime
+from decimal import Decimal
+from typing import Annotated, List, Dict, Any, Optional, Tuple
 from fastapi import Depends
 from sqlalchemy.orm import Session
+from sqlalchemy import select, func, case
 
+from app.core.awaitable import offload
+from app.core.cache import snapshot_cache
+from app.core.ledger import (
+    LedgerState, PortfolioSnapshot,
+    BUY_TYPES, SELL_TYPES, DEPOSIT_TYPES, WITHDRAWAL_TYPES, CASH_ASSET, DEFAULT_CURRENCY
+)
+from app.core.lots import AVERAGE, restate
+from app.core.money import QUANTITY_SCALE, MONEY_SCALE, from_units, scaled
+from app.core.settings import PORTFOLIO_SETTINGS
+from app.models.projection_offset import ProjectionOffset
 from app.models.transaction import Transaction
-from database.connection import get_db_session
+from app.repositories.checkpoint_repository import CheckpointRepository, REPLAY_COLUMNS
+from app.repositories.ledger_repository import TRADE_VALUE, CURRENCY
+from app.repositories.lot_repository import LotRepository
+from app.repositories.position_repository import PositionRepository
+from database.connection import get_db_session, session_portfolio_id
+
+SNAPSHOT_KEY = "portfolio_snapshot"
+SCAN_COUNT_KEY = "portfolio_snapshot_scans"
+
+_fee = func.coalesce(Transaction.fee, 0)
+
+# Signed effect of each row on the cash balance, mirroring LedgerState.apply
+CASH_DELTA = case(
+    (Transaction.type.in_(DEPOSIT_TYPES), TRADE_VALUE),
+    (Transaction.type.in_(WITHDRAWAL_TYPES), -TRADE_VALUE),
+    (Transaction.type.in_(BUY_TYPES), -(TRADE_VALUE + _fee)),
+    (Transaction.type.in_(SELL_TYPES), TRADE_VALUE - _fee),
+    else_=0
+)
+
+# Signed effect of each row on the asset's quantity
+QUANTITY_DELTA = case(
+    (Transaction.type.in_(BUY_TYPES), Transaction.amount),
+    (Transaction.type.in_(SELL_TYPES), -Transaction.amount),
+    else_=0
+)
+
+TRADE_FILTER = (
+    Transaction.type.in_(BUY_TYPES + SELL_TYPES),
+    Transaction.asset != CASH_ASSET,
+)
 
 
 class PortfolioRepository:
     def __init__(self, session: Annotated[Session, Depends(get_db_session)]) -> None:
         self.session = session
+        self.portfolio_id = session_portfolio_id(session)
+        self.positions = PositionRepository(session)
+        self.lots = LotRepository(session)
+
+    @property
+    def scan_count(self) -> int:
+        """
+        Number of snapshot computations performed on this session.
+        """
+        return self.session.info.get(SCAN_COUNT_KEY, 0)
+
+    def get_ledger_version(self) -> Tuple[int, int]:
+        """
+        Cheap fingerprint of this portfolio's ledger: (max transaction id, row count).
+        """
+        max_id, count = self.session.execute(
+            select(func.max(Transaction.id), func.count(Transaction.id))
+            .where(Transaction.portfolio_id == self.portfolio_id)
+        ).one()
+        return (max_id or 0, count)
+
+    def get_ledger_stamp(self) -> Tuple[int, int, Optional[datetime]]:
+        """
+        get_ledger_version plus when the ledger's projections last moved, in one statement.
+        Every write advances the inline projection offsets in its own DB transaction, so
+        their latest `updated_at` is the ledger's modification time; trade dates are not,
+        since they can be backdated. Ledgers without offsets fall back to the latest trade date.
+        """
+        modified_at = (
+            select(func.max(ProjectionOffset.updated_at))
+            .where(ProjectionOffset.portfolio_id == self.portfolio_id)
+            .scalar_subquery()
+        )
+        max_id, count, modified, latest_date = self.session.execute(
+            select(func.max(Transaction.id), func.count(Transaction.id), modified_at, func.max(Transaction.date))
+            .where(Transaction.portfolio_id == self.portfolio_id)
+        ).one()
+        return (max_id or 0, count, modified or latest_date)
+
+    def get_snapshot(self, method: Optional[str] = None) -> PortfolioSnapshot:
+        """
+        Computes cash, realized PnL and positions in a single pass, under cost-basis
+        `method` (the configured default when None).
+        The result is memoized on the session, so every consumer in a request shares it,
+        and cached in-process by ledger version across requests.
+        """
+        method = method or PORTFOLIO_SETTINGS.cost_basis_method
+        memo = self.session.info.setdefault(SNAPSHOT_KEY, {})
+        snapshot = memo.get(method)
+        if snapshot is not None:
+            return snapshot
+
+        key = (
+            self.portfolio_id,
+            snapshot_cache.generation,
+            snapshot_cache.scope_generation(self.portfolio_id),
+            *self.get_ledger_version(),
+            method
+        )
+        snapshot = snapshot_cache.get(key)
+        if snapshot is None:
+            snapshot = offload(self.load_state(method).snapshot)
+            self.session.info[SCAN_COUNT_KEY] = self.scan_count + 1
+            snapshot_cache.put(key, snapshot)
+
+        memo[method] = snapshot
+        return snapshot
+
+    def load_state(self, method: str = AVERAGE) -> LedgerState:
+        """
+        Current ledger state under cost-basis `method`. Lot methods restate the average-cost
+        state with the open lots' cost per asset, one GROUP BY over the lots table.
+        """
+        if PORTFOLIO_SETTINGS.aggregation_mode == "sql":
+            state = self.aggregate_state()
+        else:
+            state = self.positions.load_state()
+        if method == AVERAGE:
+            return state
+        return offload(restate, state, self.lots.open_costs(method))
+
+    def get_cash_balance(self, currency: str = DEFAULT_CURRENCY) -> Decimal:
+        if PORTFOLIO_SETTINGS.aggregation_mode == "sql":
+            return self.aggregate_cash(currency)
+        return self.positions.get_amount(CASH_ASSET, currency)
+
+    def get_asset_amount(self, asset: str) -> Decimal:
+        if PORTFOLIO_SETTINGS.aggregation_mode == "sql":
+            return self.aggregate_quantities(asset).get(asset, Decimal(0))
+        return self.positions.get_amount(asset)
+
+    def get_asset_currency(self, asset: str) -> Optional[str]:
+        """
+        Trading currency of an asset, set by its first trade; None if never traded.
+        """
+        if PORTFOLIO_SETTINGS.aggregation_mode == "sql":
+            return self.session.execute(
+                select(CURRENCY)
+                .where(Transaction.portfolio_id == self.portfolio_id, Transaction.asset == asset, *TRADE_FILTER)
+                .order_by(Transaction.date, Transaction.id)
+                .limit(1)
+            ).scalar_one_or_none()
+        return self.positions.get_currency(asset)
+
+    def aggregate_cash(self, currency: str = DEFAULT_CURRENCY) -> Decimal:
+        """
+        Cash balance in one currency as a single SUM(CASE ...) over the ledger.
+        """
+        return from_units(self._aggregate_cash_units(currency).get(currency, 0), MONEY_SCALE)
+
+    def _aggregate_cash_units(self, currency: Optional[str] = None) -> Dict[str, int]:
+        # Summing integer minor units keeps the total exact on backends without a decimal type
+        stmt = (
+            select(CURRENCY, func.sum(scaled(CASH_DELTA, MONEY_SCALE)))
+            .where(Transaction.portfolio_id == self.portfolio_id)
+        )
+        if currency is not None:
+            stmt = stmt.where(CURRENCY == currency)
+        rows = self.session.execute(stmt.group_by(CURRENCY))
+        return {name: int(cash or 0) for name, cash in rows}
+
+    def aggregate_quantities(self, asset: Optional[str] = None) -> Dict[str, Decimal]:
+        """
+        Net quantity per asset via GROUP BY asset, optionally for one asset only.
+        """
+        stmt = (
+            select(Transaction.asset, func.sum(scaled(QUANTITY_DELTA, QUANTITY_SCALE)))
+            .where(Transaction.portfolio_id == self.portfolio_id, *TRADE_FILTER)
+        )
+        if asset is not None:
+            stmt = stmt.where(Transaction.asset == asset)
+        rows = self.session.execute(stmt.group_by(Transaction.asset))
+        return {name: from_units(int(amount or 0), QUANTITY_SCALE) for name, amount in rows}
+
+    def aggregate_state(self) -> LedgerState:
+        """
+        Builds the ledger state from the transactions table: cash is aggregated in SQL,
+        and only the order-dependent average cost / realized PnL is replayed in Python,
+        over plain tuples of minor units for the buy and sell rows. This runs per request,
+        so it skips the ColumnarLedger: converting the rows to arrays costs more than the
+        faster replay saves on a single pass.
+        """
+        stmt = (
+            select(*REPLAY_COLUMNS)
+            .where(Transaction.portfolio_id == self.portfolio_id, *TRADE_FILTER)
+            .order_by(Transaction.date, Transaction.id)
+        )
+        state = LedgerState()
+        state.replay_units(self.session.execute(stmt))
+        state.cash = self._aggregate_cash_units()
+        return state
+
+    def get_snapshot_as_of(self, as_of: datetime, method: Optional[str] = None) -> PortfolioSnapshot:
+        """
+        Historical snapshot: nearest checkpoint before `as_of`, then replay forward.
+        Lot methods also replay the lots up to `as_of`; checkpoints hold average cost only.
+        """
+        method = method or PORTFOLIO_SETTINGS.cost_basis_method
+        state = CheckpointRepository(self.session).restore(as_of)
+        if method != AVERAGE:
+            book = self.lots.replay(as_of, methods=[method])[method]
+            state = offload(restate, state, book.open_costs())
+        return offload(state.snapshot)
+
+    def invalidate_snapshot(self) -> None:
+        self.session.info.pop(SNAPSHOT_KEY, None)
+        snapshot_cache.invalidate(self.portfolio_id)
+
+    def get_current_holdings(self, method: Optional[str] = None) -> List[Dict[str, Any]]:
+        return self.get_snapshot(method).holdings
 
-    def get_current_holdings(self) -> List[Dict[str, Any]]:
-        """
-        Calculates current holdings from transaction history.
-        """
-        transactions = self.session.query(Transaction).order_by(Transaction.date).all()
-        
-        holdings_map = {}
-
-        for tx in transactions:
-            # Skip cash deposits/withdrawals
-            if tx.type in ["입금", "출금", "DEPOSIT", "WITHDRAWAL"]:
-                continue
-            if tx.asset == "현금":
-                continue
-                
-            if tx.asset not in holdings_map:
-                holdings_map[tx.asset] = {
-                    "asset": tx.asset, 
-                    "ticker": tx.ticker,
-                    "amount": 0.0, 
-                    "total_cost": 0.0
-                }
-            
-            data = holdings_map[tx.asset]
-            
-            if tx.type == "매수" or tx.type == "BUY":
-                # Cost Basis = (Price * Amount) + Fee
-                data["amount"] += tx.amount
-                data["total_cost"] += (tx.price * tx.amount) + tx.fee
-            elif tx.type == "매도" or tx.type == "SELL":
-                avg_price = data["total_cost"] / data["amount"] if data["amount"] > 0 else 0
-                data["amount"] -= tx.amount
-                # Reduce total cost by the proportion of sold amount
-                data["total_cost"] -= avg_price * tx.amount
-        
-        result = []
-        for asset, data in holdings_map.items():
-            if data["amount"] > 1e-9:
-                avg_price = data["total_cost"] / data["amount"]
-                result.append({
-                    "name": asset,
-                    "asset": asset,
-                    "symbol": data["ticker"],
-                    "amount": data["amount"],
-                    "avgPrice": avg_price,
-                    "value": data["amount"] * avg_price
-                })
-        
-        return result
-
-    def calculate_summary(self) -> Dict[str, Any]:
+    def calculate_summary(self, method: Optional[str] = None) -> Dict[str, Any]:
         """
         Calculates Cash, Total Value, Realized PnL.
         """
-        transactions = self.session.query(Transaction).order_by(Transaction.date).all()
-        
-        cash = 0.0
-        realized_pnl = 0.0
-        holdings_map = {}
-        
-        for tx in transactions:
-            if tx.type in ["DEPOSIT", "입금"]:
-                cash += tx.amount
-            elif tx.type in ["WITHDRAWAL", "출금"]:
-                cash -= tx.amount
-            
-            elif tx.type in ["BUY", "매수"]:
-                cost = (tx.price * tx.amount) + tx.fee
-                cash -= cost
-                
-                if tx.asset not in holdings_map:
-                    holdings_map[tx.asset] = {"amount": 0.0, "total_cost": 0.0}
-                
-                holdings_map[tx.asset]["amount"] += tx.amount
-                holdings_map[tx.asset]["total_cost"] += cost
-                
-            elif tx.type in ["SELL", "매도"]:
-                proceeds = (tx.price * tx.amount) - tx.fee
-                cash += proceeds
-                
-                if tx.asset in holdings_map and holdings_map[tx.asset]["amount"] > 0:
-                    data = holdings_map[tx.asset]
-                    avg_cost = data["total_cost"] / data["amount"]
-                    
-                    # Realized PnL = Proceeds - Cost Basis of sold amount
-                    cost_basis_sold = avg_cost * tx.amount
-                    pnl = proceeds - cost_basis_sold
-                    realized_pnl += pnl
-                    
-                    data["amount"] -= tx.amount
-                    data["total_cost"] -= cost_basis_sold
-
-        # Calculate current holdings value (Cost Basis)
-        # Note: To get true Market Value, we need current prices.
-        # Here we use Cost Basis as a placeholder or if prices are not available.
-        holdings_value = 0.0
-        for data in holdings_map.values():
-            if data["amount"] > 1e-9:
-                # Remaining Cost Basis
-                holdings_value += data["total_cost"]
-        
-        total_value = cash + holdings_value
-        
-        return {
-            "totalValue": total_value,
-            "cash": cash,
-            "holdingsValue": holdings_value,
-            "realizedPnL": realized_pnl,
-            "unrealizedPnL": 0.0, # Requires current market price
-            "todaysChange": 0.0,
-            "todaysChangePercent": 0.0
-        }
+        return self.get_snapshot(method).summary
@@ -0,0 +1,240 @@
+from decimal import Decimal
+from typing import Annotated, Iterable, List, Optional
+from fastapi import Depends
+from sqlalchemy.orm import Session
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.core.columnar import ColumnarLedger
+from app.core.ledger import LedgerState, PositionState, CASH_ASSET, DEFAULT_CURRENCY
+from app.core.money import QUANTITY_SCALE, PRICE_SCALE, MONEY_SCALE, to_units, from_units
+from app.models.position import Position
+from app.models.transaction import Transaction
+from app.repositories.checkpoint_repository import CheckpointRepository
+from database.connection import get_db_session, session_portfolio_id
+
+
+class PositionRepository:
+    def __init__(self, session: Annotated[Session, Depends(get_db_session)]) -> None:
+        self.session = session
+        self.portfolio_id = session_portfolio_id(session)
+
+    def load_state(self) -> LedgerState:
+        """
+        Loads the materialized ledger state. Cost is O(number of assets in the portfolio).
+        """
+        rows = self._query().order_by(Position.id).all()
+        return self._to_state(rows)
+
+    def get_amount(self, asset: str, currency: Optional[str] = None, for_update: bool = False) -> Decimal:
+        """
+        Current amount of one asset, 0 if never held. For '현금' pass the currency
+        of the cash balance (default: the ledger's default currency). `for_update` reads
+        the latest committed amount and locks the row.
+        """
+        stmt = select(Position.amount).where(Position.portfolio_id == self.portfolio_id, Position.asset == asset)
+        if asset == CASH_ASSET:
+            stmt = stmt.where(Position.currency == (currency or DEFAULT_CURRENCY))
+        if for_update:
+            stmt = stmt.with_for_update()
+        amount = self.session.execute(stmt).scalar_one_or_none()
+        return amount if amount is not None else Decimal(0)
+
+    def get_currency(self, asset: str) -> Optional[str]:
+        """
+        Trading currency of an asset's position, None if never held.
+        """
+        return self.session.execute(
+            select(Position.currency).where(Position.portfolio_id == self.portfolio_id, Position.asset == asset)
+        ).scalar_one_or_none()
+
+    def lock(self) -> None:
+        """
+        Takes this portfolio's write lock until the transaction ends, for writes that must see
+        the ledger at rest (imports, projection catch-up, checkpoints): SELECT ... FOR UPDATE on
+        every position row, the asset rows before the cash rows, the order in which orders take
+        them (see lock_asset), so the two cannot deadlock. In-flight orders are waited for and
+        new ones wait here; other portfolios are not blocked.
+        Nothing may be read before this in the transaction, or MySQL's snapshot would predate the lock.
+        """
+        if self._is_sqlite():
+            self._take_sqlite_write_lock()
+        self.session.execute(
+            select(Position.id)
+            .where(Position.portfolio_id == self.portfolio_id, Position.asset != CASH_ASSET)
+            .order_by(Position.id)
+            .with_for_update()
+        )
+        self.session.execute(
+            select(Position.id)
+            .where(Position.portfolio_id == self.portfolio_id, Position.asset == CASH_ASSET)
+            .order_by(Position.id)
+            .with_for_update()
+        )
+
+    def lock_asset(self, asset: str, ticker: Optional[str] = None, currency: Optional[str] = None) -> None:
+        """
+        Locks the one asset row an order trades (SELECT ... FOR UPDATE), creating it if missing, so
+        orders on the same asset validate one at a time while orders on other assets run side by
+        side. Cash is not locked here: apply moves it with a conditional atomic UPDATE, which holds
+        the cash row only from the order's write to its commit. Cash-only orders lock nothing.
+        Nothing may be read before this in the transaction, or MySQL's snapshot would predate the lock.
+        """
+        if self._is_sqlite():
+            # SQLite has no row locks; any write takes the database write lock instead
+            self._take_sqlite_write_lock()
+        if asset == CASH_ASSET:
+            return
+
+        stmt = (
+            select(Position.id)
+            .where(Position.portfolio_id == self.portfolio_id, Position.asset == asset)
+            .with_for_update()
+        )
+        if self.session.execute(stmt).first() is not None:
+            return
+
+        # First order on the asset: create its row, unless a concurrent order just did
+        try:
+            with self.session.begin_nested():
+                self.session.add(Position(
+                    portfolio_id=self.portfolio_id, asset=asset, ticker=ticker,
+                    currency=currency or DEFAULT_CURRENCY, amount=0, total_cost=0, realized_pnl=0
+                ))
+        except IntegrityError:
+            pass
+        self.session.execute(stmt)
+
+    def add_cash(self, currency: str, units: int) -> bool:
+        """
+        Moves the cash balance of `currency` by `units` (money minor units) in one atomic UPDATE,
+        so concurrent orders never overwrite each other's balance. A debit applies only if the
+        balance covers it; returns False, changing nothing, when it does not.
+        """
+        delta = from_units(units, MONEY_SCALE)
+        stmt = (
+            update(Position)
+            .where(
+                Position.portfolio_id == self.portfolio_id,
+                Position.asset == CASH_ASSET,
+                Position.currency == currency
+            )
+            .values(amount=Position.amount + delta)
+            .execution_options(synchronize_session=False)
+        )
+        if units < 0:
+            stmt = stmt.where(Position.amount >= -delta)
+        if self.session.execute(stmt).rowcount:
+            return True
+        if units < 0:
+            return False
+
+        # No cash in this currency yet: create the row, unless a concurrent order just did
+        try:
+            with self.session.begin_nested():
+                self.session.add(Position(
+                    portfolio_id=self.portfolio_id, asset=CASH_ASSET, currency=currency,
+                    amount=0, total_cost=0, realized_pnl=0
+                ))
+        except IntegrityError:
+            pass
+        return bool(self.session.execute(stmt).rowcount)
+
+    def apply(self, tx: Transaction) -> bool:
+        """
+        Applies a single new transaction: cash moves by add_cash, then the traded asset's row,
+        locked by lock_asset, is rewritten. Returns False, writing nothing, if the cash no
+        longer covers a buy or withdrawal. Must run in the same session (DB transaction) as
+        the insert, and comes first in it so the cash row is held only until commit.
+        """
+        rows = self._query().filter(Position.asset == tx.asset).all() if tx.asset != CASH_ASSET else []
+        state = self._to_state(rows)
+        currency = tx.currency or DEFAULT_CURRENCY
+        state.apply(tx.type, tx.asset, tx.ticker, currency, tx.amount, tx.price, tx.fee)
+        if not self.add_cash(currency, state.balance(currency)):
+            return False
+        self._write(state, rows, cash=False)
+        return True
+
+    def save_state(self, state: LedgerState) -> None:
+        """
+        Overwrites the portfolio's positions with `state`, e.g. after a batch of appended transactions.
+        """
+        self._write(state, self._query().all())
+
+    def rebuild(self, use_checkpoints: bool = True, ledger: Optional[ColumnarLedger] = None) -> LedgerState:
+        """
+        Recomputes the positions table from the `transactions` history,
+        starting from the newest checkpoint unless `use_checkpoints` is False.
+        A `ledger` already holding the full history is replayed instead of reading it again.
+        """
+        if ledger is None:
+            state = CheckpointRepository(self.session).restore(use_checkpoints=use_checkpoints)
+        else:
+            state = LedgerState()
+            ledger.replay(state)
+
+        self.session.execute(delete(Position).where(Position.portfolio_id == self.portfolio_id))
+        self._write(state, [])
+        return state
+
+    def _query(self):
+        return self.session.query(Position).filter(Position.portfolio_id == self.portfolio_id)
+
+    def _to_state(self, rows: Iterable[Position]) -> LedgerState:
+        state = LedgerState()
+        for row in rows:
+            if row.asset == CASH_ASSET:
+                state.cash[row.currency] = to_units(row.amount, MONEY_SCALE)
+                continue
+            state.positions[row.asset] = PositionState(
+                asset=row.asset,
+                ticker=row.ticker,
+                currency=row.currency,
+                amount=to_units(row.amount, QUANTITY_SCALE),
+                total_cost=to_units(row.total_cost, MONEY_SCALE),
+                realized_pnl=to_units(row.realized_pnl, MONEY_SCALE),
+                last_price=to_units(row.last_price, PRICE_SCALE) if row.last_price is not None else None
+            )
+        return state
+
+    def _is_sqlite(self) -> bool:
+        return self.session.get_bind().dialect.name == "sqlite"
+
+    def _take_sqlite_write_lock(self) -> None:
+        self.session.execute(
+            update(Position)
+            .where(Position.portfolio_id == self.portfolio_id, Position.asset == CASH_ASSET)
+            .values(amount=Position.amount)
+            .execution_options(synchronize_session=False)
+        )
+
+    def _write(self, state: LedgerState, rows: List[Position], cash: bool = True) -> None:
+        existing = {row.asset: row for row in rows if row.asset != CASH_ASSET}
+        cash_rows = {row.currency: row for row in rows if row.asset == CASH_ASSET}
+
+        # The default-currency cash row always exists; orders move cash with add_cash instead
+        currencies = dict.fromkeys([DEFAULT_CURRENCY, *state.cash]) if cash else {}
+        for currency in currencies:
+            cash_row = cash_rows.get(currency)
+            if cash_row is None:
+                cash_row = Position(
+                    portfolio_id=self.portfolio_id, asset=CASH_ASSET, currency=currency,
+                    amount=0, total_cost=0, realized_pnl=0
+                )
+                self.session.add(cash_row)
+            cash_row.amount = from_units(state.balance(currency), MONEY_SCALE)
+
+        for asset, position in state.positions.items():
+            row = existing.get(asset)
+            if row is None:
+                row = Position(
+                    portfolio_id=self.portfolio_id, asset=asset, ticker=position.ticker, currency=position.currency
+                )
+                self.session.add(row)
+            row.amount = from_units(position.amount, QUANTITY_SCALE)
+            row.total_cost = from_units(position.total_cost, MONEY_SCALE)
+            row.realized_pnl = from_units(position.realized_pnl, MONEY_SCALE)
+            row.last_price = from_units(position.last_price, PRICE_SCALE) if position.last_price is not None else None
+
+        self.session.flush()
@@ -0,0 +1,158 @@
+from typing import Annotated, Dict, Iterable, List
+from fastapi import Depends
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import and_, case, exists, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.models.projection_offset import ProjectionOffset
+from app.models.transaction import Transaction
+from app.repositories.history_repository import HistoryRepository
+from app.repositories.ledger_repository import LedgerRepository
+from app.repositories.lot_repository import LotRepository
+from app.repositories.portfolio_repository import PortfolioRepository
+from app.repositories.position_repository import PositionRepository
+from database.connection import get_db_session, session_portfolio_id
+
+POSITIONS = "positions"
+LOTS = "lots"
+DAILY_NAV = "daily_nav"
+
+# Applied in the writing DB transaction: order validation reads balances and open lots from them
+INLINE_PROJECTIONS = (POSITIONS, LOTS)
+# Caught up after commit by the background refresh and roll-forward jobs (app.services.background_jobs)
+DEFERRED_PROJECTIONS = (DAILY_NAV,)
+PROJECTIONS = INLINE_PROJECTIONS + DEFERRED_PROJECTIONS
+
+# Session flag set by writes; the portfolio's refresh is scheduled when the session commits
+CATCH_UP_KEY = "projections_pending"
+
+
+def request_catch_up(session: Session) -> None:
+    session.info[CATCH_UP_KEY] = True
+
+
+def lagging_portfolio_ids(session: Session, name: str) -> List[int]:
+    """
+    Portfolios whose `name` projection is behind the ledger. Every write advances the
+    inline positions offset, so only the (small) offsets table is read.
+    """
+    head = aliased(ProjectionOffset)
+    behind = aliased(ProjectionOffset)
+    stmt = (
+        select(head.portfolio_id)
+        .outerjoin(behind, and_(behind.portfolio_id == head.portfolio_id, behind.name == name))
+        .where(head.name == POSITIONS, or_(behind.event_id.is_(None), behind.event_id < head.event_id))
+        .order_by(head.portfolio_id)
+    )
+    return list(session.execute(stmt).scalars())
+
+
+class ProjectionRepository:
+    """
+    Read models derived from the append-only `transactions` ledger, each with a
+    per-portfolio offset so it can be caught up with new events or replayed from zero.
+    """
+
+    def __init__(self, session: Annotated[Session, Depends(get_db_session)]) -> None:
+        self.session = session
+        self.portfolio_id = session_portfolio_id(session)
+        self.positions = PositionRepository(session)
+        self.lots = LotRepository(session)
+        self.history = HistoryRepository(session)
+
+    def offsets(self) -> Dict[str, int]:
+        rows = self.session.execute(
+            select(ProjectionOffset.name, ProjectionOffset.event_id)
+            .where(ProjectionOffset.portfolio_id == self.portfolio_id)
+        )
+        return {name: event_id for name, event_id in rows}
+
+    def advance(self, names: Iterable[str], event_id: int) -> None:
+        """
+        Records that the `names` projections have applied every event up to `event_id`.
+        Offsets only move forward: concurrent orders may commit out of id order.
+        """
+        names = list(names)
+        stmt = (
+            update(ProjectionOffset)
+            .where(ProjectionOffset.portfolio_id == self.portfolio_id, ProjectionOffset.name.in_(names))
+            .values(event_id=case((ProjectionOffset.event_id < event_id, event_id), else_=ProjectionOffset.event_id))
+        )
+        if self.session.execute(stmt).rowcount == len(names):
+            return
+
+        # First write to the portfolio: create the offsets, unless a concurrent order just did
+        existing = self.offsets()
+        try:
+            with self.session.begin_nested():
+                self.session.add_all(
+                    ProjectionOffset(name=name, portfolio_id=self.portfolio_id, event_id=event_id)
+                    for name in names if name not in existing
+                )
+        except IntegrityError:
+            self.session.execute(stmt)
+
+    def catch_up(self, names: Iterable[str] = PROJECTIONS) -> Dict[str, int]:
+        """
+        Applies the events each projection has not seen yet and returns how many it applied.
+        Takes the portfolio's write lock first, so every event up to the head is committed
+        and no writer appends while the offsets move. Back-dated events make the projection
+        replay from the day they land on rather than append.
+        """
+        self.positions.lock()
+        head, _ = PortfolioRepository(self.session).get_ledger_version()
+        offsets = self.offsets()
+
+        applied = {}
+        for name in names:
+            offset = offsets.get(name, 0)
+            if head <= offset:
+                continue
+            first_date, count = self.session.execute(
+                select(func.min(Transaction.date), func.count(Transaction.id))
+                .where(Transaction.portfolio_id == self.portfolio_id, Transaction.id > offset)
+            ).one()
+            backdated = self.session.execute(
+                select(exists().where(
+                    Transaction.portfolio_id == self.portfolio_id,
+                    Transaction.id <= offset,
+                    Transaction.date > first_date
+                ))
+            ).scalar()
+
+            if name == POSITIONS:
+                if backdated:
+                    self.positions.rebuild()
+                else:
+                    state = self.positions.load_state()
+                    LedgerRepository(self.session).load(Transaction.id > offset, dated=False).replay(state)
+                    self.positions.save_state(state)
+            elif name == LOTS:
+                if backdated:
+                    self.lots.rebuild()
+                else:
+                    self.lots.append_since(offset)
+            elif name == DAILY_NAV:
+                self.history.rebuild_from(first_date)
+            self.advance([name], head)
+            applied[name] = count
+        return applied
+
+    def rebuild(self, names: Iterable[str] = PROJECTIONS) -> int:
+        """
+        Replays the `names` projections from the first event, ignoring ledger checkpoints
+        (they may predate the logic change being rebuilt for). The ledger is read once
+        and every projection replays the same columns. Returns the head event id.
+        """
+        self.positions.lock()
+        head, _ = PortfolioRepository(self.session).get_ledger_version()
+        names = list(names)
+        ledger = LedgerRepository(self.session).load(dated=names != [POSITIONS])
+        if POSITIONS in names:
+            self.positions.rebuild(use_checkpoints=False, ledger=ledger)
+        if LOTS in names:
+            self.lots.rebuild(ledger=ledger)
+        if DAILY_NAV in names:
+            self.history.rebuild_from(None, ledger=ledger)
+        self.advance(names, head)
+        return head
@@ -1,32 +1,218 @@
-from typing import Annotated
+from datetime import datetime, timezone
+from typing import Annotated, Iterator, List, Optional, Tuple
 from fastapi import Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import func, select, insert, exists, tuple_, Row
 
+from app.core.columnar import ColumnarLedger
+from app.core.ledger import LedgerState
+from app.core.money import to_decimal, trade_total
 from app.models.transaction import Transaction
-from app.schemas.transaction import TransactionCreate
-from database.connection import get_db_session
+from app.core.settings import PORTFOLIO_SETTINGS
+from app.schemas.transaction import TransactionCreate, TransactionImport
+from app.repositories.checkpoint_repository import CheckpointRepository
+from app.repositories.ledger_repository import LedgerRepository
+from app.repositories.lot_repository import LotRepository
+from app.repositories.position_repository import PositionRepository
+from app.repositories.portfolio_repository import PortfolioRepository
+from app.repositories.projection_repository import ProjectionRepository, INLINE_PROJECTIONS, request_catch_up
+from database.connection import get_db_session, session_portfolio_id
+
+
+EXPORT_COLUMNS = (
+    Transaction.id,
+    Transaction.date,
+    Transaction.type,
+    Transaction.asset,
+    Transaction.ticker,
+    Transaction.amount,
+    Transaction.price,
+    Transaction.currency,
+    Transaction.fee,
+    Transaction.total,
+    Transaction.lot_id,
+)
+
+
+def list_portfolio_ids(session: Session) -> List[int]:
+    """
+    Every portfolio that has transactions, for maintenance commands that span all of them.
+    """
+    stmt = select(Transaction.portfolio_id).distinct().order_by(Transaction.portfolio_id)
+    return list(session.execute(stmt).scalars())
+
+
+def recent_portfolio_ids(session: Session, limit: int) -> List[int]:
+    """
+    The `limit` portfolios with the newest transactions, most recent first.
+    """
+    stmt = (
+        select(Transaction.portfolio_id)
+        .group_by(Transaction.portfolio_id)
+        .order_by(func.max(Transaction.id).desc())
+        .limit(limit)
+    )
+    return list(session.execute(stmt).scalars())
 
 
 class TransactionRepository:
     def __init__(self, session: Annotated[Session, Depends(get_db_session)]) -> None:
         self.session = session
+        self.portfolio_id = session_portfolio_id(session)
+        self.positions = PositionRepository(session)
+        self.lots = LotRepository(session)
+        self.projections = ProjectionRepository(session)
 
     def get_all(self, skip: int = 0, limit: int = 100):
-        return self.session.query(Transaction).offset(skip).limit(limit).all()
+        return (
+            self._query()
+            .order_by(Transaction.date, Transaction.id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def get_page(self, after: Optional[Tuple[datetime, int]] = None, limit: int = 100) -> List[Transaction]:
+        """
+        Keyset pagination on (date, id): seeks past `after` instead of scanning skipped rows.
+        """
+        query = self._query()
+        if after is not None:
+            query = query.filter(tuple_(Transaction.date, Transaction.id) > tuple_(*after))
+        return query.order_by(Transaction.date, Transaction.id).limit(limit).all()
+
+    def stream_all(self, batch_size: int = 1000) -> Iterator[Row]:
+        """
+        Yields the full ledger as plain rows through a server-side cursor, in (date, id) order.
+        """
+        stmt = (
+            select(*EXPORT_COLUMNS)
+            .where(Transaction.portfolio_id == self.portfolio_id)
+            .order_by(Transaction.date, Transaction.id)
+            .execution_options(yield_per=batch_size)
+        )
+        yield from self.session.execute(stmt)
+
+    def state_at(self, date: datetime) -> LedgerState:
+        """
+        Ledger state after every transaction dated at or before `date`, from the nearest checkpoint.
+        """
+        return CheckpointRepository(self.session).restore(date)
 
-    def create(self, transaction: TransactionCreate):
-        total = transaction.amount * transaction.price
+    def ledger_after(self, date: datetime) -> ColumnarLedger:
+        """
+        Transactions dated after `date`, the ones a row back-dated to `date` is inserted before.
+        """
+        return LedgerRepository(self.session).load(Transaction.date > date)
+
+    def lock(self) -> None:
+        """
+        Serializes writers to this portfolio until commit; call before reading the balances
+        a batch is validated against. See PositionRepository.lock.
+        """
+        self.positions.lock()
+
+    def lock_order(self, transaction: TransactionCreate) -> None:
+        """
+        Serializes orders on the same asset until commit; call before reading the balances
+        an order is validated against. See PositionRepository.lock_asset.
+        """
+        self.positions.lock_asset(transaction.asset, transaction.ticker, transaction.currency)
+
+    def create(self, transaction: TransactionCreate) -> Optional[Transaction]:
+        """
+        Writes one validated order. Returns None, writing nothing, if a concurrent order
+        spent the cash it needs since it was validated (see PositionRepository.apply).
+        """
         db_transaction = Transaction(
+            portfolio_id=self.portfolio_id,
             type=transaction.type,
             asset=transaction.asset,
             ticker=transaction.ticker,
-            amount=transaction.amount,
-            price=transaction.price,
+            amount=to_decimal(transaction.amount),
+            price=to_decimal(transaction.price),
             currency=transaction.currency,
-            fee=transaction.fee,
-            total=total
+            fee=to_decimal(transaction.fee),
+            total=trade_total(transaction.amount, transaction.price),
+            lot_id=transaction.lot_id
         )
+        # Inline projections move in the same DB transaction as the insert; daily NAV and
+        # checkpoints follow after commit, under the portfolio lock (background_jobs.refresh_portfolio)
+        if not self.positions.apply(db_transaction):
+            return None
+        # Set client-side so keyset comparisons on `date` see one consistent format, and only
+        # once the cash row is held, so an order never lands before a checkpoint written meanwhile.
+        # Naive UTC, as the DB hands dates back, so the response matches later reads of the row
+        db_transaction.date = datetime.now(timezone.utc).replace(tzinfo=None)
         self.session.add(db_transaction)
         self.session.flush()
+        self.lots.apply(db_transaction)
+        self.projections.advance(INLINE_PROJECTIONS, db_transaction.id)
+        request_catch_up(self.session)
+        PortfolioRepository(self.session).invalidate_snapshot()
         return db_transaction
+
+    def bulk_create(self, transactions: List[TransactionImport], state: LedgerState) -> int:
+        """
+        Inserts validated transactions (dated, in date order) with chunked executemany,
+        then brings positions, lots, checkpoints and the snapshot cache up to date; daily
+        history is caught up after commit. `state` is the ledger after applying the batch
+        on top of the current one.
+        """
+        if not transactions:
+            return 0
+
+        first_date = transactions[0].date
+        backdated = self.session.execute(
+            select(exists().where(Transaction.portfolio_id == self.portfolio_id, Transaction.date > first_date))
+        ).scalar()
+        portfolio = PortfolioRepository(self.session)
+        max_id_before, count_before = portfolio.get_ledger_version()
+
+        rows = [
+            {
+                "portfolio_id": self.portfolio_id,
+                "date": t.date,
+                "type": t.type,
+                "asset": t.asset,
+                "ticker": t.ticker,
+                "amount": to_decimal(t.amount),
+                "price": to_decimal(t.price),
+                "currency": t.currency,
+                "fee": to_decimal(t.fee),
+                "total": trade_total(t.amount, t.price),
+                "lot_id": t.lot_id
+            }
+            for t in transactions
+        ]
+        chunk_size = PORTFOLIO_SETTINGS.import_chunk_size
+        for start in range(0, len(rows), chunk_size):
+            self.session.execute(insert(Transaction), rows[start:start + chunk_size])
+
+        checkpoints = CheckpointRepository(self.session)
+        if backdated:
+            # Rows land before existing history, so average costs must be replayed
+            checkpoints.discard_after(first_date)
+            state = self.positions.rebuild()
+            self.lots.rebuild()
+        else:
+            self.positions.save_state(state)
+            self.lots.append_since(max_id_before)
+        portfolio.invalidate_snapshot()
+
+        interval = PORTFOLIO_SETTINGS.checkpoint_interval
+        max_id_after, count_after = portfolio.get_ledger_version()
+        if interval > 0 and count_after // interval > count_before // interval:
+            last_tx = (
+                self._query()
+                .order_by(Transaction.date.desc(), Transaction.id.desc())
+                .first()
+            )
+            checkpoints.save(state, last_tx)
+
+        self.projections.advance(INLINE_PROJECTIONS, max_id_after)
+        request_catch_up(self.session)
+        return len(rows)
+
+    def _query(self):
+        return self.session.query(Transaction).filter(Transaction.portfolio_id == self.portfolio_id)
@@ -0,0 +1,11 @@
+from pydantic import BaseModel, Field
+from datetime import date
+
+class FxRateIn(BaseModel):
+    currency: str = Field(min_length=3, max_length=3) # ISO 4217 code, e.g. 'USD'
+    date: date
+    rate: float = Field(gt=0) # Base currency per unit of `currency`
+
+class FxRate(FxRateIn):
+    class Config:
+        from_attributes = True
@@ -1,20 +1,40 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from datetime import date, datetime
+from typing import Dict, List, Optional
 
 class Holding(BaseModel):
     name: str
     symbol: Optional[str] = None
+    currency: str = "KRW" # Trading currency; prices and values are in the summary's currency
     amount: float
     avgPrice: float
     value: float
+    currentPrice: Optional[float] = None
     profit: float = 0.0
     profitPercent: float = 0.0
 
+class OpenLot(BaseModel):
+    transactionId: int # The buy that opened the lot; pass as `lot_id` to sell it first
+    name: str
+    date: datetime
+    amount: float
+    avgPrice: float
+    cost: float # Remaining cost basis, fee included
+
 class PortfolioSummary(BaseModel):
+    currency: str = "KRW" # Base currency of every amount below
     totalValue: float
     cash: float
+    cashByCurrency: Dict[str, float] = {} # Cash balances in their own currency
     holdingsValue: float
     realizedPnL: float
     unrealizedPnL: float
     todaysChange: float
     todaysChangePercent: float
+
+class HistoryPoint(BaseModel):
+    date: date
+    cash: float
+    holdingsCost: float
+    marketValue: float # Positions at their last traded price
+    realizedPnL: float
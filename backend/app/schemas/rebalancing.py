@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
 
 class TargetAllocationItem(BaseModel):
     asset: str
@@ -13,3 +13,49 @@ class RebalancingSuggestion(BaseModel):
     reason: str
     urgency: str
     detail: str
+
+class BatchRebalancingRequest(BaseModel):
+    assets: List[str] # Column order of `values` and `targets`
+    values: List[List[float]] # One row of market values per portfolio
+    targets: List[List[float]] # Target percentages, one row per scenario
+    pairwise: bool = False # Row i of `targets` applies to portfolio i only
+    threshold: float = 1.0 # Minimum drift (%p) to trade
+    urgent: float = 5.0 # Drift (%p) above which a trade is urgent
+
+class BatchRebalancingResult(BaseModel):
+    assets: List[str]
+    totals: List[float] # [portfolio]
+    weights: List[List[float]] # [portfolio][asset], %
+    drift: List[List[List[float]]] # [portfolio][scenario][asset], %p
+    notional: List[List[List[float]]] # [portfolio][scenario][asset], > 0 buy, < 0 sell
+    urgency: List[List[List[int]]] # [portfolio][scenario][asset], 0 none, 1 normal, 2 high
+
+class RebalancingSolveRequest(BaseModel):
+    targets: List[TargetAllocationItem] # Assets to rebalance; a '현금' entry sets the cash weight
+    prices: Dict[str, float] = {} # Unit prices in the base currency; required for assets not held yet
+    lot_size: float = Field(1.0, gt=0) # Units per tradable lot (1 = whole shares)
+    lot_sizes: Dict[str, float] = {} # Per-asset overrides of lot_size
+    fee: float = Field(0.0, ge=0) # Flat fee per trade
+    fee_rate: float = Field(0.0, ge=0) # Fee as a fraction of the traded value
+    min_trade: float = Field(0.0, ge=0) # Smallest trade value to place
+    cash_buffer: float = Field(0.0, ge=0, le=100) # Cash to keep, % of the portfolio
+    trade_penalty: float = Field(0.1, ge=0) # Weight error (%p) a trade must remove to be placed
+    solver: Literal["auto", "greedy", "exact"] = "auto"
+
+class SolvedTrade(BaseModel):
+    asset: str
+    action: str # 매수 / 매도
+    type: str # buy / sell
+    quantity: float
+    price: float
+    amount: float # Trade value before fees
+    fee: float
+
+class RebalancingSolution(BaseModel):
+    solver: str
+    trades: List[SolvedTrade]
+    fees: float
+    cash: float # Cash after trades and fees
+    weights: Dict[str, float] # % after the trades, rebalanced assets and '현금'
+    error: float # Σ|weight - target| after the trades, %p
+    initial_error: float # The same before trading
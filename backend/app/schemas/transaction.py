@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class TransactionBase(BaseModel):
     type: str
@@ -10,6 +10,7 @@ class TransactionBase(BaseModel):
     price: float
     currency: str = "KRW"
     fee: float = 0.0
+    lot_id: Optional[int] = None # SELL: id of the buy whose lot to sell first ("specific" cost basis)
 
 class TransactionCreate(TransactionBase):
     pass
@@ -21,3 +22,14 @@ class Transaction(TransactionBase):
 
     class Config:
         from_attributes = True
+
+class TransactionImport(TransactionBase):
+    date: Optional[datetime] = None # Defaults to the import time
+
+class ImportRowError(BaseModel):
+    row: int # Position in the submitted batch, starting at 0
+    detail: str
+
+class ImportResult(BaseModel):
+    imported: int
+    errors: List[ImportRowError] = []
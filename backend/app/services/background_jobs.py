@@ -0,0 +1,155 @@
+from typing import Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.scheduler import Scheduler
+from app.core.settings import PORTFOLIO_SETTINGS
+from app.models.transaction import Transaction
+from app.repositories.checkpoint_repository import CheckpointRepository
+from app.repositories.portfolio_repository import PortfolioRepository
+from app.repositories.position_repository import PositionRepository
+from app.repositories.projection_repository import (
+    ProjectionRepository, DEFERRED_PROJECTIONS, CATCH_UP_KEY, lagging_portfolio_ids
+)
+from app.repositories.transaction_repository import list_portfolio_ids, recent_portfolio_ids
+from database.connection import DatabaseManager, scope_session, session_portfolio_id
+
+# Job names, as labelled in /metrics
+REFRESH = "refresh"
+WARM_UP = "warm_up"
+ROLL_FORWARD = "roll_forward"
+COMPACTION = "compaction"
+
+
+def refresh_portfolio(portfolio_id: int) -> None:
+    """
+    Catches one portfolio's daily NAV up, writes a checkpoint if one is due, and recomputes
+    its snapshot into the snapshot cache, so the first read after a burst of writes (or after
+    startup) does not pay for the replay.
+    """
+    session = scope_session(DatabaseManager().session_factory(), portfolio_id)
+    try:
+        if PORTFOLIO_SETTINGS.scheduler_roll_forward:
+            ProjectionRepository(session).catch_up(DEFERRED_PROJECTIONS)
+            session.commit()
+        if _compact(session) is not None:
+            session.commit()
+        PortfolioRepository(session).get_snapshot()
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def warm_up() -> None:
+    """
+    Queues a refresh of the most recently written portfolios, as many as the snapshot cache
+    holds, so the snapshots computed are not evicted by the next ones; they run
+    `scheduler_concurrency` at a time. Daily NAV of the others is caught up by roll_forward.
+    """
+    session = DatabaseManager().session_factory()
+    try:
+        portfolio_ids = recent_portfolio_ids(session, PORTFOLIO_SETTINGS.snapshot_cache_size)
+    finally:
+        session.close()
+    for portfolio_id in portfolio_ids:
+        scheduler.trigger(REFRESH, portfolio_id)
+
+
+def roll_forward() -> Dict[int, Dict[str, int]]:
+    """
+    Catches every lagging portfolio's deferred projections (daily NAV) up, including
+    writes committed by other processes or commands; returns the events applied per
+    portfolio and projection. Each portfolio is caught up and committed on its own,
+    under the portfolio's write lock, so several processes can run this side by side.
+    """
+    applied = {}
+    session = DatabaseManager().session_factory()
+    try:
+        portfolio_ids = sorted({
+            portfolio_id
+            for name in DEFERRED_PROJECTIONS
+            for portfolio_id in lagging_portfolio_ids(session, name)
+        })
+        session.rollback() # Start each portfolio's lock on a fresh transaction
+        for portfolio_id in portfolio_ids:
+            scope_session(session, portfolio_id)
+            applied[portfolio_id] = ProjectionRepository(session).catch_up(DEFERRED_PROJECTIONS)
+            session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+    return applied
+
+
+def compact_checkpoints() -> Dict[int, int]:
+    """
+    Writes a checkpoint at the head of every portfolio whose newest one is at least
+    `checkpoint_interval` transactions behind, e.g. after a back-dated write discarded
+    checkpoints, so restores replay about one interval at most. Returns the rows each
+    new checkpoint covers per portfolio.
+    """
+    written = {}
+    session = DatabaseManager().session_factory()
+    try:
+        for portfolio_id in list_portfolio_ids(session):
+            scope_session(session, portfolio_id)
+            covered = _compact(session)
+            if covered is not None:
+                written[portfolio_id] = covered
+            session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+    return written
+
+
+def _compact(session: Session) -> Optional[int]:
+    """
+    Writes a checkpoint at the head of the session's portfolio if at least
+    `checkpoint_interval` transactions are past the newest one; returns the rows it
+    covers, or None if none was due. Orders no longer write checkpoints inline: only
+    under the portfolio lock can a checkpoint not miss an order still in flight.
+    """
+    interval = PORTFOLIO_SETTINGS.checkpoint_interval
+    checkpoints = CheckpointRepository(session)
+    if interval <= 0 or checkpoints.pending_count() < interval:
+        return None
+    session.rollback() # Start the lock on a fresh transaction
+    positions = PositionRepository(session)
+    positions.lock() # The head and the positions must not move in between
+    pending = checkpoints.pending_count()
+    if pending < interval:
+        return None
+    last_tx = (
+        session.query(Transaction)
+        .filter(Transaction.portfolio_id == session_portfolio_id(session))
+        .order_by(Transaction.date.desc(), Transaction.id.desc())
+        .first()
+    )
+    checkpoints.save(positions.load_state(), last_tx)
+    return pending
+
+
+scheduler = Scheduler(
+    concurrency=PORTFOLIO_SETTINGS.scheduler_concurrency,
+    debounce=PORTFOLIO_SETTINGS.refresh_debounce,
+    max_delay=PORTFOLIO_SETTINGS.refresh_max_delay
+)
+scheduler.on_trigger(REFRESH, refresh_portfolio)
+if PORTFOLIO_SETTINGS.scheduler_roll_forward:
+    scheduler.every(ROLL_FORWARD, PORTFOLIO_SETTINGS.scheduler_roll_forward_interval, roll_forward)
+if PORTFOLIO_SETTINGS.compaction_interval > 0 and PORTFOLIO_SETTINGS.checkpoint_interval > 0:
+    scheduler.every(COMPACTION, PORTFOLIO_SETTINGS.compaction_interval, compact_checkpoints)
+
+
+@event.listens_for(Session, "after_commit")
+def _refresh_after_write(session: Session) -> None:
+    if not session.in_nested_transaction() and session.info.pop(CATCH_UP_KEY, False): # Savepoints commit too
+        scheduler.trigger(REFRESH, session_portfolio_id(session))
@@ -0,0 +1,97 @@
+from dataclasses import replace
+from datetime import date
+from typing import Annotated, Any, Dict, List, Optional
+from fastapi import Depends, HTTPException
+from sqlalchemy.orm import Session
+
+import numpy as np
+
+from app.core.awaitable import offload
+from app.core.fx import FxRates, MissingRateError
+from app.core.ledger import PortfolioSnapshot
+from app.repositories.fx_repository import FxRepository
+from app.schemas.fx import FxRate, FxRateIn
+
+# Holding fields that are amounts of money, converted column by column
+MONEY_FIELDS = ("avgPrice", "value", "currentPrice", "profit", "change")
+
+
+class FxService:
+    def __init__(self, repository: Annotated[FxRepository, Depends()]) -> None:
+        self.repository = repository
+
+    @classmethod
+    def from_session(cls, session: Session) -> "FxService":
+        return cls(FxRepository(session))
+
+    def get_rates(
+        self, currency: Optional[str] = None, start: Optional[date] = None, end: Optional[date] = None
+    ) -> List[FxRate]:
+        return [FxRate.model_validate(row) for row in self.repository.get_range(currency, start, end)]
+
+    def put_rates(self, rates: List[FxRateIn]) -> int:
+        return self.repository.upsert([r.model_copy(update={"currency": r.currency.upper()}) for r in rates])
+
+    def fingerprint(self) -> str:
+        """
+        Identifies the FX table in use; changes whenever a rate is added or replaced.
+        """
+        return self.repository.rates().fingerprint
+
+    def convert(self, snapshot: PortfolioSnapshot, day: date) -> PortfolioSnapshot:
+        """
+        Restates a snapshot in the base currency at the rates in effect on `day`. Every
+        money column of the holdings, the cash balances and the realized PnL are multiplied
+        by one rate vector in a single array pass; summary totals are summed from the result.
+        A ledger already entirely in the base currency is returned as is.
+        """
+        return offload(_convert, snapshot, self.repository.rates(), day)
+
+
+def _convert(snapshot: PortfolioSnapshot, rates: FxRates, day: date) -> PortfolioSnapshot:
+    holdings = snapshot.holdings
+    currencies = [h.get("currency", rates.base) for h in holdings]
+    balances = list(snapshot.balances.items())
+    realized = list(snapshot.realized.items())
+    if all(c == rates.base for c in [*currencies, *snapshot.balances, *snapshot.realized]):
+        return replace(snapshot, summary={**snapshot.summary, "currency": rates.base})
+
+    try:
+        vector = rates.vector([*currencies, *(c for c, _ in balances), *(c for c, _ in realized)], day)
+    except MissingRateError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    n, m = len(holdings), len(balances)
+    holding_rates = vector[:n]
+
+    # Rows are holdings, columns MONEY_FIELDS; missing fields (no quote) are NaN and stay None
+    table = np.array(
+        [[h.get(f) if h.get(f) is not None else np.nan for f in MONEY_FIELDS] for h in holdings],
+        dtype=float
+    ).reshape(n, len(MONEY_FIELDS)) * holding_rates[:, None]
+    cash = float(np.dot([v for _, v in balances], vector[n:n + m])) if balances else 0.0
+    realized_pnl = float(np.dot([v for _, v in realized], vector[n + m:])) if realized else 0.0
+    totals = np.nansum(table, axis=0)
+
+    converted: List[Dict[str, Any]] = []
+    for h, row in zip(holdings, table.tolist()):
+        converted.append({
+            **h,
+            **{f: (None if np.isnan(v) else v) for f, v in zip(MONEY_FIELDS, row) if f in h}
+        })
+
+    holdings_value = float(totals[MONEY_FIELDS.index("value")])
+    todays_change = float(totals[MONEY_FIELDS.index("change")])
+    total_value = cash + holdings_value
+    previous_value = total_value - todays_change
+    summary = {
+        **snapshot.summary,
+        "currency": rates.base,
+        "totalValue": total_value,
+        "cash": cash,
+        "holdingsValue": holdings_value,
+        "realizedPnL": realized_pnl,
+        "unrealizedPnL": float(totals[MONEY_FIELDS.index("profit")]),
+        "todaysChange": todays_change,
+        "todaysChangePercent": (todays_change / previous_value * 100) if previous_value > 0 else 0.0
+    }
+    return replace(snapshot, cash=cash, realized_pnl=realized_pnl, holdings=converted, summary=summary)
@@ -1,18 +1,223 @@
-from typing import Annotated, List
+from datetime import date, datetime, timedelta, timezone
+from typing import Annotated, List, Dict, Any, Optional, Tuple
 from fastapi import Depends
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
 
+from app.core.awaitable import offload
+from app.core.cache import response_cache
+from app.core.http_cache import Validator, make_etag, not_modified
+from app.core.ledger import PortfolioSnapshot
+from app.core.settings import PORTFOLIO_SETTINGS
+from app.repositories.history_repository import HistoryRepository, utc_day
+from app.repositories.lot_repository import LotRepository
 from app.repositories.portfolio_repository import PortfolioRepository
-from app.schemas.portfolio import PortfolioSummary, Holding
+from app.schemas.portfolio import PortfolioSummary, Holding, HistoryPoint, OpenLot
+from app.services.fx_service import FxService
+from app.services.price_service import PriceService
+
+
+HISTORY_MAX_POINTS = 400
+HISTORY_INTERVAL_DAYS = {"day": 1, "week": 7, "month": 30}
+
+# Read views served with validators and cached bodies: view -> (method, response type)
+CACHED_VIEWS = {
+    "summary": ("get_portfolio_summary", PortfolioSummary),
+    "holdings": ("get_current_holdings", List[Holding]),
+    "allocation": ("get_allocation", List[Dict[str, Any]]),
+}
+# Serialized straight to JSON bytes by pydantic-core, without the jsonable_encoder pass
+_VIEW_ADAPTERS = {view: TypeAdapter(response_type) for view, (_, response_type) in CACHED_VIEWS.items()}
 
 
 class PortfolioService:
-    def __init__(self, repository: Annotated[PortfolioRepository, Depends()]) -> None:
+    def __init__(
+        self,
+        repository: Annotated[PortfolioRepository, Depends()],
+        prices: Annotated[PriceService, Depends()],
+        history: Annotated[HistoryRepository, Depends()],
+        lots: Annotated[LotRepository, Depends()],
+        fx: Annotated[FxService, Depends()]
+    ) -> None:
         self.repository = repository
+        self.prices = prices
+        self.history = history
+        self.lots = lots
+        self.fx = fx
+
+    @classmethod
+    def from_session(cls, session: Session) -> "PortfolioService":
+        return cls(
+            PortfolioRepository(session), PriceService(), HistoryRepository(session),
+            LotRepository(session), FxService.from_session(session)
+        )
+
+    def _snapshot(self, as_of: Optional[datetime] = None, method: Optional[str] = None) -> PortfolioSnapshot:
+        # Historical snapshots stay at cost basis: there are no past quotes to value them with,
+        # but they convert at the FX rates of that day
+        if as_of is not None:
+            return self.fx.convert(self.repository.get_snapshot_as_of(as_of, method), utc_day(as_of))
+        # Quotes may be fetched over the network: off the event loop too
+        snapshot = offload(self.prices.mark_to_market, self.repository.get_snapshot(method))
+        return self.fx.convert(snapshot, datetime.now(timezone.utc).date())
+
+    def get_validator(self, view: str, as_of: Optional[datetime] = None, method: Optional[str] = None) -> Validator:
+        """
+        ETag and Last-Modified of a read view, from the ledger stamp and the FX table's
+        fingerprint; nothing is replayed. Current views are also valued at today's rates
+        and, with a price provider, at the quotes of the current quote cache window, so
+        their tag moves with the day and the window as well as with the ledger.
+        """
+        method = method or PORTFOLIO_SETTINGS.cost_basis_method
+        max_id, count, modified = self.repository.get_ledger_stamp()
+        if modified is not None and modified.tzinfo is None:
+            modified = modified.replace(tzinfo=timezone.utc) # Naive datetimes come back from the DB in UTC
+        if as_of is not None:
+            day, window = utc_day(as_of), None
+        else:
+            day, window = datetime.now(timezone.utc).date(), self.prices.quote_window()
+        etag = make_etag(
+            self.repository.portfolio_id, view, method, as_of and as_of.isoformat(),
+            max_id, count, modified and modified.isoformat(),
+            self.fx.fingerprint(), day.isoformat(), window and window.isoformat()
+        )
+        if window is not None and (modified is None or window > modified):
+            modified = window
+        return Validator(etag, modified)
+
+    def get_cached(
+        self,
+        view: str,
+        as_of: Optional[datetime] = None,
+        method: Optional[str] = None,
+        if_none_match: Optional[str] = None,
+        if_modified_since: Optional[str] = None
+    ) -> Tuple[Validator, Optional[bytes]]:
+        """
+        A read view as JSON bytes with its validator, or no body when the client's copy is
+        still current (304). Bodies are cached by ETag, so every client polling the same
+        state gets the same bytes and only the first one pays for the snapshot and serialization.
+        """
+        validator = self.get_validator(view, as_of, method)
+        if not_modified(validator, if_none_match, if_modified_since):
+            return validator, None
+        body = response_cache.get(validator.etag)
+        if body is None:
+            name, _ = CACHED_VIEWS[view]
+            body = offload(_VIEW_ADAPTERS[view].dump_json, getattr(self, name)(as_of, method))
+            response_cache.put(validator.etag, body)
+        return validator, body
 
-    def get_portfolio_summary(self) -> PortfolioSummary:
-        data = self.repository.calculate_summary()
+    def get_portfolio_summary(self, as_of: Optional[datetime] = None, method: Optional[str] = None) -> PortfolioSummary:
+        data = self._snapshot(as_of, method).summary
         return PortfolioSummary(**data)
 
-    def get_current_holdings(self) -> List[Holding]:
-        data = self.repository.get_current_holdings()
+    def get_current_holdings(self, as_of: Optional[datetime] = None, method: Optional[str] = None) -> List[Holding]:
+        data = self._snapshot(as_of, method).holdings
         return [Holding(**h) for h in data]
+
+    def get_lots(self, method: str, asset: Optional[str] = None) -> List[OpenLot]:
+        """
+        Open lots under a lot-based cost-basis method, per asset in acquisition order.
+        """
+        lots = []
+        for row in self.lots.get_lots(method, asset):
+            amount = float(row.amount)
+            cost = float(row.cost)
+            lots.append(OpenLot(
+                transactionId=row.transaction_id,
+                name=row.asset,
+                date=row.date,
+                amount=amount,
+                avgPrice=cost / amount,
+                cost=cost
+            ))
+        return lots
+
+    def get_allocation(self, as_of: Optional[datetime] = None, method: Optional[str] = None) -> List[Dict[str, Any]]:
+        snapshot = self._snapshot(as_of, method)
+        holdings = [Holding(**h) for h in snapshot.holdings]
+        summary = PortfolioSummary(**snapshot.summary)
+        total_value = summary.totalValue
+        cash = summary.cash
+        
+        allocation = []
+        
+        if cash > 0:
+            allocation.append({
+                "name": "현금",
+                "value": (cash / total_value * 100) if total_value > 0 else 0,
+                "color": "#94a3b8"
+            })
+            
+        colors = ["#0ea5e9", "#22c55e", "#eab308", "#f97316", "#ef4444", "#a855f7"]
+        for i, h in enumerate(holdings):
+            percent = (h.value / total_value * 100) if total_value > 0 else 0
+            allocation.append({
+                "name": h.name,
+                "value": percent,
+                "color": colors[i % len(colors)]
+            })
+            
+        return allocation
+
+    def get_history(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        interval: str = "auto"
+    ) -> List[HistoryPoint]:
+        """
+        Equity curve from the daily NAV table, one point per day, week or month
+        (the last day of each bucket). "auto" picks the finest interval that
+        keeps the range within HISTORY_MAX_POINTS.
+        """
+        end = end or datetime.now(timezone.utc).date()
+        rows = self.history.get_range(start, end)
+        if not rows:
+            return []
+        start = start or rows[0].date
+        if start > end:
+            return []
+
+        if interval == "auto":
+            days = (end - start).days + 1
+            interval = next(
+                (i for i in ("day", "week", "month") if days / HISTORY_INTERVAL_DAYS[i] <= HISTORY_MAX_POINTS),
+                "month"
+            )
+
+        points = []
+        i = 0
+        current = None
+        for bucket_end in self._bucket_ends(start, end, interval):
+            # Carry the latest row at or before the bucket end forward over quiet days
+            while i < len(rows) and rows[i].date <= bucket_end:
+                current = rows[i]
+                i += 1
+            if current is None:
+                continue
+            points.append(HistoryPoint(
+                date=bucket_end,
+                cash=current.cash,
+                holdingsCost=current.holdings_cost,
+                marketValue=current.market_value,
+                realizedPnL=current.realized_pnl
+            ))
+        return points
+
+    @staticmethod
+    def _bucket_ends(start: date, end: date, interval: str) -> List[date]:
+        ends = []
+        day = start
+        while day <= end:
+            if interval == "week":
+                bucket_end = day + timedelta(days=6 - day.weekday())
+            elif interval == "month":
+                next_month = (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+                bucket_end = next_month - timedelta(days=1)
+            else:
+                bucket_end = day
+            ends.append(min(bucket_end, end))
+            day = bucket_end + timedelta(days=1)
+        return ends
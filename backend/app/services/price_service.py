@@ -0,0 +1,87 @@
+import time
+from dataclasses import replace
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional
+
+from app.core.ledger import PortfolioSnapshot
+from app.core.prices import NullPriceProvider, Quote, QuoteCache, quote_cache
+from app.core.settings import PORTFOLIO_SETTINGS
+
+
+class PriceService:
+    def __init__(self) -> None:
+        self.quotes: QuoteCache = quote_cache
+
+    @staticmethod
+    def quote_key(holding: Dict[str, Any]) -> str:
+        # Holdings entered without a ticker are looked up by asset name
+        return holding["symbol"] or holding["asset"]
+
+    def quote_window(self) -> Optional[datetime]:
+        """
+        Start of the current quote cache window (PORTFOLIO_QUOTE_CACHE_TTL seconds, aligned to
+        the epoch so every process agrees), or None when holdings are valued at cost and
+        quotes never change a response. Without quote caching (a TTL of 0) every request
+        fetches fresh quotes, so each one is its own window.
+        """
+        if isinstance(self.quotes.provider, NullPriceProvider):
+            return None
+        ttl = PORTFOLIO_SETTINGS.quote_cache_ttl
+        if ttl <= 0:
+            return datetime.now(timezone.utc)
+        return datetime.fromtimestamp(time.time() // ttl * ttl, timezone.utc)
+
+    def get_quotes(self, snapshot: PortfolioSnapshot) -> Dict[str, Quote]:
+        """
+        Quotes for every holding in one batched lookup.
+        """
+        return self.quotes.get_quotes(self.quote_key(h) for h in snapshot.holdings)
+
+    def mark_to_market(self, snapshot: PortfolioSnapshot) -> PortfolioSnapshot:
+        """
+        Values holdings at market price and fills in unrealized PnL and today's change.
+        Holdings without a quote stay at cost basis. Quotes are taken to be in the
+        holding's trading currency.
+        """
+        if not snapshot.holdings:
+            return snapshot
+        quotes = self.get_quotes(snapshot)
+
+        holdings: List[Dict[str, Any]] = []
+        holdings_value = 0.0
+        unrealized_pnl = 0.0
+        todays_change = 0.0
+        for h in snapshot.holdings:
+            quote = quotes.get(self.quote_key(h))
+            cost = h["amount"] * h["avgPrice"]
+            if quote is None:
+                holdings.append(h)
+                holdings_value += cost
+                continue
+
+            value = h["amount"] * quote.price
+            profit = value - cost
+            change = h["amount"] * (quote.price - quote.previous_close) if quote.previous_close else 0.0
+            holdings.append({
+                **h,
+                "value": value,
+                "currentPrice": quote.price,
+                "profit": profit,
+                "profitPercent": (profit / cost * 100) if cost > 0 else 0.0,
+                "change": change # Today's change, summed again after FX conversion
+            })
+            holdings_value += value
+            unrealized_pnl += profit
+            todays_change += change
+
+        total_value = snapshot.cash + holdings_value
+        previous_value = total_value - todays_change
+        summary = {
+            **snapshot.summary,
+            "totalValue": total_value,
+            "holdingsValue": holdings_value,
+            "unrealizedPnL": unrealized_pnl,
+            "todaysChange": todays_change,
+            "todaysChangePercent": (todays_change / previous_value * 100) if previous_value > 0 else 0.0
+        }
+        return replace(snapshot, holdings=holdings, summary=summary)
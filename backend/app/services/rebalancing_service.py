@@ -1,55 +1,188 @@
+from datetime import datetime, timezone
 from typing import Annotated, List, Dict, Any
-from fastapi import Depends
+from fastapi import Depends, HTTPException
+from sqlalchemy.orm import Session
 
+from app.core.awaitable import offload
+from app.core.ledger import CASH_ASSET, PortfolioSnapshot
+from app.core.rebalancing import rebalance, solve_trades, TradeConstraints, URGENCY_NONE, URGENCY_HIGH
 from app.repositories.portfolio_repository import PortfolioRepository
+from app.schemas.rebalancing import (
+    BatchRebalancingRequest, BatchRebalancingResult, RebalancingSolveRequest, RebalancingSolution, SolvedTrade
+)
+from app.services.fx_service import FxService
+from app.services.price_service import PriceService
 
 
 class RebalancingService:
-    def __init__(self, repository: Annotated[PortfolioRepository, Depends()]) -> None:
+    def __init__(
+        self,
+        repository: Annotated[PortfolioRepository, Depends()],
+        prices: Annotated[PriceService, Depends()],
+        fx: Annotated[FxService, Depends()]
+    ) -> None:
         self.repository = repository
+        self.prices = prices
+        self.fx = fx
+
+    @classmethod
+    def from_session(cls, session: Session) -> "RebalancingService":
+        return cls(PortfolioRepository(session), PriceService(), FxService.from_session(session))
+
+    @staticmethod
+    def rebalance_batch(request: BatchRebalancingRequest) -> BatchRebalancingResult:
+        """
+        Rebalances many portfolios against many target scenarios with array operations.
+        """
+        try:
+            plan = rebalance(
+                request.values,
+                request.targets,
+                pairwise=request.pairwise,
+                threshold=request.threshold,
+                urgent=request.urgent
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if plan.weights.shape[1] != len(request.assets):
+            raise HTTPException(
+                status_code=400,
+                detail=f"자산 수({len(request.assets)})와 값의 열 수({plan.weights.shape[1]})가 다릅니다."
+            )
+
+        return BatchRebalancingResult(
+            assets=request.assets,
+            totals=plan.totals.tolist(),
+            weights=plan.weights.tolist(),
+            drift=plan.drift.tolist(),
+            notional=plan.notional.tolist(),
+            urgency=plan.urgency.tolist()
+        )
+
+    def _valued_snapshot(self) -> PortfolioSnapshot:
+        snapshot = offload(self.prices.mark_to_market, self.repository.get_snapshot())
+        return self.fx.convert(snapshot, datetime.now(timezone.utc).date())
 
     def generate_suggestions(self, target_allocations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Generates rebalancing suggestions based on current holdings and target allocations.
+        Weights are by value over the whole portfolio, cash ('현금') included, in the base currency.
         """
-        current_holdings = self.repository.get_current_holdings()
-        
-        total_value = sum(item['amount'] for item in current_holdings)
-        
+        snapshot = self._valued_snapshot()
+        holdings_map = {item['asset']: item['value'] for item in snapshot.holdings}
+        holdings_map[CASH_ASSET] = max(snapshot.cash, 0.0)
+
+        # Targeted assets first, then the rest of the portfolio so weights cover its full value
+        assets = [target['asset'] for target in target_allocations]
+        assets += [asset for asset in holdings_map if asset not in assets]
+        values = [[holdings_map.get(asset, 0.0) for asset in assets]]
+        targets = [[target['target'] for target in target_allocations] + [0.0] * (len(assets) - len(target_allocations))]
+
+        plan = rebalance(values, targets)
+        weights = plan.weights[0]
+        drift = plan.drift[0, 0]
+        notional = plan.notional[0, 0]
+        urgency = plan.urgency[0, 0]
+
         suggestions = []
-        
-        holdings_map = {item['asset']: item['amount'] for item in current_holdings}
-        
-        for target in target_allocations:
+        for i, target in enumerate(target_allocations):
+            if urgency[i] == URGENCY_NONE:
+                continue
+
             asset_name = target['asset']
             target_percent = target['target']
-            
-            current_amount = holdings_map.get(asset_name, 0)
-            current_percent = (current_amount / total_value * 100) if total_value > 0 else 0
-            
-            diff_percent = target_percent - current_percent
-            
-            if abs(diff_percent) >= 1.0:
-                amount_to_adjust = abs(diff_percent) / 100 * total_value
-                action = "매수" if diff_percent > 0 else "매도"
-                type_ = "buy" if diff_percent > 0 else "sell"
-                
-                reason = ""
-                if action == "매수":
-                    reason = f"목표 비중({target_percent}%)보다 현재 비중({current_percent:.1f}%)이 낮음"
-                else:
-                    reason = f"목표 비중({target_percent}%)보다 현재 비중({current_percent:.1f}%)이 높음"
-
-                urgency = "high" if abs(diff_percent) > 5 else "normal"
-
-                suggestions.append({
-                    "asset": asset_name,
-                    "action": action,
-                    "type": type_,
-                    "amount": int(amount_to_adjust),
-                    "reason": reason,
-                    "urgency": urgency,
-                    "detail": reason
-                })
-                
+            current_percent = weights[i]
+
+            action = "매수" if drift[i] > 0 else "매도"
+            type_ = "buy" if drift[i] > 0 else "sell"
+
+            if action == "매수":
+                reason = f"목표 비중({target_percent}%)보다 현재 비중({current_percent:.1f}%)이 낮음"
+            else:
+                reason = f"목표 비중({target_percent}%)보다 현재 비중({current_percent:.1f}%)이 높음"
+
+            suggestions.append({
+                "asset": asset_name,
+                "action": action,
+                "type": type_,
+                "amount": int(abs(notional[i])),
+                "reason": reason,
+                "urgency": "high" if urgency[i] == URGENCY_HIGH else "normal",
+                "detail": reason
+            })
+
         return suggestions
+
+    def solve(self, request: RebalancingSolveRequest) -> RebalancingSolution:
+        """
+        Solves for whole-lot trades that get closest to the target weights with the fewest
+        trades, net of fees and keeping the cash buffer. Holdings without a target are left
+        as they are; without a '현금' target, cash takes whatever the targets leave.
+        """
+        snapshot = self._valued_snapshot()
+        holdings = {h['asset']: h for h in snapshot.holdings}
+        targets = {t.asset: t.target for t in request.targets}
+        cash_target = targets.pop(CASH_ASSET, None)
+        assets = list(targets)
+
+        units, prices = [], []
+        for asset in assets:
+            holding = holdings.get(asset)
+            held = holding['amount'] if holding is not None else 0.0
+            price = request.prices.get(asset) or (holding['value'] / held if held > 0 else None)
+            if price is None:
+                raise HTTPException(status_code=400, detail=f"보유하지 않은 자산({asset})은 prices에 가격이 필요합니다.")
+            units.append(held)
+            prices.append(price)
+
+        constraints = TradeConstraints(
+            fee=request.fee,
+            fee_rate=request.fee_rate,
+            min_trade=request.min_trade,
+            cash_buffer=request.cash_buffer,
+            trade_penalty=request.trade_penalty
+        )
+        try:
+            solution = offload(
+                solve_trades,
+                units,
+                prices,
+                [request.lot_sizes.get(asset, request.lot_size) for asset in assets],
+                max(snapshot.cash, 0.0),
+                [targets[asset] for asset in assets],
+                cash_target=cash_target,
+                other_value=sum(h['value'] for asset, h in holdings.items() if asset not in targets),
+                constraints=constraints,
+                solver=request.solver
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        trades = []
+        for i, asset in enumerate(assets):
+            quantity = float(solution.quantities[i])
+            if quantity == 0:
+                continue
+            value = float(solution.values[i])
+            trades.append(SolvedTrade(
+                asset=asset,
+                action="매수" if quantity > 0 else "매도",
+                type="buy" if quantity > 0 else "sell",
+                quantity=abs(quantity),
+                price=prices[i],
+                amount=abs(value),
+                fee=constraints.fee + constraints.fee_rate * abs(value)
+            ))
+
+        weights = {asset: float(w) for asset, w in zip(assets, solution.weights)}
+        weights[CASH_ASSET] = float(solution.cash_weight)
+        return RebalancingSolution(
+            solver=solution.solver,
+            trades=trades,
+            fees=float(solution.fees),
+            cash=float(solution.cash),
+            weights=weights,
+            error=solution.error,
+            initial_error=solution.initial_error
+        )
@@ -1,68 +1,336 @@
-from typing import Annotated
+import base64
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Annotated, Callable, Iterator, List, Optional, Tuple
 from fastapi import Depends, HTTPException
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
 
-from app.repositories.transaction_repository import TransactionRepository
+from app.core.columnar import ColumnarLedger
+from app.core.fx import FxRates
+from app.core.ledger import LedgerState, BUY_TYPES, SELL_TYPES, WITHDRAWAL_TYPES, CASH_ASSET, DEFAULT_CURRENCY
+from app.core.lots import SPECIFIC
+from app.core.money import (
+    QUANTITY_SCALE, PRICE_SCALE, MONEY_SCALE, to_units, from_units, trade_value, format_amount
+)
+from app.repositories.fx_repository import FxRepository
+from app.repositories.transaction_repository import TransactionRepository, EXPORT_COLUMNS
 from app.repositories.portfolio_repository import PortfolioRepository
-from app.schemas.transaction import TransactionCreate
+from app.schemas.transaction import (
+    TransactionBase, TransactionCreate, TransactionImport, ImportResult, ImportRowError
+)
 
 
 class TransactionService:
     def __init__(
         self, 
         repository: Annotated[TransactionRepository, Depends()],
-        portfolio_repository: Annotated[PortfolioRepository, Depends()]
+        portfolio_repository: Annotated[PortfolioRepository, Depends()],
+        fx_repository: Annotated[FxRepository, Depends()]
     ) -> None:
         self.repository = repository
         self.portfolio_repository = portfolio_repository
+        self.fx_repository = fx_repository
+
+    @classmethod
+    def from_session(cls, session: Session) -> "TransactionService":
+        return cls(TransactionRepository(session), PortfolioRepository(session), FxRepository(session))
 
     def get_transactions(self, skip: int = 0, limit: int = 100):
         return self.repository.get_all(skip, limit)
 
-    def create_transaction(self, transaction: TransactionCreate):
+    def get_transactions_page(self, cursor: Optional[str] = None, limit: int = 100) -> Tuple[List, Optional[str]]:
+        """
+        Returns one keyset page and the cursor for the next one (None on the last page).
+        """
+        after = self._decode_cursor(cursor) if cursor else None
+        items = self.repository.get_page(after, limit)
+        next_cursor = None
+        if len(items) == limit:
+            last = items[-1]
+            next_cursor = self._encode_cursor(last.date, last.id)
+        return items, next_cursor
+
+    def export_transactions(self, format: str = "ndjson") -> Iterator[str]:
+        """
+        Streams the whole ledger as NDJSON or CSV lines with constant memory.
+        """
+        fields = [c.key for c in EXPORT_COLUMNS]
+        rows = self.repository.stream_all()
+
+        if format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(fields)
+            for row in rows:
+                writer.writerow(row)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+            return
+
+        for row in rows:
+            yield json.dumps(dict(zip(fields, row)), default=self._json_default, ensure_ascii=False) + "\n"
+
+    @staticmethod
+    def _json_default(value):
+        # Numeric columns come back as Decimal; JSON consumers expect numbers
+        if isinstance(value, Decimal):
+            return float(value)
+        return str(value)
+
+    @staticmethod
+    def _encode_cursor(date: datetime, id_: int) -> str:
+        return base64.urlsafe_b64encode(f"{date.isoformat()}|{id_}".encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+        try:
+            date, id_ = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+            return datetime.fromisoformat(date), int(id_)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"잘못된 커서입니다: {cursor}")
+
+    @staticmethod
+    def _currency_error(
+        transaction: TransactionBase,
+        asset_currency: Callable[[str], Optional[str]],
+        rates: FxRates
+    ) -> Optional[str]:
+        """
+        A trade's currency needs an FX rate to the base currency, and must match the
+        currency the asset already trades in; returns the error message, if any.
+        """
+        currency = transaction.currency or DEFAULT_CURRENCY
+        if not rates.has(currency):
+            return f"환율 정보가 없는 통화입니다: {currency}"
+
+        if transaction.asset != CASH_ASSET:
+            held_currency = asset_currency(transaction.asset)
+            if held_currency is not None and held_currency != currency:
+                return f"{transaction.asset}은(는) {held_currency}로 거래되는 자산입니다."
+        return None
+
+    @staticmethod
+    def _validation_error(
+        transaction: TransactionBase,
+        cash_balance: Callable[[str], Decimal],
+        asset_amount: Callable[[str], Decimal]
+    ) -> Optional[str]:
+        """
+        Checks a trade against the balances it touches; returns the error message, if any.
+        Balances are passed as callables so each check reads only what it needs; cash is
+        the balance in the trade's currency.
+        Comparisons use the ledger's fixed-point units, so a trade is accepted exactly
+        when applying it leaves no negative balance.
+        """
+        currency = transaction.currency or DEFAULT_CURRENCY
+        amount = to_units(transaction.amount, QUANTITY_SCALE)
+
         # Validate buy transactions
-        if transaction.type in ["매수", "BUY"]:
-            summary = self.portfolio_repository.calculate_summary()
-            cash = summary["cash"]
-            required_cash = (transaction.amount * transaction.price) + transaction.fee
-            
+        if transaction.type in BUY_TYPES:
+            cash = to_units(cash_balance(currency), MONEY_SCALE)
+            required_cash = (
+                trade_value(amount, to_units(transaction.price, PRICE_SCALE))
+                + to_units(transaction.fee, MONEY_SCALE)
+            )
+
             if required_cash > cash:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"현금이 부족합니다. 보유 현금: {cash:,.0f}, 필요 금액: {required_cash:,.0f}"
+                return (
+                    f"현금이 부족합니다. 보유 현금: {cash / MONEY_SCALE:,.0f} {currency}, "
+                    f"필요 금액: {required_cash / MONEY_SCALE:,.0f} {currency}"
                 )
 
         # Validate withdrawal transactions
-        if transaction.type in ["출금", "WITHDRAWAL"]:
-            summary = self.portfolio_repository.calculate_summary()
-            cash = summary["cash"]
-            
-            if transaction.amount > cash:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"출금 가능한 현금이 부족합니다. 보유 현금: {cash:,.0f}"
-                )
+        if transaction.type in WITHDRAWAL_TYPES:
+            cash = to_units(cash_balance(currency), MONEY_SCALE)
+
+            if to_units(transaction.amount, MONEY_SCALE) > cash:
+                return f"출금 가능한 현금이 부족합니다. 보유 현금: {cash / MONEY_SCALE:,.0f} {currency}"
 
         # Validate sell transactions
-        if transaction.type in ["매도", "SELL"]:
-            holdings = self.portfolio_repository.get_current_holdings()
-            
-            # Find the asset in holdings
-            asset_holding = None
-            for h in holdings:
-                if h["asset"] == transaction.asset or h["name"] == transaction.asset:
-                    asset_holding = h
-                    break
-            
-            if asset_holding is None:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"보유하지 않은 자산입니다: {transaction.asset}"
-                )
-            
-            if transaction.amount > asset_holding["amount"]:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"매도 수량({transaction.amount})이 보유 수량({asset_holding['amount']})을 초과합니다."
+        if transaction.type in SELL_TYPES:
+            held_amount = to_units(asset_amount(transaction.asset), QUANTITY_SCALE)
+
+            if transaction.asset == CASH_ASSET or held_amount <= 0:
+                return f"보유하지 않은 자산입니다: {transaction.asset}"
+
+            if amount > held_amount:
+                return (
+                    f"매도 수량({format_amount(amount, QUANTITY_SCALE)})이 "
+                    f"보유 수량({format_amount(held_amount, QUANTITY_SCALE)})을 초과합니다."
                 )
-        
-        return self.repository.create(transaction)
+
+        return None
+
+    def create_transaction(self, transaction: TransactionCreate):
+        # Concurrent orders on the same asset wait here, so two of them cannot both pass
+        # validation against the same holding; cash is checked again atomically on write
+        self.repository.lock_order(transaction)
+        # Pre-trade checks read only the balances they need, not a full snapshot
+        error = self._currency_error(
+            transaction, self.portfolio_repository.get_asset_currency, self.fx_repository.rates()
+        ) or self._validation_error(
+            transaction,
+            self.portfolio_repository.get_cash_balance,
+            self.portfolio_repository.get_asset_amount
+        )
+        if error is None and transaction.lot_id is not None:
+            error = self._lot_error(transaction)
+        if error is not None:
+            raise HTTPException(status_code=400, detail=error)
+
+        created = self.repository.create(transaction)
+        if created is None:
+            # A concurrent order spent the cash in between; report the balance left now
+            error = self._validation_error(
+                transaction,
+                lambda currency: self.repository.positions.get_amount(CASH_ASSET, currency, for_update=True),
+                self.portfolio_repository.get_asset_amount
+            )
+            raise HTTPException(status_code=400, detail=error)
+        return created
+
+    def _lot_error(self, transaction: TransactionBase) -> Optional[str]:
+        """
+        A SELL's `lot_id` must name an open lot of the same asset. Imports skip this check:
+        a lot that is gone by the time the row applies falls back to first-in first-out.
+        """
+        if transaction.type not in SELL_TYPES:
+            return "lot_id는 매도 거래에만 지정할 수 있습니다."
+        if self.repository.lots.get_lot(SPECIFIC, transaction.asset, transaction.lot_id) is None:
+            return f"{transaction.asset}의 보유 로트가 아닙니다: {transaction.lot_id}"
+        return None
+
+    def import_transactions(self, transactions: List[TransactionImport], atomic: bool = False) -> ImportResult:
+        """
+        Validates a batch in date order in one pass against the ledger state at each row's
+        date, then inserts the valid rows together. Back-dated rows must also keep every
+        later balance non-negative, and rows dated in the future are rejected: `create`
+        dates new transactions now, so they must stay the latest. Invalid rows are
+        reported and skipped, or abort the whole batch when `atomic` is set.
+        """
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        indexed = [
+            (i, t.model_copy(update={"date": self._normalize_date(t.date or now)}))
+            for i, t in enumerate(transactions)
+        ]
+        # Stable sort keeps file order for rows with the same timestamp
+        indexed.sort(key=lambda item: item[1].date)
+
+        self.repository.lock()
+        rates = self.fx_repository.rates()
+        # Rows are checked against the ledger at their own date: back-dated ones start from
+        # the state before them and merge with the existing rows dated after
+        later = self.repository.ledger_after(indexed[0][1].date) if indexed else None
+        if later:
+            state = self.repository.state_at(indexed[0][1].date)
+        else:
+            state = self.portfolio_repository.load_state()
+        applied = 0 # Existing later rows applied to `state` so far
+        accepted = []
+        errors = []
+        for i, t in indexed:
+            if t.date > now:
+                errors.append(ImportRowError(row=i, detail="미래 날짜의 거래는 가져올 수 없습니다."))
+                continue
+            position = later.index_after(t.date) if later else 0
+            if position > applied:
+                later.replay(state, applied, position)
+                applied = position
+            error = self._currency_error(
+                t,
+                lambda asset: (
+                    state.positions[asset].currency if asset in state.positions
+                    else self.portfolio_repository.get_asset_currency(asset)
+                ),
+                rates
+            ) or self._validation_error(
+                t,
+                lambda currency: from_units(state.balance(currency), MONEY_SCALE),
+                lambda asset: from_units(state.positions[asset].amount if asset in state.positions else 0, QUANTITY_SCALE)
+            )
+            if error is None and later:
+                error = self._later_balance_error(t, state, later, position)
+            if error is not None:
+                errors.append(ImportRowError(row=i, detail=error))
+                continue
+            state.apply(t.type, t.asset, t.ticker, t.currency, t.amount, t.price, t.fee)
+            accepted.append(t)
+        if later:
+            later.replay(state, applied, len(later))
+
+        errors.sort(key=lambda e: e.row)
+        if errors and atomic:
+            raise HTTPException(status_code=400, detail=[e.model_dump() for e in errors])
+
+        imported = self.repository.bulk_create(accepted, state)
+        return ImportResult(imported=imported, errors=errors)
+
+    @staticmethod
+    def _later_balance_error(
+        transaction: TransactionBase, state: LedgerState, later: ColumnarLedger, position: int
+    ) -> Optional[str]:
+        """
+        A back-dated row must also leave every later balance it touches non-negative, or a
+        later buy, withdrawal or sell would no longer have been possible. `state` is the
+        ledger just before the row, which lands at `position` among the `later` rows.
+        """
+        currency = transaction.currency or DEFAULT_CURRENCY
+        amount = to_units(transaction.amount, QUANTITY_SCALE)
+        if transaction.type in BUY_TYPES:
+            cash_delta = -(
+                trade_value(amount, to_units(transaction.price, PRICE_SCALE))
+                + to_units(transaction.fee, MONEY_SCALE)
+            )
+        elif transaction.type in WITHDRAWAL_TYPES:
+            cash_delta = -to_units(transaction.amount, MONEY_SCALE)
+        else:
+            cash_delta = 0
+        if cash_delta and state.balance(currency) + cash_delta + int(later.cash_headroom(currency)[position]) < 0:
+            return f"이후 거래의 {currency} 현금 잔고가 음수가 됩니다."
+
+        if transaction.type in SELL_TYPES:
+            position_state = state.positions.get(transaction.asset)
+            held = position_state.amount if position_state is not None else 0
+            if held - amount + int(later.quantity_headroom(transaction.asset)[position]) < 0:
+                return f"이후 거래의 {transaction.asset} 보유 수량이 음수가 됩니다."
+        return None
+
+    def import_csv(self, content: str, atomic: bool = False) -> ImportResult:
+        """
+        Imports CSV with a header row using the export column names; `id` and `total` are ignored.
+        Rows that fail to parse are reported alongside validation errors.
+        """
+        parsed = []
+        positions = []
+        parse_errors = []
+        for i, record in enumerate(csv.DictReader(io.StringIO(content))):
+            # Empty cells fall back to the schema defaults
+            values = {k: v for k, v in record.items() if k and v not in (None, "")}
+            try:
+                parsed.append(TransactionImport.model_validate(values))
+                positions.append(i)
+            except ValidationError as e:
+                detail = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+                parse_errors.append(ImportRowError(row=i, detail=detail))
+
+        if parse_errors and atomic:
+            raise HTTPException(status_code=400, detail=[e.model_dump() for e in parse_errors])
+
+        result = self.import_transactions(parsed, atomic=atomic)
+        # Map rows back to their position in the file
+        errors = parse_errors + [ImportRowError(row=positions[e.row], detail=e.detail) for e in result.errors]
+        errors.sort(key=lambda e: e.row)
+        return ImportResult(imported=result.imported, errors=errors)
+
+    @staticmethod
+    def _normalize_date(date: datetime) -> datetime:
+        # Naive timestamps are taken as UTC; aware ones are stored as naive UTC, like dates set by `create`
+        if date.tzinfo is None:
+            return date
+        return date.astimezone(timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,179 @@
+"""
+Time and memory of a full ledger replay through ORM objects, through plain
+row tuples (REPLAY_COLUMNS), and through the ColumnarLedger, against a seeded
+SQLite ledger with mixed "BUY"/"매수" labels. Lot replays (all three methods)
+are compared the same way. Peak memory is traced with tracemalloc on a
+separate run, so it does not slow down the timed ones.
+
+Usage (from backend/):
+    python -m benchmarks.bench_columnar --rows 1000000
+"""
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Tuple
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app import models # Register models
+from app.core.ledger import LedgerState, BUY_TYPES, SELL_TYPES, CASH_ASSET
+from app.core.lots import LotBook, LOT_METHODS
+from app.core.money import QUANTITY_SCALE, MONEY_SCALE, scaled
+from app.models.transaction import Transaction
+from app.repositories.checkpoint_repository import REPLAY_COLUMNS
+from app.repositories.ledger_repository import LedgerRepository, TRADE_VALUE
+from app.repositories.lot_repository import LOT_FILTER
+from benchmarks.seed import seed_ledger
+from database.connection import Base, DEFAULT_PORTFOLIO_ID, scope_session
+
+
+def orm_replay(session: Session) -> LedgerState:
+    state = LedgerState()
+    query = session.query(Transaction).filter(Transaction.portfolio_id == DEFAULT_PORTFOLIO_ID)
+    for tx in query.order_by(Transaction.date, Transaction.id).all():
+        state.apply(tx.type, tx.asset, tx.ticker, tx.currency, tx.amount, tx.price, tx.fee)
+    return state
+
+
+def row_replay(session: Session) -> LedgerState:
+    state = LedgerState()
+    state.replay_units(session.execute(
+        select(*REPLAY_COLUMNS)
+        .where(Transaction.portfolio_id == DEFAULT_PORTFOLIO_ID)
+        .order_by(Transaction.date, Transaction.id)
+    ))
+    return state
+
+
+def columnar_replay(session: Session) -> LedgerState:
+    state = LedgerState()
+    LedgerRepository(session).load(dated=False).replay(state)
+    return state
+
+
+def row_lots(session: Session) -> Dict[str, LotBook]:
+    # LotRepository.replay before the columnar ledger: the rows are materialized once and replayed per method
+    rows = session.execute(
+        select(
+            Transaction.id, Transaction.date, Transaction.type, Transaction.asset,
+            scaled(Transaction.amount, QUANTITY_SCALE), scaled(TRADE_VALUE, MONEY_SCALE),
+            scaled(Transaction.fee, MONEY_SCALE), Transaction.lot_id
+        )
+        .where(
+            Transaction.portfolio_id == DEFAULT_PORTFOLIO_ID,
+            Transaction.type.in_(BUY_TYPES + SELL_TYPES),
+            Transaction.asset != CASH_ASSET
+        )
+        .order_by(Transaction.date, Transaction.id)
+    ).all()
+    books = {method: LotBook(method) for method in LOT_METHODS}
+    for book in books.values():
+        book.replay(rows)
+    return books
+
+
+def columnar_lots(session: Session) -> Dict[str, LotBook]:
+    ledger = LedgerRepository(session).load(*LOT_FILTER)
+    books = {method: LotBook(method) for method in LOT_METHODS}
+    for book in books.values():
+        ledger.replay_lots(book)
+    return books
+
+
+CASES: Dict[str, Callable[[Session], Any]] = {
+    "orm": orm_replay,
+    "rows": row_replay,
+    "columnar": columnar_replay,
+    "lots_rows": row_lots,
+    "lots_columnar": columnar_lots,
+}
+
+
+def run(engine, fn: Callable[[Session], Any]) -> Tuple[float, Any]:
+    with scope_session(Session(engine), DEFAULT_PORTFOLIO_ID) as session:
+        gc.collect()
+        start = time.perf_counter()
+        result = fn(session)
+        return time.perf_counter() - start, result
+
+
+def peak_memory(engine, fn: Callable[[Session], Any]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        with scope_session(Session(engine), DEFAULT_PORTFOLIO_ID) as session:
+            fn(session)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--assets", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-orm", action="store_true", help="Skip the ORM replay (slowest, most memory)")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "columnar.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    seed_ledger(engine, args.rows, assets=args.assets, seed=args.seed, labels="mixed")
+
+    cases = {name: fn for name, fn in CASES.items() if not (args.skip_orm and name == "orm")}
+    results: Dict[str, Dict[str, float]] = {}
+    states = {}
+    for name, fn in cases.items():
+        seconds = min(run(engine, fn)[0] for _ in range(args.repeat))
+        _, states[name] = run(engine, fn)
+        results[name] = {"seconds": seconds, "peak_mb": peak_memory(engine, fn) / 2 ** 20}
+
+    # Load and replay separately: how much of each time is the DB read
+    with scope_session(Session(engine), DEFAULT_PORTFOLIO_ID) as session:
+        rows = session.execute(
+            select(*REPLAY_COLUMNS)
+            .where(Transaction.portfolio_id == DEFAULT_PORTFOLIO_ID)
+            .order_by(Transaction.date, Transaction.id)
+        ).all()
+        start = time.perf_counter()
+        ledger = LedgerRepository(session).load(dated=False)
+        load_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    LedgerState().replay_units(rows)
+    row_replay_seconds = time.perf_counter() - start
+    del rows
+    start = time.perf_counter()
+    ledger.replay(LedgerState())
+    replay_seconds = time.perf_counter() - start
+
+    for name in ("orm", "columnar"):
+        if name in states:
+            assert states[name].to_dict() == states["rows"].to_dict(), f"{name} replay differs from the row replay"
+
+    print(f"{args.rows:,} transactions, {args.assets} assets\n")
+    print(f"{'path':<16}{'seconds':>10}{'rows/s':>14}{'peak MB':>10}")
+    for name, result in results.items():
+        print(f"{name:<16}{result['seconds']:>10.3f}{args.rows / result['seconds']:>14,.0f}{result['peak_mb']:>10.1f}")
+    print(f"\nreplay only: rows {row_replay_seconds:.3f} s, columnar {replay_seconds:.3f} s (load {load_seconds:.3f} s)")
+    print(f"columnar buffers {ledger.nbytes / 2 ** 20:.1f} MB ({ledger.nbytes / max(len(ledger), 1):.0f} bytes/row)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "rows": args.rows,
+                "paths": results,
+                "replay_only": {"rows_seconds": row_replay_seconds, "columnar_seconds": replay_seconds},
+                "columnar": {"load_seconds": load_seconds, "bytes": ledger.nbytes},
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Micro-benchmarks for the API's hot paths against a seeded SQLite ledger of
+each size (mixed "BUY"/"매수" labels), plus an in-process HTTP load over the
+FastAPI app through httpx's ASGI transport. Results are written as JSON;
+compare two runs with benchmarks.compare.
+
+Each call runs on a fresh session with the snapshot cache cleared, so reads
+measure a full computation; create_transaction is rolled back after each call
+so the ledger stays the same size.
+
+Usage (from backend/):
+    python -m benchmarks.bench_hot_paths --sizes 10000 100000 1000000 --output before.json
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from typing import Any, Callable, Dict, Optional
+
+# DB settings are read at import, so point them at the benchmark database first
+os.environ.setdefault("DB_DSN", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'hot_paths.db')}")
+
+import httpx
+from sqlalchemy.orm import Session
+
+from app.core.cache import response_cache, snapshot_cache
+from app.core.settings import PORTFOLIO_SETTINGS
+from app.main import app
+from app.repositories.lot_repository import LotRepository
+from app.repositories.portfolio_repository import PortfolioRepository
+from app.repositories.position_repository import PositionRepository
+from app.schemas.transaction import TransactionCreate
+from app.services.rebalancing_service import RebalancingService
+from app.services.transaction_service import TransactionService
+from benchmarks.load_test import load
+from benchmarks.seed import seed_ledger
+from database.connection import Base, DatabaseManager, DEFAULT_PORTFOLIO_ID, scope_session
+
+TARGETS = [{"asset": f"Asset {i}", "target": 10.0} for i in range(5)]
+ORDER = TransactionCreate(type="매수", asset="Asset 0", ticker="A000", amount=1, price=1_000)
+
+CASES: Dict[str, Callable[[Session], Any]] = {
+    "get_current_holdings": lambda session: PortfolioRepository(session).get_current_holdings(),
+    "calculate_summary": lambda session: PortfolioRepository(session).calculate_summary(),
+    "generate_suggestions": lambda session: RebalancingService.from_session(session).generate_suggestions(TARGETS),
+    "create_transaction": lambda session: TransactionService.from_session(session).create_transaction(ORDER),
+}
+
+
+def prepare(rows: int, assets: int, seed: int) -> float:
+    engine = DatabaseManager().engine
+    engine.dispose()
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    start = time.perf_counter()
+    seed_ledger(engine, rows, assets=assets, seed=seed, labels="mixed")
+    with Session(engine) as session:
+        PositionRepository(session).rebuild(use_checkpoints=False)
+        LotRepository(session).rebuild()
+        session.commit()
+    return time.perf_counter() - start
+
+
+def measure(fn: Callable[[Session], Any], iterations: int) -> Dict[str, float]:
+    """
+    Latency of `fn` on a fresh, rolled-back session per call, after one warm-up call.
+    """
+    latencies = []
+    for i in range(iterations + 1):
+        snapshot_cache.invalidate()
+        session = scope_session(DatabaseManager().session_factory(), DEFAULT_PORTFOLIO_ID)
+        try:
+            start = time.perf_counter()
+            fn(session)
+            elapsed = time.perf_counter() - start
+        finally:
+            session.rollback()
+            session.close()
+        if i > 0:
+            latencies.append(elapsed)
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "min_ms": latencies[0] * 1000,
+        "median_ms": statistics.median(latencies) * 1000,
+        "max_ms": latencies[-1] * 1000,
+    }
+
+
+async def http_load(concurrency: int, requests: int, cache: bool) -> Dict[str, Any]:
+    snapshot_cache.invalidate()
+    response_cache.invalidate()
+    snapshot_cache.maxsize = PORTFOLIO_SETTINGS.snapshot_cache_size if cache else 0
+    response_cache.maxsize = PORTFOLIO_SETTINGS.response_cache_size if cache else 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120.0) as client:
+        await load(client, 1, 4) # Warm-up
+        return await load(client, concurrency, requests)
+
+
+def run_metadata() -> Dict[str, Optional[str]]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "database": os.environ["DB_DSN"]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--assets", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--aggregation", nargs="+", choices=["positions", "sql"], default=["positions", "sql"])
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent in-process HTTP clients")
+    parser.add_argument("--requests", type=int, default=400, help="HTTP requests per size (0 skips the HTTP load)")
+    parser.add_argument("--cache", action="store_true", help="Keep the snapshot and response caches on for the HTTP load")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {}
+    for rows in args.sizes:
+        seconds = prepare(rows, args.assets, args.seed)
+        print(f"\n{rows:,} transactions (seeded in {seconds:.1f}s)")
+        print(f"{'case':<24}{'mode':<11}{'min (ms)':>10}{'median (ms)':>13}{'max (ms)':>10}")
+
+        size: Dict[str, Any] = {"seed_seconds": seconds}
+        for mode in args.aggregation:
+            PORTFOLIO_SETTINGS.aggregation_mode = mode
+            size[mode] = {}
+            for name, fn in CASES.items():
+                r = size[mode][name] = measure(fn, args.iterations)
+                print(f"{name:<24}{mode:<11}{r['min_ms']:>10.2f}{r['median_ms']:>13.2f}{r['max_ms']:>10.2f}")
+        PORTFOLIO_SETTINGS.aggregation_mode = "positions"
+
+        if args.requests > 0:
+            r = size["http"] = asyncio.run(http_load(args.concurrency, args.requests, args.cache))
+            print(
+                f"http x{args.concurrency:<19}{'':<11}rps {r['rps']:.1f}, p50 {r['p50_ms']:.1f} ms, "
+                f"p99 {r['p99_ms']:.1f} ms, errors {r['errors']}"
+            )
+        results[str(rows)] = size
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({**run_metadata(), "assets": args.assets, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
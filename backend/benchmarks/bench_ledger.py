@@ -0,0 +1,164 @@
+"""
+Replay throughput of the fixed-point ledger against the previous float ledger,
+and how far the float balances drift from the exact ones.
+
+Usage (from backend/):
+    python -m benchmarks.bench_ledger --transactions 1000000
+"""
+import argparse
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.ledger import (
+    LedgerState, BUY_TYPES, SELL_TYPES, DEPOSIT_TYPES, WITHDRAWAL_TYPES, CASH_TYPES, CASH_ASSET, DEFAULT_CURRENCY
+)
+from app.core.money import QUANTITY_SCALE, PRICE_SCALE, MONEY_SCALE, to_decimal, to_units, from_units
+from benchmarks.seed import generate_transactions
+
+
+@dataclass
+class FloatPosition:
+    amount: float = 0.0
+    total_cost: float = 0.0
+    realized_pnl: float = 0.0
+    last_price: Optional[float] = None
+
+
+@dataclass
+class FloatLedger:
+    """
+    Reference implementation: the binary-float LedgerState.apply loop this ledger replaced.
+    """
+    cash: float = 0.0
+    positions: Dict[str, FloatPosition] = field(default_factory=dict)
+
+    def apply(self, type_: str, asset: str, ticker: Optional[str], amount: float, price: float, fee: float) -> None:
+        fee = fee or 0.0
+        if type_ in DEPOSIT_TYPES:
+            self.cash += amount
+        elif type_ in WITHDRAWAL_TYPES:
+            self.cash -= amount
+        elif type_ in BUY_TYPES:
+            cost = (price * amount) + fee
+            self.cash -= cost
+            if asset == CASH_ASSET:
+                return
+            position = self.positions.get(asset)
+            if position is None:
+                position = self.positions[asset] = FloatPosition()
+            position.amount += amount
+            position.total_cost += cost
+            position.last_price = price
+        elif type_ in SELL_TYPES:
+            proceeds = (price * amount) - fee
+            self.cash += proceeds
+            if asset == CASH_ASSET:
+                return
+            position = self.positions.get(asset)
+            if position is None:
+                position = self.positions[asset] = FloatPosition()
+            position.last_price = price
+            if position.amount > 0:
+                cost_basis_sold = position.total_cost / position.amount * amount
+                position.realized_pnl += proceeds - cost_basis_sold
+                position.amount -= amount
+                position.total_cost -= cost_basis_sold
+
+
+def float_replay(rows: List[Tuple]) -> FloatLedger:
+    state = FloatLedger()
+    apply = state.apply
+    for row in rows:
+        apply(*row)
+    return state
+
+
+def fixed_replay(rows: List[Tuple]) -> LedgerState:
+    state = LedgerState()
+    state.replay_units(rows)
+    return state
+
+
+def decimal_replay(rows: List[Tuple]) -> LedgerState:
+    state = LedgerState()
+    for row in rows:
+        state.apply(*row[:3], DEFAULT_CURRENCY, *row[3:])
+    return state
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=1_000_000)
+    parser.add_argument("--assets", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    generated = list(generate_transactions(args.transactions, assets=args.assets, seed=args.seed))
+    # Fractional fees make the float loop accumulate rounding error like real ledgers do
+    float_rows = [
+        (r["type"], r["asset"], r["ticker"], r["amount"], r["price"], round(r["amount"] * r["price"] * 0.00015, 2))
+        for r in generated
+    ]
+    # What the DB hands back: Numeric columns as Decimal, or REPLAY_COLUMNS as ints
+    decimal_rows = [(*r[:3], to_decimal(r[3]), to_decimal(r[4]), to_decimal(r[5])) for r in float_rows]
+    unit_rows = [
+        (
+            *r[:3],
+            DEFAULT_CURRENCY,
+            to_units(r[3], QUANTITY_SCALE),
+            to_units(r[4], PRICE_SCALE),
+            to_units(r[3] if r[0] in CASH_TYPES else r[3] * r[4], MONEY_SCALE),
+            to_units(r[5], MONEY_SCALE)
+        )
+        for r in decimal_rows
+    ]
+
+    results = {
+        "float": timed(lambda: float_replay(float_rows), args.repeat),
+        "fixed_point": timed(lambda: fixed_replay(unit_rows), args.repeat),
+        "decimal_input": timed(lambda: decimal_replay(decimal_rows), args.repeat),
+    }
+
+    float_state = float_replay(float_rows)
+    state = fixed_replay(unit_rows)
+    exact_cash = from_units(state.balance(), MONEY_SCALE)
+    cash_drift = abs(to_decimal(float_state.cash) - exact_cash)
+    # Closed positions the float loop still sees as a non-zero remainder
+    dust = sum(
+        1 for asset, position in float_state.positions.items()
+        if position.amount != 0 and state.positions[asset].amount == 0
+    )
+
+    print(f"{args.transactions:,} transactions, {args.assets} assets\n")
+    print(f"{'run':<16}{'seconds':>10}{'rows/s':>14}{'vs float':>10}")
+    for name, seconds in results.items():
+        print(f"{name:<16}{seconds:>10.4f}{args.transactions / seconds:>14,.0f}{seconds / results['float']:>9.2f}x")
+    print(f"\nexact cash: {exact_cash:,.4f}")
+    print(f"float cash drift: {cash_drift:.10f}")
+    print(f"closed positions left as float dust: {dust}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "transactions": args.transactions,
+                "seconds": results,
+                "cash_drift": str(cash_drift),
+                "dust_positions": dust,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Throughput of the vectorized rebalancing engine against a per-portfolio Python loop.
+
+Usage (from backend/):
+    python -m benchmarks.bench_rebalancing --portfolios 10000 --assets 50
+"""
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from app.core.rebalancing import rebalance, DRIFT_THRESHOLD, URGENT_DRIFT
+
+
+def loop_rebalance(values: List[List[float]], targets: List[List[float]]) -> List[List[Dict[str, Any]]]:
+    """
+    Reference implementation: one dict per asset, one portfolio at a time.
+    """
+    results = []
+    for row, target_row in zip(values, targets):
+        total = sum(row)
+        suggestions = []
+        for value, target in zip(row, target_row):
+            current = (value / total * 100) if total > 0 else 0
+            diff = target - current
+            if abs(diff) >= DRIFT_THRESHOLD:
+                suggestions.append({
+                    "notional": diff / 100 * total,
+                    "urgency": "high" if abs(diff) > URGENT_DRIFT else "normal"
+                })
+        results.append(suggestions)
+    return results
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--portfolios", type=int, default=10_000)
+    parser.add_argument("--assets", type=int, default=50)
+    parser.add_argument("--scenarios", type=int, default=4, help="Target scenarios for the cross-product run")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    values = rng.uniform(0, 1_000_000, size=(args.portfolios, args.assets))
+    targets = rng.dirichlet(np.ones(args.assets), size=args.portfolios) * 100
+    scenarios = rng.dirichlet(np.ones(args.assets), size=args.scenarios) * 100
+
+    values_list, targets_list = values.tolist(), targets.tolist()
+
+    results = {
+        "loop": timed(lambda: loop_rebalance(values_list, targets_list), args.repeat),
+        "vectorized": timed(lambda: rebalance(values, targets, pairwise=True), args.repeat),
+        f"vectorized_x{args.scenarios}": timed(lambda: rebalance(values, scenarios), args.repeat),
+    }
+
+    print(f"{args.portfolios:,} portfolios x {args.assets} assets\n")
+    print(f"{'run':<18}{'seconds':>10}{'portfolios/s':>16}{'speedup':>10}")
+    for name, seconds in results.items():
+        rows = args.portfolios * (args.scenarios if name.startswith("vectorized_x") else 1)
+        print(f"{name:<18}{seconds:>10.4f}{rows / seconds:>16,.0f}{results['loop'] / seconds * rows / args.portfolios:>9.1f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"portfolios": args.portfolios, "assets": args.assets, "seconds": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
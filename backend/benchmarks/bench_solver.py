@@ -0,0 +1,75 @@
+"""
+Solve time of the trade solvers against the number of assets, with the tracking error
+and trade count each reaches. Random portfolios of whole-share holdings are rebalanced
+toward random targets under a flat + proportional fee, a minimum trade and a cash buffer.
+The exact solver only runs up to EXACT_MAX_ASSETS.
+
+Usage (from backend/):
+    python -m benchmarks.bench_solver --assets 5 10 50 200 1000 5000
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Any, Dict
+
+import numpy as np
+
+from app.core.rebalancing import solve_trades, TradeConstraints, GREEDY, EXACT, EXACT_MAX_ASSETS
+
+CONSTRAINTS = TradeConstraints(fee=1.0, fee_rate=0.0015, min_trade=100.0, cash_buffer=1.0, trade_penalty=0.05)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--assets", type=int, nargs="+", default=[5, 10, 50, 200, 1000])
+    parser.add_argument("--problems", type=int, default=20, help="Random portfolios per size")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    results: Dict[str, Any] = {}
+    print(f"{'assets':>8}{'solver':>8}{'median (ms)':>13}{'max (ms)':>10}{'error before':>14}{'error after':>13}{'trades':>8}")
+    for assets in args.assets:
+        problems = [
+            (
+                rng.integers(0, 100, assets).astype(float),
+                rng.uniform(10, 500, assets),
+                float(rng.uniform(0, 20_000)),
+                rng.dirichlet(np.ones(assets + 1))[:assets] * 100
+            )
+            for _ in range(args.problems)
+        ]
+        results[str(assets)] = {}
+        for solver in (GREEDY, EXACT):
+            if solver == EXACT and assets > EXACT_MAX_ASSETS:
+                continue
+            latencies, before, after, trades = [], [], [], []
+            for units, prices, cash, targets in problems:
+                start = time.perf_counter()
+                solution = solve_trades(units, prices, np.ones(assets), cash, targets, constraints=CONSTRAINTS, solver=solver)
+                latencies.append(time.perf_counter() - start)
+                before.append(solution.initial_error)
+                after.append(solution.error)
+                trades.append(solution.trades)
+
+            r = results[str(assets)][solver] = {
+                "median_ms": statistics.median(latencies) * 1000,
+                "max_ms": max(latencies) * 1000,
+                "error_before": statistics.mean(before),
+                "error_after": statistics.mean(after),
+                "trades": statistics.mean(trades),
+            }
+            print(
+                f"{assets:>8}{solver:>8}{r['median_ms']:>13.2f}{r['max_ms']:>10.2f}"
+                f"{r['error_before']:>14.2f}{r['error_after']:>13.2f}{r['trades']:>8.1f}"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"problems": args.problems, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
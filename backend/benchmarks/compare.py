@@ -0,0 +1,73 @@
+"""
+Compares two benchmark JSON results (from any benchmark's --output) metric by
+metric and exits non-zero when one regressed by more than the tolerance.
+Latencies (`*_ms`, `seconds`) regress upward, throughput (`rps`, `*_per_s`)
+downward; worst-case latencies (`max_ms`) are too noisy to gate on and are
+skipped along with counts.
+
+Usage (from backend/):
+    python -m benchmarks.compare before.json after.json --tolerance 0.1
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Optional
+
+
+def flatten(data: Any, prefix: str = "") -> Dict[str, float]:
+    if isinstance(data, dict):
+        flat = {}
+        for key, value in data.items():
+            flat.update(flatten(value, f"{prefix}.{key}" if prefix else str(key)))
+        return flat
+    if isinstance(data, (int, float)) and not isinstance(data, bool):
+        return {prefix: float(data)}
+    return {}
+
+
+def direction(metric: str) -> Optional[int]:
+    """
+    +1 when higher is worse, -1 when lower is worse, None for counts and settings.
+    """
+    parts = metric.split(".")
+    if parts[-1] == "max_ms":
+        return None
+    if parts[-1].endswith("_ms") or "seconds" in parts:
+        return 1
+    if parts[-1] == "rps" or parts[-1].endswith("_per_s"):
+        return -1
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative slowdown (0.1 = 10%%)")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    print(f"baseline {baseline.get('commit') or args.baseline} -> candidate {candidate.get('commit') or args.candidate}\n")
+
+    before, after = flatten(baseline), flatten(candidate)
+    regressions = 0
+    print(f"{'metric':<60}{'before':>12}{'after':>12}{'change':>9}")
+    for metric in sorted(before.keys() & after.keys()):
+        sign = direction(metric)
+        if sign is None or before[metric] == 0:
+            continue
+        change = after[metric] / before[metric] - 1
+        regressed = sign * change > args.tolerance
+        regressions += regressed
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{metric:<60}{before[metric]:>12.2f}{after[metric]:>12.2f}{change:>+9.1%}{flag}")
+
+    print(f"\n{regressions} regression(s) beyond {args.tolerance:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Synthetic ledger data shared by the benchmarks.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+
+from app.models.transaction import Transaction
+
+START_DATE = datetime(2015, 1, 1)
+
+# Type labels per language; the API accepts both
+LABELS = {
+    "en": {"BUY": "BUY", "SELL": "SELL", "DEPOSIT": "DEPOSIT"},
+    "ko": {"BUY": "매수", "SELL": "매도", "DEPOSIT": "입금"},
+}
+
+
+def generate_transactions(
+    count: int, assets: int = 50, seed: int = 42, labels: str = "en"
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yields a valid ledger (never oversells or overdraws) in date order.
+    `labels` is "en", "ko" or "mixed" (each row picks one at random); the
+    trades themselves do not depend on it.
+    """
+    rng = random.Random(seed)
+    # Separate stream, so the label choice leaves the generated trades unchanged
+    label_rng = random.Random(seed + 1)
+    held = [0.0] * assets
+    date = START_DATE
+    cash = 0.0
+
+    for i in range(count):
+        date += timedelta(seconds=rng.randint(1, 600))
+        asset = rng.randrange(assets)
+        price = round(rng.uniform(1_000, 200_000), 2)
+        roll = rng.random()
+
+        if i == 0 or roll < 0.05:
+            amount = 100_000_000.0
+            type_, name, price = "DEPOSIT", "현금", 1.0
+        elif roll < 0.35 and held[asset] >= 1:
+            amount = float(rng.randint(1, int(held[asset])))
+            type_, name = "SELL", f"Asset {asset}"
+            held[asset] -= amount
+            cash += amount * price
+        else:
+            amount = float(rng.randint(1, 20))
+            if amount * price > cash:
+                amount, type_, name, price = 100_000_000.0, "DEPOSIT", "현금", 1.0
+            else:
+                type_, name = "BUY", f"Asset {asset}"
+                held[asset] += amount
+                cash -= amount * price
+
+        if type_ == "DEPOSIT":
+            cash += amount
+
+        language = label_rng.choice(("en", "ko")) if labels == "mixed" else labels
+        yield {
+            "date": date,
+            "type": LABELS[language][type_],
+            "asset": name,
+            "ticker": None if name == "현금" else f"A{asset:03d}",
+            "amount": amount,
+            "price": price,
+            "currency": "KRW",
+            "fee": 0.0,
+            "total": amount * price,
+        }
+
+
+def seed_ledger(engine: Engine, count: int, chunk_size: int = 10_000, **kwargs: Any) -> None:
+    batch = []
+    with engine.begin() as conn:
+        for row in generate_transactions(count, **kwargs):
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                conn.execute(insert(Transaction), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Transaction), batch)
@@ -0,0 +1,77 @@
+"""initial schema
+
+Tables previously created by Base.metadata.create_all at startup. Existing
+tables are left untouched so databases created that way can upgrade in place.
+
+Revision ID: 1f3c9bdc736f
+Revises: 
+Create Date: 2026-10-17 16:12:07.740490
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1f3c9bdc736f'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "transactions" not in existing:
+        op.create_table(
+            "transactions",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("date", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column("type", sa.String(length=10), nullable=False),
+            sa.Column("asset", sa.String(length=100), nullable=False),
+            sa.Column("ticker", sa.String(length=20), nullable=True),
+            sa.Column("amount", sa.Float(), nullable=False),
+            sa.Column("price", sa.Float(), nullable=False),
+            sa.Column("currency", sa.String(length=3), nullable=True),
+            sa.Column("fee", sa.Float(), nullable=True),
+            sa.Column("total", sa.Float(), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_transactions_id", "transactions", ["id"])
+
+    if "positions" not in existing:
+        op.create_table(
+            "positions",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("asset", sa.String(length=100), nullable=False),
+            sa.Column("ticker", sa.String(length=20), nullable=True),
+            sa.Column("amount", sa.Float(), nullable=False),
+            sa.Column("total_cost", sa.Float(), nullable=False),
+            sa.Column("realized_pnl", sa.Float(), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("asset"),
+        )
+        op.create_index("ix_positions_id", "positions", ["id"])
+
+    if "ledger_checkpoints" not in existing:
+        op.create_table(
+            "ledger_checkpoints",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("transaction_id", sa.Integer(), nullable=False),
+            sa.Column("transaction_date", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("state", sa.Text(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_ledger_checkpoints_id", "ledger_checkpoints", ["id"])
+        op.create_index("ix_ledger_checkpoints_transaction_date", "ledger_checkpoints", ["transaction_date"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("ledger_checkpoints")
+    op.drop_table("positions")
+    op.drop_table("transactions")
@@ -0,0 +1,49 @@
+"""projection offsets
+
+Per-portfolio offsets of the read models derived from the transactions
+ledger (positions, lots, daily NAV). Until this revision all three were
+updated with every write, so existing portfolios start with each offset
+at their newest transaction.
+
+Revision ID: 3d6f1a8c5b27
+Revises: 5e8b2c4f7a13
+Create Date: 2026-10-17 22:41:09.583120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d6f1a8c5b27'
+down_revision: Union[str, Sequence[str], None] = '5e8b2c4f7a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "projection_offsets",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=32), nullable=False),
+        sa.Column("portfolio_id", sa.Integer(), nullable=False),
+        sa.Column("event_id", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("name", "portfolio_id", name="uq_projection_offsets_name_portfolio"),
+    )
+    op.create_index("ix_projection_offsets_id", "projection_offsets", ["id"])
+
+    for name in ("positions", "lots", "daily_nav"):
+        op.execute(
+            "INSERT INTO projection_offsets (name, portfolio_id, event_id) "
+            f"SELECT '{name}', portfolio_id, MAX(id) FROM transactions GROUP BY portfolio_id"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("projection_offsets")
@@ -0,0 +1,35 @@
+"""ledger indexes
+
+Composite indexes for the ledger's hot query shapes: replay / keyset order
+on (date, id), per-asset history on (asset, date) and cash flows on (type, date).
+
+Revision ID: 440e9796855c
+Revises: 1f3c9bdc736f
+Create Date: 2026-10-17 16:12:09.801278
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '440e9796855c'
+down_revision: Union[str, Sequence[str], None] = '1f3c9bdc736f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_transactions_date_id", "transactions", ["date", "id"])
+    op.create_index("ix_transactions_asset_date", "transactions", ["asset", "date"])
+    op.create_index("ix_transactions_type_date", "transactions", ["type", "date"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_transactions_type_date", table_name="transactions")
+    op.drop_index("ix_transactions_asset_date", table_name="transactions")
+    op.drop_index("ix_transactions_date_id", table_name="transactions")
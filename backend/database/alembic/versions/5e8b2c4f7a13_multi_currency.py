@@ -0,0 +1,54 @@
+"""multi currency
+
+Per-currency cash balances and an FX rate table. positions gains the
+trading currency of each row, and the cash row of every currency is keyed
+by (portfolio_id, asset, currency). Existing rows are taken to be in KRW;
+run `rebuild_positions --full` and `rebuild_history` afterwards if the
+ledger holds other currencies, once their rates are loaded.
+
+Revision ID: 5e8b2c4f7a13
+Revises: 9a5d3e7f1c24
+Create Date: 2026-10-17 20:04:52.219873
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8b2c4f7a13'
+down_revision: Union[str, Sequence[str], None] = '9a5d3e7f1c24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("positions") as batch_op:
+        batch_op.add_column(sa.Column("currency", sa.String(length=3), nullable=False, server_default="KRW"))
+        batch_op.drop_constraint("uq_positions_portfolio_asset", type_="unique")
+        batch_op.create_unique_constraint("uq_positions_portfolio_asset_currency", ["portfolio_id", "asset", "currency"])
+
+    op.create_table(
+        "fx_rates",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("currency", sa.String(length=3), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("rate", sa.Numeric(28, 8), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("currency", "date", name="uq_fx_rates_currency_date"),
+    )
+    op.create_index("ix_fx_rates_id", "fx_rates", ["id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("fx_rates")
+    # Cash rows of other currencies have no place in the single-currency layout
+    op.execute("DELETE FROM positions WHERE asset = '현금' AND currency <> 'KRW'")
+    with op.batch_alter_table("positions") as batch_op:
+        batch_op.drop_constraint("uq_positions_portfolio_asset_currency", type_="unique")
+        batch_op.create_unique_constraint("uq_positions_portfolio_asset", ["portfolio_id", "asset"])
+        batch_op.drop_column("currency")
@@ -0,0 +1,45 @@
+"""daily nav
+
+Daily NAV table for the equity curve, and the last traded price on
+positions used to mark them.
+
+Revision ID: 7c2e5a91d4b8
+Revises: 440e9796855c
+Create Date: 2026-10-17 17:40:12.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e5a91d4b8'
+down_revision: Union[str, Sequence[str], None] = '440e9796855c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("positions", sa.Column("last_price", sa.Float(), nullable=True))
+
+    op.create_table(
+        "daily_nav",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("cash", sa.Float(), nullable=False),
+        sa.Column("holdings_cost", sa.Float(), nullable=False),
+        sa.Column("market_value", sa.Float(), nullable=False),
+        sa.Column("realized_pnl", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("date"),
+    )
+    op.create_index("ix_daily_nav_id", "daily_nav", ["id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("daily_nav")
+    op.drop_column("positions", "last_price")
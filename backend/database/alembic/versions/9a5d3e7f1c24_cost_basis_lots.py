@@ -0,0 +1,53 @@
+"""cost basis lots
+
+Open lots per portfolio, cost-basis method and asset for FIFO, LIFO and
+specific-identification cost basis, and the lot a SELL draws from first.
+The table starts empty; run `rebuild_positions` afterwards to fill it
+from the existing ledger.
+
+Revision ID: 9a5d3e7f1c24
+Revises: e4a7c2d91f35
+Create Date: 2026-10-17 19:20:31.672043
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a5d3e7f1c24'
+down_revision: Union[str, Sequence[str], None] = 'e4a7c2d91f35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("transactions", sa.Column("lot_id", sa.Integer(), nullable=True))
+
+    op.create_table(
+        "lots",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("portfolio_id", sa.Integer(), nullable=False),
+        sa.Column("method", sa.String(length=8), nullable=False),
+        sa.Column("asset", sa.String(length=100), nullable=False),
+        sa.Column("transaction_id", sa.Integer(), nullable=False),
+        sa.Column("date", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("amount", sa.Numeric(28, 8), nullable=False),
+        sa.Column("cost", sa.Numeric(28, 4), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_lots_id", "lots", ["id"])
+    op.create_index(
+        "ix_lots_portfolio_method_asset_date", "lots",
+        ["portfolio_id", "method", "asset", "date", "transaction_id"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("lots")
+    with op.batch_alter_table("transactions") as batch_op:
+        batch_op.drop_column("lot_id")
@@ -0,0 +1,123 @@
+"""portfolio partitioning
+
+Partitions the ledger by portfolio: a portfolio_id on transactions,
+positions, checkpoints and daily NAV rows, leading every index. Existing
+rows move to portfolio 1.
+
+positions and daily_nav are rebuilt through a copy, since their unnamed
+unique constraints cannot be dropped portably.
+
+Revision ID: b3f81d0c6a2e
+Revises: 7c2e5a91d4b8
+Create Date: 2026-10-17 18:05:47.130962
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f81d0c6a2e'
+down_revision: Union[str, Sequence[str], None] = '7c2e5a91d4b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DEFAULT_PORTFOLIO_ID = 1
+
+POSITION_COLUMNS = "id, asset, ticker, amount, total_cost, realized_pnl, last_price"
+NAV_COLUMNS = "id, date, cash, holdings_cost, market_value, realized_pnl"
+
+
+def _position_columns(partitioned: bool) -> list:
+    return [
+        sa.Column("id", sa.Integer(), nullable=False),
+        *([sa.Column("portfolio_id", sa.Integer(), nullable=False)] if partitioned else []),
+        sa.Column("asset", sa.String(length=100), nullable=False),
+        sa.Column("ticker", sa.String(length=20), nullable=True),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("total_cost", sa.Float(), nullable=False),
+        sa.Column("realized_pnl", sa.Float(), nullable=False),
+        sa.Column("last_price", sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    ]
+
+
+def _nav_columns(partitioned: bool) -> list:
+    return [
+        sa.Column("id", sa.Integer(), nullable=False),
+        *([sa.Column("portfolio_id", sa.Integer(), nullable=False)] if partitioned else []),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("cash", sa.Float(), nullable=False),
+        sa.Column("holdings_cost", sa.Float(), nullable=False),
+        sa.Column("market_value", sa.Float(), nullable=False),
+        sa.Column("realized_pnl", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    ]
+
+
+def _replace_table(name: str, columns: list, copy_sql: str) -> None:
+    op.create_table(f"{name}_new", *columns)
+    op.execute(copy_sql)
+    op.drop_table(name)
+    op.rename_table(f"{name}_new", name)
+    op.create_index(f"ix_{name}_id", name, ["id"])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    default = sa.text(str(DEFAULT_PORTFOLIO_ID))
+
+    op.add_column("transactions", sa.Column("portfolio_id", sa.Integer(), nullable=False, server_default=default))
+    op.drop_index("ix_transactions_date_id", table_name="transactions")
+    op.drop_index("ix_transactions_asset_date", table_name="transactions")
+    op.drop_index("ix_transactions_type_date", table_name="transactions")
+    op.create_index("ix_transactions_portfolio_date_id", "transactions", ["portfolio_id", "date", "id"])
+    op.create_index("ix_transactions_portfolio_asset_date", "transactions", ["portfolio_id", "asset", "date"])
+    op.create_index("ix_transactions_portfolio_type_date", "transactions", ["portfolio_id", "type", "date"])
+
+    op.add_column("ledger_checkpoints", sa.Column("portfolio_id", sa.Integer(), nullable=False, server_default=default))
+    op.drop_index("ix_ledger_checkpoints_transaction_date", table_name="ledger_checkpoints")
+    op.create_index("ix_ledger_checkpoints_portfolio_date", "ledger_checkpoints", ["portfolio_id", "transaction_date"])
+
+    _replace_table(
+        "positions",
+        _position_columns(True) + [sa.UniqueConstraint("portfolio_id", "asset", name="uq_positions_portfolio_asset")],
+        f"INSERT INTO positions_new (portfolio_id, {POSITION_COLUMNS}) "
+        f"SELECT {DEFAULT_PORTFOLIO_ID}, {POSITION_COLUMNS} FROM positions"
+    )
+    _replace_table(
+        "daily_nav",
+        _nav_columns(True) + [sa.UniqueConstraint("portfolio_id", "date", name="uq_daily_nav_portfolio_date")],
+        f"INSERT INTO daily_nav_new (portfolio_id, {NAV_COLUMNS}) "
+        f"SELECT {DEFAULT_PORTFOLIO_ID}, {NAV_COLUMNS} FROM daily_nav"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema. Only portfolio 1's positions and history are kept."""
+    _replace_table(
+        "daily_nav",
+        _nav_columns(False) + [sa.UniqueConstraint("date")],
+        f"INSERT INTO daily_nav_new ({NAV_COLUMNS}) "
+        f"SELECT {NAV_COLUMNS} FROM daily_nav WHERE portfolio_id = {DEFAULT_PORTFOLIO_ID}"
+    )
+    _replace_table(
+        "positions",
+        _position_columns(False) + [sa.UniqueConstraint("asset")],
+        f"INSERT INTO positions_new ({POSITION_COLUMNS}) "
+        f"SELECT {POSITION_COLUMNS} FROM positions WHERE portfolio_id = {DEFAULT_PORTFOLIO_ID}"
+    )
+
+    op.drop_index("ix_ledger_checkpoints_portfolio_date", table_name="ledger_checkpoints")
+    op.create_index("ix_ledger_checkpoints_transaction_date", "ledger_checkpoints", ["transaction_date"])
+    op.drop_column("ledger_checkpoints", "portfolio_id")
+
+    op.drop_index("ix_transactions_portfolio_type_date", table_name="transactions")
+    op.drop_index("ix_transactions_portfolio_asset_date", table_name="transactions")
+    op.drop_index("ix_transactions_portfolio_date_id", table_name="transactions")
+    op.create_index("ix_transactions_date_id", "transactions", ["date", "id"])
+    op.create_index("ix_transactions_asset_date", "transactions", ["asset", "date"])
+    op.create_index("ix_transactions_type_date", "transactions", ["type", "date"])
+    op.drop_column("transactions", "portfolio_id")
@@ -0,0 +1,65 @@
+"""decimal money
+
+Stores quantities, prices and money amounts as exact DECIMAL columns
+instead of binary floats. Existing values are rounded to the new scales;
+run `rebuild_positions --full` and `rebuild_history` afterwards so the
+materialized tables are recomputed with the fixed-point ledger.
+
+Revision ID: e4a7c2d91f35
+Revises: b3f81d0c6a2e
+Create Date: 2026-10-17 18:42:09.384116
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7c2d91f35'
+down_revision: Union[str, Sequence[str], None] = 'b3f81d0c6a2e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+QUANTITY = sa.Numeric(28, 8)
+PRICE = sa.Numeric(28, 8)
+MONEY = sa.Numeric(28, 4)
+
+# table -> [(column, decimal type, nullable)]
+COLUMNS = {
+    "transactions": [
+        ("amount", QUANTITY, False),
+        ("price", PRICE, False),
+        ("fee", MONEY, True),
+        ("total", MONEY, False),
+    ],
+    "positions": [
+        ("amount", QUANTITY, False),
+        ("total_cost", MONEY, False),
+        ("realized_pnl", MONEY, False),
+        ("last_price", PRICE, True),
+    ],
+    "daily_nav": [
+        ("cash", MONEY, False),
+        ("holdings_cost", MONEY, False),
+        ("market_value", MONEY, False),
+        ("realized_pnl", MONEY, False),
+    ],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, columns in COLUMNS.items():
+        with op.batch_alter_table(table) as batch_op:
+            for name, type_, nullable in columns:
+                batch_op.alter_column(name, type_=type_, existing_type=sa.Float(), existing_nullable=nullable)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, columns in COLUMNS.items():
+        with op.batch_alter_table(table) as batch_op:
+            for name, type_, nullable in columns:
+                batch_op.alter_column(name, type_=sa.Float(), existing_type=type_, existing_nullable=nullable)
@@ -1,35 +1,94 @@
-from typing import Generator, Any
+import threading
+from typing import Annotated, AsyncGenerator, Generator, Any
+from fastapi import Depends, Header
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker, declarative_base
 
 from database.settings import DB_SETTINGS
 
 
 class DatabaseManager:
+    """
+    Process-wide engine, created on first use. Requests and background jobs can race to
+    create it, so it is built under a lock and published only once complete.
+    """
     _instance = None
-    
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        instance = cls._instance
+        if instance is None:
+            with cls._lock:
+                instance = cls._instance
+                if instance is None:
+                    instance = super().__new__(cls)
+                    instance.engine = create_engine(
+                        DB_SETTINGS.url,
+                        pool_recycle=28000,
+                        pool_size=10,
+                        pool_pre_ping=True,
+                        echo=False
+                    )
+                    instance.session_factory = sessionmaker(bind=instance.engine, expire_on_commit=False)
+                    cls._instance = instance
+        return instance
+
+
+class AsyncDatabaseManager:
+    """
+    Async engine for DB_ASYNC_MODE. Created on first use, so the async driver
+    is only required when async mode is enabled. Built under a lock like DatabaseManager.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
     def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance.engine = create_engine(
-                DB_SETTINGS.url,
-                pool_recycle=28000,
-                pool_size=10,
-                pool_pre_ping=True,
-                echo=False
-            )
-            cls._instance.session_factory = sessionmaker(bind=cls._instance.engine, expire_on_commit=False)
-        return cls._instance
+        instance = cls._instance
+        if instance is None:
+            with cls._lock:
+                instance = cls._instance
+                if instance is None:
+                    instance = super().__new__(cls)
+                    instance.engine = create_async_engine(
+                        DB_SETTINGS.async_url,
+                        pool_recycle=28000,
+                        pool_size=10,
+                        pool_pre_ping=True,
+                        echo=False
+                    )
+                    instance.session_factory = async_sessionmaker(bind=instance.engine, expire_on_commit=False)
+                    cls._instance = instance
+        return instance
 
 
 Base = declarative_base()
 
-# For creating tables on startup
-engine = DatabaseManager().engine
+# Ledger partition used when a request or command does not name one
+DEFAULT_PORTFOLIO_ID = 1
+PORTFOLIO_KEY = "portfolio_id"
+
+
+def get_portfolio_id(x_portfolio_id: Annotated[int, Header(ge=1)] = DEFAULT_PORTFOLIO_ID) -> int:
+    return x_portfolio_id
+
+
+def scope_session(session: Session, portfolio_id: int) -> Session:
+    """
+    Binds the session to one portfolio; repositories read it back with `session_portfolio_id`.
+    """
+    session.info[PORTFOLIO_KEY] = portfolio_id
+    return session
 
 
-def get_db_session() -> Generator[Session, Any, None]:
-    session = DatabaseManager().session_factory()
+def session_portfolio_id(session: Session) -> int:
+    return session.info.get(PORTFOLIO_KEY, DEFAULT_PORTFOLIO_ID)
+
+
+def get_db_session(
+    portfolio_id: Annotated[int, Depends(get_portfolio_id)] = DEFAULT_PORTFOLIO_ID
+) -> Generator[Session, Any, None]:
+    session = scope_session(DatabaseManager().session_factory(), portfolio_id)
     try:
         yield session
         session.commit()
@@ -38,3 +97,18 @@ def get_db_session() -> Generator[Session, Any, None]:
         raise e
     finally:
         session.close()
+
+
+async def get_async_db_session(
+    portfolio_id: Annotated[int, Depends(get_portfolio_id)] = DEFAULT_PORTFOLIO_ID
+) -> AsyncGenerator[AsyncSession, None]:
+    session = AsyncDatabaseManager().session_factory()
+    scope_session(session.sync_session, portfolio_id)
+    try:
+        yield session
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        raise e
+    finally:
+        await session.close()
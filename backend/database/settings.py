@@ -1,18 +1,35 @@
+from typing import Optional
+from sqlalchemy.engine import make_url
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class DatabaseSettings(BaseSettings):
-    dialect: str
-    driver: str
-    host: str
-    port: int
-    user: str
-    password: str
-    database: str
+    dialect: str = "mysql"
+    driver: str = "pymysql"
+    host: str = "localhost"
+    port: int = 3306
+    user: str = "user"
+    password: str = "password"
+    database: str = "portfolio_db"
+    dsn: Optional[str] = None # Full URL override, e.g. sqlite:///bench.db for benchmarks
+    async_mode: bool = False # Serve requests from an async engine instead of the threadpool
+    async_driver: str = "aiomysql"
 
     @property
     def url(self) -> str:
+        if self.dsn:
+            return self.dsn
         return f"{self.dialect}+{self.driver}://{self.user}:{self.password}@{self.host}:{self.port}/{self.database}"
 
+    @property
+    def async_url(self) -> str:
+        """
+        `url` with its driver swapped for an async one (aiosqlite for SQLite).
+        """
+        url = make_url(self.url)
+        backend = url.get_backend_name()
+        driver = "aiosqlite" if backend == "sqlite" else self.async_driver
+        return url.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+
     model_config = SettingsConfigDict(
         case_sensitive=False,
         env_prefix="DB_",
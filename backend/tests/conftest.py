@@ -0,0 +1,9 @@
+import os
+import tempfile
+from pathlib import Path
+
+# Settings are read at import: point the app at a scratch SQLite database first
+os.environ.setdefault("DB_DSN", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'tests.db')}")
+# Servers started as subprocesses (benchmarks.load_test.start_server) import the app from backend/
+BACKEND = Path(__file__).resolve().parents[1]
+os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [str(BACKEND), os.environ.get("PYTHONPATH")]))
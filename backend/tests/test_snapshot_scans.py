@@ -0,0 +1,65 @@
+"""
+A request replays the portfolio at most once, however many views it builds from the
+snapshot: PortfolioRepository.scan_count, read back when each request's session commits.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.core.cache import response_cache, snapshot_cache
+from app.main import app
+from app.repositories.portfolio_repository import PortfolioRepository
+from database.connection import Base, DatabaseManager
+
+PORTFOLIO = {"X-Portfolio-Id": "2"}
+
+
+@pytest.fixture
+def client():
+    Base.metadata.create_all(DatabaseManager().engine)
+    snapshot_cache.invalidate()
+    response_cache.invalidate()
+    return TestClient(app)
+
+
+@pytest.fixture
+def scans():
+    """
+    Snapshot scans of every committed request session, in order.
+    """
+    counts = []
+
+    def record(session: Session) -> None:
+        if not session.in_nested_transaction(): # Savepoints commit too
+            counts.append(PortfolioRepository(session).scan_count)
+
+    event.listen(Session, "after_commit", record)
+    yield counts
+    event.remove(Session, "after_commit", record)
+
+
+def post(client: TestClient, body: dict) -> None:
+    response = client.post("/api/v1/transactions/", json=body, headers=PORTFOLIO)
+    assert response.status_code == 200, response.text
+
+
+def test_one_scan_per_request(client, scans):
+    post(client, {"type": "DEPOSIT", "asset": "현금", "amount": 1_000_000, "price": 1})
+
+    scans.clear()
+    response = client.get("/api/v1/portfolio/allocation", headers=PORTFOLIO)
+    assert response.status_code == 200
+    assert scans == [1]
+
+    # Orders validate against the materialized balances and never build a snapshot
+    scans.clear()
+    post(client, {"type": "BUY", "asset": "Apple", "ticker": "AAPL", "amount": 2, "price": 1000})
+    assert scans == [0]
+
+    # The buy moved the ledger: the next read replays once, then the cache serves it
+    scans.clear()
+    client.get("/api/v1/portfolio/allocation", headers=PORTFOLIO)
+    client.get("/api/v1/portfolio/summary", headers=PORTFOLIO)
+    client.get("/api/v1/portfolio/holdings", headers=PORTFOLIO)
+    assert scans == [1, 0, 0]
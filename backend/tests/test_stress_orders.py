@@ -0,0 +1,32 @@
+"""
+benchmarks.stress_orders at a small scale: concurrent orders that together overdraw their
+portfolios must leave no balance negative at any point of the ledger.
+"""
+import argparse
+import asyncio
+import socket
+
+import pytest
+
+from benchmarks import stress_orders
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_concurrent_orders_never_overdraw(mode, tmp_path):
+    if mode == "async":
+        pytest.importorskip("aiosqlite")
+    args = argparse.Namespace(
+        orders=200, concurrency=50, portfolios=2, assets=3, cash=1_000_000.0, port=free_port(), seed=7
+    )
+    result = asyncio.run(stress_orders.run_mode(f"sqlite:///{tmp_path / 'stress.db'}", mode, args))
+
+    assert result["violations"] == []
+    assert result["errors"] == 0
+    # The orders overdraw on purpose: some must have been turned away
+    assert result["accepted"] > 0 and result["rejected"] > 0
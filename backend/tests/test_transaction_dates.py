@@ -0,0 +1,19 @@
+"""
+A transaction's date reads back the same from every endpoint, the response to its POST included.
+"""
+from fastapi.testclient import TestClient
+
+from app.main import app
+from database.connection import Base, DatabaseManager
+
+PORTFOLIO = {"X-Portfolio-Id": "3"}
+
+
+def test_created_date_matches_reads():
+    Base.metadata.create_all(DatabaseManager().engine)
+    client = TestClient(app)
+    body = {"type": "DEPOSIT", "asset": "현금", "amount": 1000, "price": 1}
+    created = client.post("/api/v1/transactions/", json=body, headers=PORTFOLIO).json()
+
+    listed = client.get("/api/v1/transactions/", headers=PORTFOLIO).json()
+    assert [t["date"] for t in listed if t["id"] == created["id"]] == [created["date"]]